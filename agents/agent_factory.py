@@ -1,9 +1,19 @@
-"""Agent factory — creates LangChain agents with Hedera Kit + DeFi tools + Claude."""
+"""Agent factory — creates LangChain agents with Hedera Kit + DeFi tools + Claude.
+
+Compiled graphs are memoized per (agent type, system-prompt hash): static
+agents are built once at startup, dynamic agents on first use, and a graph
+is rebuilt automatically when its agent's prompt changes.
+"""
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import json
 import logging
 import os
 import sys
+import threading
+from typing import AsyncIterator
 
 from dotenv import load_dotenv
 
@@ -89,57 +99,148 @@ def _get_all_tools() -> list:
 
     # Custom DeFi tools (always available)
     defi_tools = get_all_defi_tools()
-    logger.info(f"Loaded {len(defi_tools)} custom DeFi tools")
 
-    # Hedera Agent Kit tools (optional — filtered to relevant ones only)
+    # Hedera Agent Kit tools (optional — shared toolkit, pre-filtered once)
     hedera_tools = []
     try:
-        from hedera_agent_kit_setup import get_hedera_toolkit
+        from hedera_agent_kit_setup import get_hedera_tools
 
-        toolkit = get_hedera_toolkit()
-        if toolkit:
-            all_hedera = toolkit.get_tools()
-            hedera_tools = [t for t in all_hedera if t.name in _RELEVANT_HEDERA_TOOLS]
-            logger.info(f"Loaded {len(hedera_tools)}/{len(all_hedera)} Hedera tools (filtered)")
+        hedera_tools = get_hedera_tools(_RELEVANT_HEDERA_TOOLS)
     except Exception as e:
         logger.warning(f"Hedera toolkit unavailable: {e}")
 
     return hedera_tools + defi_tools
 
 
-def create_agentfi_agent(agent_type: str = "portfolio_analyzer"):
+def _system_prompt_for(agent_type: str) -> str:
+    from dynamic_registry import get_dynamic_prompt
+    return SYSTEM_PROMPTS.get(agent_type) or get_dynamic_prompt(agent_type) or SYSTEM_PROMPTS["portfolio_analyzer"]
+
+
+def create_agentfi_agent(agent_type: str = "portfolio_analyzer", system_prompt: str | None = None):
     """Create a LangGraph ReAct agent with Hedera tools + custom DeFi tools + Claude.
 
     agent_type: "portfolio_analyzer", "yield_optimizer", or "risk_scorer"
-    Returns a LangGraph compiled graph (runnable).
+    Returns a LangGraph compiled graph (runnable). Always builds a new graph;
+    request paths should use get_agentfi_agent instead.
     """
-    from langchain_anthropic import ChatAnthropic
+    from langchain_core.messages import SystemMessage
+    from langchain_core.utils.function_calling import convert_to_openai_tool
     from langgraph.prebuilt import create_react_agent
 
+    from agents.llm_client import cacheable_system, get_chat_model
+
     all_tools = _get_all_tools()
 
-    llm = ChatAnthropic(
-        model="claude-haiku-4-5-20251001",
-        anthropic_api_key=os.getenv("ANTHROPIC_API_KEY"),
-        max_tokens=1500,
-    )
+    llm = get_chat_model(model="claude-haiku-4-5-20251001", max_tokens=1500)
 
-    from dynamic_registry import get_dynamic_prompt
-    system_prompt = SYSTEM_PROMPTS.get(agent_type) or get_dynamic_prompt(agent_type) or SYSTEM_PROMPTS["portfolio_analyzer"]
+    if system_prompt is None:
+        system_prompt = _system_prompt_for(agent_type)
 
+    # Tool schemas precede the system prompt in Anthropic's cache order, so one
+    # breakpoint at the end of the prompt caches tools + prompt for every ReAct step
+    tool_chars = sum(len(json.dumps(convert_to_openai_tool(t))) for t in all_tools)
+    content: list[str | dict] = [*cacheable_system(system_prompt, prefix_tokens=tool_chars // 4)]
     agent = create_react_agent(
         model=llm,
         tools=all_tools,
-        prompt=system_prompt,
+        prompt=SystemMessage(content=content),
     )
 
     logger.info(f"Created LangGraph ReAct agent for {agent_type} with {len(all_tools)} tools")
     return agent
 
 
+# (agent_type, sha256 of system prompt, Hedera toolkit generation) -> compiled graph
+_agent_cache: dict[tuple[str, str, int], object] = {}
+# Builds run in executor threads (warm-up, aget_agentfi_agent); the loop only does lock-free lookups
+_agent_lock = threading.Lock()
+
+
+def _toolkit_state() -> tuple[bool, int]:
+    """(toolkit built, generation) — the tool set a graph compiled now would get."""
+    try:
+        from hedera_agent_kit_setup import toolkit_generation, toolkit_ready
+    except Exception:
+        return False, 0
+    return toolkit_ready(), toolkit_generation()
+
+
+def _cache_key(agent_type: str) -> tuple[tuple[str, str, int], str]:
+    system_prompt = _system_prompt_for(agent_type)
+    key = (agent_type, hashlib.sha256(system_prompt.encode()).hexdigest(), _toolkit_state()[1])
+    return key, system_prompt
+
+
+def get_agentfi_agent(agent_type: str = "portfolio_analyzer"):
+    """Return the memoized compiled graph for agent_type, building it if needed.
+
+    Blocking (toolkit retry, graph compile): call from a thread, or use
+    aget_agentfi_agent on the event loop. A changed system prompt or Hedera
+    tool set gives a new key; the stale graph for the same agent type is
+    evicted when the new one is built.
+    """
+    try:
+        from hedera_agent_kit_setup import init_hedera_toolkit
+
+        # Retries a failed toolkit build once its backoff has passed
+        init_hedera_toolkit()
+    except Exception as e:
+        logger.warning(f"Hedera toolkit unavailable: {e}")
+    key, system_prompt = _cache_key(agent_type)
+    agent = _agent_cache.get(key)
+    if agent is None:
+        with _agent_lock:
+            agent = _agent_cache.get(key)
+            if agent is None:
+                agent = create_agentfi_agent(agent_type, system_prompt=system_prompt)
+                _evict(agent_type)
+                _agent_cache[key] = agent
+    return agent
+
+
+def _evict(agent_type: str) -> None:
+    for key in [k for k in _agent_cache if k[0] == agent_type]:
+        del _agent_cache[key]
+
+
+def invalidate_agent(agent_type: str | None = None) -> None:
+    """Drop every cached graph for agent_type, or all graphs (next call rebuilds)."""
+    with _agent_lock:
+        if agent_type is None:
+            _agent_cache.clear()
+        else:
+            _evict(agent_type)
+
+
+async def aget_agentfi_agent(agent_type: str = "portfolio_analyzer"):
+    """Event-loop variant of get_agentfi_agent: cached graphs are returned directly,
+    anything that may block (build, toolkit retry) runs in a worker thread."""
+    if _toolkit_state()[0]:
+        agent = _agent_cache.get(_cache_key(agent_type)[0])
+        if agent is not None:
+            return agent
+    return await asyncio.to_thread(get_agentfi_agent, agent_type)
+
+
+def warm_agent_cache() -> None:
+    """Initialise the Hedera toolkit and build the static agents' graphs ahead of the first request."""
+    try:
+        from hedera_agent_kit_setup import get_hedera_tools
+
+        get_hedera_tools(_RELEVANT_HEDERA_TOOLS)
+    except Exception as e:
+        logger.warning(f"Hedera toolkit unavailable: {e}")
+    for agent_type in SYSTEM_PROMPTS:
+        try:
+            get_agentfi_agent(agent_type)
+        except Exception as e:
+            logger.warning(f"Could not pre-build agent {agent_type}: {e}")
+
+
 async def run_agent(agent_type: str, query: str, wallet_address: str | None = None) -> str:
     """Run an AgentFi agent and return the response string."""
-    agent = create_agentfi_agent(agent_type)
+    agent = await aget_agentfi_agent(agent_type)
 
     # Build the input with wallet context
     full_query = query
@@ -158,3 +259,48 @@ async def run_agent(agent_type: str, query: str, wallet_address: str | None = No
             return last.content
         return str(last)
     return str(result)
+
+
+def _chunk_text(content) -> str:
+    """Text of a streamed message chunk (str, or Anthropic content blocks)."""
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block.get("text", "") for block in content
+        if isinstance(block, dict) and block.get("type") == "text"
+    )
+
+
+async def stream_agent(
+    agent_type: str, query: str, wallet_address: str | None = None,
+) -> AsyncIterator[tuple[str, dict]]:
+    """Run an AgentFi agent, yielding (event, data) pairs as it progresses.
+
+    Events: ("tool_start", {"tool"}), ("tool_end", {"tool"}), ("token", {"text"})
+    and finally ("result", {"result"}) with the same string run_agent returns.
+    """
+    agent = await aget_agentfi_agent(agent_type)
+
+    full_query = query
+    if wallet_address:
+        full_query = f"User's wallet address: {wallet_address}\n\nQuery: {query}"
+
+    final = ""
+    async for ev in agent.astream_events(
+        {"messages": [{"role": "user", "content": full_query}]},
+        version="v2",
+    ):
+        kind = ev["event"]
+        if kind == "on_chat_model_stream":
+            text = _chunk_text(ev["data"]["chunk"].content)
+            if text:
+                yield "token", {"text": text}
+        elif kind == "on_chat_model_end":
+            # The last model turn (the one without tool calls) is the answer
+            final = ev["data"]["output"].content
+        elif kind == "on_tool_start":
+            yield "tool_start", {"tool": ev["name"]}
+        elif kind == "on_tool_end":
+            yield "tool_end", {"tool": ev["name"]}
+
+    yield "result", {"result": final}
@@ -0,0 +1,318 @@
+"""Keep-alive streaming transport for the Anthropic Messages API — asyncio streams, no httpx.
+
+DynamicAgent cannot use the SDK client because httpx hangs on some
+platforms (Windows/MINGW). This transport speaks HTTP/1.1 directly over
+asyncio.open_connection():
+
+- a pool of persistent TLS connections to api.anthropic.com, reused while
+  idle for less than the keep-alive expiry; a pooled connection the server
+  already closed is replaced transparently
+- non-blocking I/O on the event loop — no executor thread per call
+- `stream: true` requests whose chunked SSE body is parsed incrementally;
+  each text delta is passed to an optional token callback as it arrives
+- connect / idle-read timeouts, and retries with backoff (honouring
+  Retry-After) on connection errors, 429, 5xx and overloaded_error events,
+  as long as no token has been handed to the caller yet
+
+Pool size, keep-alive, timeout and retry policy share the ANTHROPIC_* env
+settings of agents.llm_client.
+"""
+from __future__ import annotations
+
+import asyncio
+import codecs
+import json
+import logging
+import os
+import ssl
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable
+
+from agents.llm_client import (
+    ANTHROPIC_KEEPALIVE_EXPIRY,
+    ANTHROPIC_MAX_CONNECTIONS,
+    ANTHROPIC_MAX_RETRIES,
+    ANTHROPIC_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+_HOST = "api.anthropic.com"
+_PORT = 443
+_API_VERSION = "2023-06-01"
+_CONNECT_TIMEOUT = 10.0
+_RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+TokenCallback = Callable[[str], Any]
+
+
+class AnthropicTransportError(RuntimeError):
+    def __init__(self, message: str, retryable: bool = False, retry_after: float | None = None) -> None:
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class _StaleConnection(Exception):
+    """A pooled connection was closed by the server before it answered."""
+
+
+@dataclass
+class StreamedMessage:
+    text: str
+    stop_reason: str | None
+    usage: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class _Connection:
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+    last_used: float
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class AnthropicStreamTransport:
+    def __init__(
+        self,
+        host: str = _HOST,
+        port: int = _PORT,
+        max_connections: int = ANTHROPIC_MAX_CONNECTIONS,
+        keepalive_expiry: float = ANTHROPIC_KEEPALIVE_EXPIRY,
+        timeout: float = ANTHROPIC_TIMEOUT,
+        max_retries: int = ANTHROPIC_MAX_RETRIES,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._ssl = ssl.create_default_context()
+        self._idle: list[_Connection] = []
+        self._slots: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.connections_opened = 0
+        self.connections_reused = 0
+        self.retries = 0
+
+    # --- pool ---
+
+    def _bind_loop(self) -> None:
+        # Connections belong to the loop that opened them (scripts may call asyncio.run repeatedly)
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._idle.clear()
+            self._slots = asyncio.Semaphore(self.max_connections)
+            self._loop = loop
+
+    async def _open(self) -> _Connection:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=self._ssl, server_hostname=self.host),
+            _CONNECT_TIMEOUT,
+        )
+        self.connections_opened += 1
+        return _Connection(reader, writer, time.monotonic())
+
+    def _take_idle(self) -> _Connection | None:
+        now = time.monotonic()
+        while self._idle:
+            conn = self._idle.pop()
+            if now - conn.last_used < self.keepalive_expiry and not conn.writer.is_closing() and not conn.reader.at_eof():
+                self.connections_reused += 1
+                return conn
+            conn.close()
+        return None
+
+    def _release(self, conn: _Connection) -> None:
+        conn.last_used = time.monotonic()
+        self._idle.append(conn)
+
+    async def close(self) -> None:
+        while self._idle:
+            self._idle.pop().close()
+
+    # --- HTTP/1.1 ---
+
+    async def _read(self, awaitable):
+        try:
+            return await asyncio.wait_for(awaitable, self.timeout)
+        except asyncio.TimeoutError:
+            raise AnthropicTransportError(f"Anthropic read timed out after {self.timeout:.0f}s", retryable=True) from None
+
+    async def _read_head(self, reader: asyncio.StreamReader) -> tuple[int, dict[str, str]]:
+        status_line = await self._read(reader.readline())
+        if not status_line:
+            raise _StaleConnection()
+        status = int(status_line.split(b" ", 2)[1])
+        headers: dict[str, str] = {}
+        while True:
+            line = await self._read(reader.readline())
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return status, headers
+
+    async def _iter_body(self, reader: asyncio.StreamReader, headers: dict[str, str]) -> AsyncIterator[bytes]:
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            while True:
+                size_line = await self._read(reader.readline())
+                size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+                if size == 0:
+                    # Trailer section ends with an empty line
+                    while (await self._read(reader.readline())) not in (b"\r\n", b"\n", b""):
+                        pass
+                    return
+                yield await self._read(reader.readexactly(size))
+                await self._read(reader.readexactly(2))
+        elif "content-length" in headers:
+            remaining = int(headers["content-length"])
+            while remaining > 0:
+                data = await self._read(reader.read(min(remaining, 65536)))
+                if not data:
+                    raise asyncio.IncompleteReadError(b"", remaining)
+                remaining -= len(data)
+                yield data
+        else:
+            while data := await self._read(reader.read(65536)):
+                yield data
+
+    def _request_bytes(self, body: bytes) -> bytes:
+        head = (
+            f"POST /v1/messages HTTP/1.1\r\n"
+            f"Host: {self.host}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Accept: text/event-stream\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"X-Api-Key: {os.getenv('ANTHROPIC_API_KEY', '')}\r\n"
+            f"Anthropic-Version: {_API_VERSION}\r\n"
+            f"Connection: keep-alive\r\n\r\n"
+        )
+        return head.encode() + body
+
+    # --- SSE ---
+
+    @staticmethod
+    def _sse_events(buffer: str) -> tuple[list[tuple[str, str]], str]:
+        """Split complete SSE events off the buffer; returns ([(event, data)], remainder)."""
+        events = []
+        while "\n\n" in buffer:
+            raw, buffer = buffer.split("\n\n", 1)
+            event, data = "message", []
+            for line in raw.split("\n"):
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:"):
+                    data.append(line[5:].lstrip())
+            if data:
+                events.append((event, "\n".join(data)))
+        return events, buffer
+
+    async def _attempt(self, payload: bytes, on_token: TokenCallback | None) -> StreamedMessage:
+        conn = self._take_idle()
+        reused = conn is not None
+        if conn is None:
+            conn = await self._open()
+        keep = False
+        try:
+            try:
+                conn.writer.write(self._request_bytes(payload))
+                await conn.writer.drain()
+                status, headers = await self._read_head(conn.reader)
+            except (ConnectionError, asyncio.IncompleteReadError, _StaleConnection) as e:
+                if reused:
+                    raise _StaleConnection() from None
+                raise AnthropicTransportError(f"Anthropic connection dropped: {e!r}", retryable=True) from None
+
+            if status != 200:
+                body = b"".join([chunk async for chunk in self._iter_body(conn.reader, headers)])
+                keep = headers.get("connection", "").lower() != "close"
+                retry_after = headers.get("retry-after")
+                raise AnthropicTransportError(
+                    f"Anthropic API error {status}: {body[:300].decode(errors='replace')}",
+                    retryable=status in _RETRY_STATUSES,
+                    retry_after=float(retry_after) if retry_after and retry_after.replace(".", "").isdigit() else None,
+                )
+
+            parts: list[str] = []
+            usage: dict[str, Any] = {}
+            stop_reason = None
+            buffer = ""
+            decoder = codecs.getincrementaldecoder("utf-8")()  # deltas may split multi-byte characters
+            async for chunk in self._iter_body(conn.reader, headers):
+                events, buffer = self._sse_events((buffer + decoder.decode(chunk)).replace("\r\n", "\n"))
+                for event, data in events:
+                    msg = json.loads(data)
+                    kind = msg.get("type", event)
+                    if kind == "content_block_delta" and msg["delta"].get("type") == "text_delta":
+                        text = msg["delta"]["text"]
+                        parts.append(text)
+                        if on_token is not None:
+                            result = on_token(text)
+                            if asyncio.iscoroutine(result):
+                                await result
+                    elif kind == "message_start":
+                        usage.update(msg["message"].get("usage", {}))
+                    elif kind == "message_delta":
+                        stop_reason = msg.get("delta", {}).get("stop_reason", stop_reason)
+                        usage.update({k: v for k, v in msg.get("usage", {}).items() if v is not None})
+                    elif kind == "error":
+                        err = msg.get("error", {})
+                        raise AnthropicTransportError(
+                            f"Anthropic API error: {err}", retryable=err.get("type") == "overloaded_error",
+                        )
+            keep = headers.get("connection", "").lower() != "close"
+            return StreamedMessage("".join(parts), stop_reason, usage)
+        finally:
+            if keep:
+                self._release(conn)
+            else:
+                conn.close()
+
+    async def stream(self, body: dict[str, Any], on_token: TokenCallback | None = None) -> StreamedMessage:
+        """POST a streaming Messages request; returns the assembled message.
+
+        on_token(text) — sync or async — receives each text delta in order.
+        """
+        self._bind_loop()
+        payload = json.dumps({**body, "stream": True}).encode()
+        emitted = False
+
+        def forward(text: str):
+            nonlocal emitted
+            emitted = True
+            return on_token(text) if on_token is not None else None
+
+        attempt = 0
+        async with self._slots:
+            while True:
+                try:
+                    return await self._attempt(payload, forward)
+                except _StaleConnection:
+                    continue  # server closed an idle pooled connection; not a real failure
+                except (AnthropicTransportError, OSError, asyncio.IncompleteReadError) as e:
+                    retryable = getattr(e, "retryable", True)
+                    if not retryable or emitted or attempt >= self.max_retries:
+                        if isinstance(e, AnthropicTransportError):
+                            raise
+                        raise AnthropicTransportError(f"Anthropic connection failed: {e}") from e
+                    delay = getattr(e, "retry_after", None) or min(0.5 * 2 ** attempt, 8.0)
+                    attempt += 1
+                    self.retries += 1
+                    logger.warning("[anthropic-transport] retry %d in %.1fs: %s", attempt, delay, e)
+                    await asyncio.sleep(delay)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "idle_connections": len(self._idle),
+            "connections_opened": self.connections_opened,
+            "connections_reused": self.connections_reused,
+            "retries": self.retries,
+        }
+
+
+anthropic_transport = AnthropicStreamTransport()
@@ -1,108 +1,139 @@
 """Real DeFi data fetching — prices, APYs, protocol data, wallet balances."""
-import httpx
+import asyncio
 import logging
 
+from agents.http_clients import get_http_client, upstream_limit
+from agents.prefetch import prefetched
+from agents.price_cache import price_cache
+from agents.yield_index import TopPools, stream_top_pools, yield_ingester
+
 logger = logging.getLogger(__name__)
 
+
+async def _warm(kind: str, key: str | None = None):
+    """Result of the current request's speculative prefetch for `kind`, or None."""
+    task = prefetched(kind, key)
+    if task is None:
+        return None
+    try:
+        # Shielded: several steps may await the same prefetch
+        return await asyncio.shield(task)
+    except Exception:
+        return None
+
 # --- Price Data (CoinGecko free API — no key needed) ---
 
 
+DEFAULT_PRICE_IDS = [
+    "ethereum", "bitcoin", "tether", "usd-coin", "hedera-hashgraph",
+    "wrapped-bitcoin", "chainlink", "aave", "uniswap", "sushiswap",
+]
+
+
+def coingecko_price_url(ids: list[str]) -> str:
+    return (
+        f"https://api.coingecko.com/api/v3/simple/price?ids={','.join(ids)}"
+        f"&vs_currencies=usd&include_24hr_change=true&include_market_cap=true"
+    )
+
+
+async def _fetch_prices_upstream(ids: list[str]) -> dict:
+    resp = await get_http_client("coingecko").get(coingecko_price_url(ids))
+    resp.raise_for_status()
+    return resp.json()
+
+
 async def get_token_prices(tokens: list[str] = None) -> dict:
-    """Fetch current USD prices for common DeFi tokens from CoinGecko."""
-    if tokens is None:
-        tokens = [
-            "ethereum", "bitcoin", "tether", "usd-coin", "hedera-hashgraph",
-            "wrapped-bitcoin", "chainlink", "aave", "uniswap", "sushiswap",
-        ]
+    """Fetch current USD prices for common DeFi tokens from CoinGecko.
 
-    ids = ",".join(tokens)
-    url = f"https://api.coingecko.com/api/v3/simple/price?ids={ids}&vs_currencies=usd&include_24hr_change=true&include_market_cap=true"
+    Served from the shared price cache; only ids missing from it hit the API.
+    """
+    if tokens is None:
+        tokens = DEFAULT_PRICE_IDS
 
-    async with httpx.AsyncClient() as client:
-        try:
-            resp = await client.get(url, timeout=10)
-            resp.raise_for_status()
-            return resp.json()
-        except Exception as e:
-            logger.warning(f"CoinGecko API error: {e}")
-            # Fallback with approximate prices
-            return {
-                "ethereum": {"usd": 2800, "usd_24h_change": -1.2},
-                "bitcoin": {"usd": 95000, "usd_24h_change": 0.5},
-                "tether": {"usd": 1.0, "usd_24h_change": 0.01},
-                "usd-coin": {"usd": 1.0, "usd_24h_change": 0.0},
-                "hedera-hashgraph": {"usd": 0.18, "usd_24h_change": 2.3},
-            }
+    # A speculative prefetch warms the cache; let it land before reading
+    await _warm("prices")
+    try:
+        return await price_cache.get_many(tokens, _fetch_prices_upstream)
+    except Exception as e:
+        logger.warning(f"CoinGecko API error: {e}")
+        # Fallback with approximate prices
+        return {
+            "ethereum": {"usd": 2800, "usd_24h_change": -1.2},
+            "bitcoin": {"usd": 95000, "usd_24h_change": 0.5},
+            "tether": {"usd": 1.0, "usd_24h_change": 0.01},
+            "usd-coin": {"usd": 1.0, "usd_24h_change": 0.0},
+            "hedera-hashgraph": {"usd": 0.18, "usd_24h_change": 2.3},
+        }
 
 
 async def get_token_history(token_id: str, days: int = 30) -> list[float]:
     """Fetch price history for volatility calculation."""
     url = f"https://api.coingecko.com/api/v3/coins/{token_id}/market_chart?vs_currency=usd&days={days}"
 
-    async with httpx.AsyncClient() as client:
-        try:
-            resp = await client.get(url, timeout=10)
-            resp.raise_for_status()
-            data = resp.json()
-            return [point[1] for point in data["prices"]]
-        except Exception as e:
-            logger.warning(f"CoinGecko history error: {e}")
-            return []
+    try:
+        async with upstream_limit("coingecko"):
+            resp = await get_http_client("coingecko").get(url)
+        resp.raise_for_status()
+        data = resp.json()
+        return [point[1] for point in data["prices"]]
+    except Exception as e:
+        logger.warning(f"CoinGecko history error: {e}")
+        return []
 
 
 # --- Yield / APY Data ---
 
+YIELD_PROTOCOLS = ["sushiswap", "aave-v3", "compound-v3", "lido", "uniswap-v3"]
+YIELD_CHAINS = ["Ethereum", "Arbitrum", "Hedera"]
 
-async def get_defi_yields() -> list[dict]:
-    """Fetch real yield data from DeFi protocols via DeFi Llama."""
-    url = "https://yields.llama.fi/pools"
 
-    async with httpx.AsyncClient() as client:
-        try:
-            resp = await client.get(url, timeout=15)
-            resp.raise_for_status()
-            pools = resp.json()["data"]
+async def get_defi_yields(min_tvl: float = 100_000, limit: int = 20) -> list[dict]:
+    """Fetch real yield data from DeFi protocols via DeFi Llama.
 
-            # Filter for relevant protocols and chains
-            relevant_protocols = [
-                "sushiswap", "aave-v3", "compound-v3", "lido", "uniswap-v3",
-            ]
-            relevant_chains = ["Ethereum", "Arbitrum", "Hedera"]
-
-            filtered = [
-                {
-                    "protocol": p["project"],
-                    "chain": p["chain"],
-                    "pool": p["symbol"],
-                    "tvl": p["tvlUsd"],
-                    "apy": p["apy"],
-                    "apy_base": p.get("apyBase", 0),
-                    "apy_reward": p.get("apyReward", 0),
-                    "stable": p.get("stablecoin", False),
-                }
-                for p in pools
-                if p["project"] in relevant_protocols
-                and p["chain"] in relevant_chains
-                and p["tvlUsd"] > 100_000
-                and p["apy"] is not None
-                and p["apy"] > 0.1
-            ]
+    Answered from the background yield index once it is loaded; until then
+    the pool set is streamed and filtered while it downloads, keeping only
+    the running top `limit`.
+    """
+    # The speculative prefetch is for the default query only
+    if (min_tvl, limit) == (100_000, 20):
+        warm = await _warm("yields")
+        if warm is not None:
+            return warm
 
-            # Sort by APY descending, return top 20
-            filtered.sort(key=lambda x: x["apy"], reverse=True)
-            return filtered[:20]
+    if yield_ingester.ready:
+        return yield_ingester.index.query(
+            protocols=YIELD_PROTOCOLS, chains=YIELD_CHAINS, min_tvl=min_tvl, min_apy=0.1, limit=limit,
+        )
 
-        except Exception as e:
-            logger.warning(f"DeFi Llama API error: {e}")
-            # Fallback with realistic data
-            return [
-                {"protocol": "sushiswap", "chain": "Ethereum", "pool": "WETH-USDC", "tvl": 50_000_000, "apy": 12.5, "stable": False},
-                {"protocol": "sushiswap", "chain": "Ethereum", "pool": "WBTC-WETH", "tvl": 30_000_000, "apy": 8.2, "stable": False},
-                {"protocol": "aave-v3", "chain": "Ethereum", "pool": "USDC", "tvl": 500_000_000, "apy": 4.8, "stable": True},
-                {"protocol": "aave-v3", "chain": "Ethereum", "pool": "WETH", "tvl": 200_000_000, "apy": 2.1, "stable": False},
-                {"protocol": "lido", "chain": "Ethereum", "pool": "stETH", "tvl": 15_000_000_000, "apy": 3.2, "stable": False},
-                {"protocol": "compound-v3", "chain": "Ethereum", "pool": "USDC", "tvl": 1_000_000_000, "apy": 5.1, "stable": True},
-            ]
+    try:
+        pools = await stream_top_pools(TopPools(
+            YIELD_PROTOCOLS, YIELD_CHAINS, min_tvl=min_tvl, min_apy=0.1, limit=limit,
+        ))
+        return [
+            {
+                "protocol": p["project"],
+                "chain": p["chain"],
+                "pool": p["symbol"],
+                "tvl": p["tvlUsd"],
+                "apy": p["apy"],
+                "apy_base": p.get("apyBase", 0),
+                "apy_reward": p.get("apyReward", 0),
+                "stable": p.get("stablecoin", False),
+            }
+            for p in pools
+        ]
+    except Exception as e:
+        logger.warning(f"DeFi Llama API error: {e}")
+        # Fallback with realistic data
+        return [
+            {"protocol": "sushiswap", "chain": "Ethereum", "pool": "WETH-USDC", "tvl": 50_000_000, "apy": 12.5, "stable": False},
+            {"protocol": "sushiswap", "chain": "Ethereum", "pool": "WBTC-WETH", "tvl": 30_000_000, "apy": 8.2, "stable": False},
+            {"protocol": "aave-v3", "chain": "Ethereum", "pool": "USDC", "tvl": 500_000_000, "apy": 4.8, "stable": True},
+            {"protocol": "aave-v3", "chain": "Ethereum", "pool": "WETH", "tvl": 200_000_000, "apy": 2.1, "stable": False},
+            {"protocol": "lido", "chain": "Ethereum", "pool": "stETH", "tvl": 15_000_000_000, "apy": 3.2, "stable": False},
+            {"protocol": "compound-v3", "chain": "Ethereum", "pool": "USDC", "tvl": 1_000_000_000, "apy": 5.1, "stable": True},
+        ]
 
 
 # --- Bonzo Finance (Hedera-native lending) ---
@@ -110,11 +141,14 @@ async def get_defi_yields() -> list[dict]:
 
 async def get_bonzo_data() -> dict:
     """Fetch Bonzo Finance data on Hedera (lending protocol)."""
+    warm = await _warm("bonzo")
+    if warm is not None:
+        return warm
+
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get("https://api.bonzo.finance/v1/markets", timeout=10)
-            if resp.status_code == 200:
-                return resp.json()
+        resp = await get_http_client("bonzo").get("https://api.bonzo.finance/v1/markets")
+        if resp.status_code == 200:
+            return resp.json()
     except Exception:
         pass
 
@@ -126,44 +160,83 @@ async def get_bonzo_data() -> dict:
             {"asset": "HBAR", "supply_apy": 3.5, "borrow_apy": 5.2, "tvl": 8_000_000},
             {"asset": "USDC", "supply_apy": 6.1, "borrow_apy": 8.4, "tvl": 12_000_000},
             {"asset": "HBARX", "supply_apy": 7.8, "borrow_apy": 10.1, "tvl": 3_000_000},
+            {"asset": "SAUCE", "supply_apy": 9.2, "borrow_apy": 12.5, "tvl": 1_500_000},
         ],
+        "note": "Bonzo Finance API unavailable — showing fallback data",
     }
 
 
+# --- SaucerSwap (Hedera DEX) ---
+
+
+async def get_saucerswap_pools(limit: int = 10) -> list[dict]:
+    """Top SaucerSwap liquidity pools by TVL (pair, TVL in USD, APR %)."""
+    warm = await _warm("saucerswap")
+    if warm is not None:
+        return warm[:limit]
+
+    try:
+        async with upstream_limit("saucerswap"):
+            resp = await get_http_client("saucerswap").get("https://api.saucerswap.finance/v2/pools")
+        if resp.status_code == 200:
+            pools = sorted(resp.json(), key=lambda p: float(p.get("tvl", 0) or 0), reverse=True)
+            return [
+                {
+                    "pair": f"{p.get('tokenA', {}).get('symbol', '?')}/{p.get('tokenB', {}).get('symbol', '?')}",
+                    "tvl_usd": round(float(p.get("tvl", 0) or 0)),
+                    "apr_pct": round(float(p.get("apr", 0) or 0), 2),
+                }
+                for p in pools[:limit]
+                if float(p.get("tvl", 0) or 0) > 10000
+            ]
+    except Exception as e:
+        logger.warning(f"SaucerSwap API error: {e}")
+
+    return [
+        {"pair": "HBAR/USDC", "tvl_usd": 5000000, "apr_pct": 12.5},
+        {"pair": "HBAR/HBARX", "tvl_usd": 3000000, "apr_pct": 18.2},
+        {"pair": "USDC/USDT", "tvl_usd": 8000000, "apr_pct": 4.1},
+        {"note": "SaucerSwap API unavailable — showing fallback data"},
+    ]
+
+
 # --- Wallet Balance (0G Testnet) ---
 
 
 async def get_wallet_balances(wallet_address: str) -> dict:
     """Fetch native OG balance for a wallet on 0G testnet."""
+    warm = await _warm("wallet", wallet_address)
+    if warm is not None:
+        return warm
+
     rpc_url = "https://evmrpc-testnet.0g.ai"
 
-    async with httpx.AsyncClient() as client:
-        try:
-            resp = await client.post(rpc_url, json={
-                "jsonrpc": "2.0",
-                "method": "eth_getBalance",
-                "params": [wallet_address, "latest"],
-                "id": 1,
-            }, timeout=10)
-
-            balance_hex = resp.json().get("result", "0x0")
-            balance_wei = int(balance_hex, 16)
-            balance_og = balance_wei / 1e18
-
-            return {
-                "address": wallet_address,
-                "chain": "0G-Galileo-Testnet",
-                "native_balance": {
-                    "symbol": "OG",
-                    "balance": round(balance_og, 6),
-                    "usd_value": None,
-                },
-                "note": "Token balances require ERC-20 multicall — showing native balance only"
-            }
-        except Exception as e:
-            logger.warning(f"Wallet balance fetch error: {e}")
-            return {
-                "address": wallet_address,
-                "error": str(e),
-                "note": "Could not fetch wallet balances"
-            }
+    try:
+        resp = await get_http_client("og_rpc").post(rpc_url, json={
+            "jsonrpc": "2.0",
+            "method": "eth_getBalance",
+            "params": [wallet_address, "latest"],
+            "id": 1,
+        })
+
+        balance_hex = resp.json().get("result", "0x0")
+        balance_wei = int(balance_hex, 16)
+        balance_og = balance_wei / 1e18
+
+        return {
+            "address": wallet_address,
+            "chain": "0G-Galileo-Testnet",
+            "native_balance": {
+                "symbol": "OG",
+                "balance": round(balance_og, 6),
+                "usd_value": None,
+            },
+            "note": "Token balances require ERC-20 multicall — showing native balance only"
+        }
+    except Exception as e:
+        logger.warning(f"Wallet balance fetch error: {e}")
+        return {
+            "address": wallet_address,
+            "error": str(e),
+            "note": "Could not fetch wallet balances"
+        }
@@ -1,63 +1,58 @@
 """Dynamic Agent — user-created agent with configurable system prompt.
 
-Uses raw SSL sockets to call Anthropic because httpx (used by both the sync
-and async Anthropic SDK clients) hangs on Windows/MINGW platforms.
-
-Wallet context is injected using the same pattern as static agents:
-- OG balance fetched via 0G Chain RPC (urllib, not httpx)
-- CoinGecko prices fetched via urllib
-- SaucerSwap pools and Bonzo Finance markets fetched via urllib
+Calls Anthropic through agents.anthropic_transport (pooled keep-alive asyncio
+connections, streamed responses) because httpx (used by both the sync and
+async Anthropic SDK clients) hangs on Windows/MINGW platforms.
+
+Wallet context is injected using the same pattern as static agents, and
+fetched through the same async data layer (agents.defi_data): shared
+connection pools, the shared price cache and any speculative prefetch —
+no executor threads.
+- OG balance via 0G Chain RPC
+- CoinGecko prices
+- SaucerSwap pools and Bonzo Finance markets
 - Concrete holdings prepended to user query
 """
 import asyncio
 import json
 import logging
-import os
-import socket
-import ssl
-import urllib.request
-import urllib.error
 
+from agents.anthropic_transport import TokenCallback, anthropic_transport
 from agents.base_agent import BaseAgent
+from agents.defi_data import get_bonzo_data, get_saucerswap_pools, get_token_prices, get_wallet_balances
+from agents.llm_client import cacheable_system, prompt_cache_stats
+from agents.llm_governor import LLMOverloadedError, estimate_tokens, llm_governor
 
 logger = logging.getLogger(__name__)
 
-_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")
-_OG_RPC = "https://evmrpc-testnet.0g.ai"
+_PRICE_IDS = ["ethereum", "bitcoin", "solana", "tether", "usd-coin", "chainlink", "aave", "uniswap"]
 
+# Appended to every user-written persona; sent ahead of the live data blocks
+_CONTEXT_RULES = (
+    "\n\nIMPORTANT RULES:\n"
+    "- NEVER ask the user for more information. Always analyze with whatever data is provided.\n"
+    "- Use the real-time data below in your analysis.\n"
+    "- If the user mentions token allocations (e.g. '80% ETH'), treat those as their portfolio.\n"
+    "- Always give concrete numbers, tables, and actionable recommendations.\n"
+    "- Format output as clean markdown with tables."
+)
 
-def _fetch_wallet_balance(wallet_address: str) -> dict:
-    """Fetch OG balance via 0G RPC using urllib (bypasses httpx)."""
-    try:
-        payload = json.dumps({
-            "jsonrpc": "2.0",
-            "method": "eth_getBalance",
-            "params": [wallet_address, "latest"],
-            "id": 1,
-        }).encode()
-        req = urllib.request.Request(
-            _OG_RPC,
-            data=payload,
-            headers={"Content-Type": "application/json"},
-        )
-        with urllib.request.urlopen(req, timeout=8) as resp:
-            data = json.loads(resp.read())
-        balance_hex = data.get("result", "0x0")
-        balance_wei = int(balance_hex, 16)
-        balance_og = round(balance_wei / 1e18, 6)
-        return {"balance": balance_og, "symbol": "OG", "chain": "0G-Galileo-Testnet"}
-    except Exception as e:
-        logger.debug("Failed to fetch wallet balance: %s", e)
-        return {"balance": 0, "symbol": "OG", "chain": "0G-Galileo-Testnet"}
 
+async def _fetch_wallet_balance(wallet_address: str) -> dict:
+    """OG balance via the shared 0G RPC client (reuses a request's wallet prefetch)."""
+    balances = await get_wallet_balances(wallet_address)
+    native = balances.get("native_balance", {})
+    return {
+        "balance": native.get("balance", 0),
+        "symbol": native.get("symbol", "OG"),
+        "chain": balances.get("chain", "0G-Galileo-Testnet"),
+    }
 
-def _fetch_prices() -> str:
-    """Fetch top token prices from CoinGecko using urllib."""
+
+async def _fetch_prices() -> str:
+    """Top token prices from the shared CoinGecko price cache."""
     try:
-        url = "https://api.coingecko.com/api/v3/simple/price?ids=ethereum,bitcoin,solana,tether,usd-coin,chainlink,aave,uniswap&vs_currencies=usd&include_24hr_change=true"
-        req = urllib.request.Request(url, headers={"Accept": "application/json"})
-        with urllib.request.urlopen(req, timeout=8) as resp:
-            data = json.loads(resp.read())
+        data = await get_token_prices(_PRICE_IDS)
         lines = []
         for name, info in data.items():
             price = info.get("usd", "N/A")
@@ -69,120 +64,31 @@ def _fetch_prices() -> str:
         return "Price data temporarily unavailable"
 
 
-def _fetch_saucerswap_pools() -> str:
-    """Fetch top SaucerSwap liquidity pools via urllib."""
-    try:
-        req = urllib.request.Request(
-            "https://api.saucerswap.finance/v2/pools",
-            headers={"Accept": "application/json"},
-        )
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            pools = json.loads(resp.read())
-        sorted_pools = sorted(pools, key=lambda p: float(p.get("tvl", 0) or 0), reverse=True)
-        result = [
-            {
-                "pair": f"{p.get('tokenA', {}).get('symbol', '?')}/{p.get('tokenB', {}).get('symbol', '?')}",
-                "tvl_usd": round(float(p.get("tvl", 0) or 0)),
-                "apr_pct": round(float(p.get("apr", 0) or 0), 2),
-            }
-            for p in sorted_pools[:10]
-            if float(p.get("tvl", 0) or 0) > 10000
-        ]
-        return json.dumps(result, indent=2)
-    except Exception as e:
-        logger.debug("SaucerSwap fetch failed: %s", e)
-        return json.dumps([
-            {"pair": "HBAR/USDC", "tvl_usd": 5000000, "apr_pct": 12.5},
-            {"pair": "HBAR/HBARX", "tvl_usd": 3000000, "apr_pct": 18.2},
-            {"pair": "USDC/USDT", "tvl_usd": 8000000, "apr_pct": 4.1},
-            {"note": "SaucerSwap API unavailable — showing fallback data"},
-        ], indent=2)
-
-
-def _fetch_bonzo_markets() -> str:
-    """Fetch Bonzo Finance lending/borrowing markets via urllib."""
-    try:
-        req = urllib.request.Request(
-            "https://api.bonzo.finance/v1/markets",
-            headers={"Accept": "application/json"},
-        )
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            return resp.read().decode()
-    except Exception as e:
-        logger.debug("Bonzo Finance fetch failed: %s", e)
-        return json.dumps({
-            "protocol": "Bonzo Finance",
-            "chain": "Hedera",
-            "markets": [
-                {"asset": "HBAR", "supply_apy": 3.5, "borrow_apy": 5.2, "tvl": 8000000},
-                {"asset": "USDC", "supply_apy": 6.1, "borrow_apy": 8.4, "tvl": 12000000},
-                {"asset": "HBARX", "supply_apy": 7.8, "borrow_apy": 10.1, "tvl": 3000000},
-                {"asset": "SAUCE", "supply_apy": 9.2, "borrow_apy": 12.5, "tvl": 1500000},
-            ],
-            "note": "Bonzo Finance API unavailable — showing fallback data",
-        }, indent=2)
-
-
-def _call_anthropic(system: str, user_message: str) -> str:
-    """Call Anthropic Messages API via raw SSL socket (bypasses httpx)."""
-    body = json.dumps({
-        "model": "claude-haiku-4-5-20251001",
-        "max_tokens": 2048,
-        "system": system,
-        "messages": [{"role": "user", "content": user_message}],
-    }).encode()
-
-    ctx = ssl.create_default_context()
-    raw_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    raw_sock.settimeout(60)
-    s = ctx.wrap_socket(raw_sock, server_hostname="api.anthropic.com")
-    try:
-        s.connect(("api.anthropic.com", 443))
-        headers = (
-            f"POST /v1/messages HTTP/1.1\r\n"
-            f"Host: api.anthropic.com\r\n"
-            f"Content-Type: application/json\r\n"
-            f"Content-Length: {len(body)}\r\n"
-            f"X-Api-Key: {_API_KEY}\r\n"
-            f"Anthropic-Version: 2023-06-01\r\n"
-            f"Connection: close\r\n\r\n"
-        )
-        s.send(headers.encode() + body)
+async def _fetch_saucerswap_pools() -> str:
+    """Top SaucerSwap liquidity pools via the shared SaucerSwap client."""
+    return json.dumps(await get_saucerswap_pools(), indent=2)
 
-        response = b""
-        while True:
-            try:
-                chunk = s.recv(8192)
-                if not chunk:
-                    break
-                response += chunk
-            except socket.timeout:
-                break
-    finally:
-        s.close()
 
-    raw = response.decode()
-    if "\r\n\r\n" not in raw:
-        raise RuntimeError(f"No HTTP body in response: {raw[:200]}")
+async def _fetch_bonzo_markets() -> str:
+    """Bonzo Finance lending/borrowing markets via the shared Bonzo client."""
+    return json.dumps(await get_bonzo_data(), indent=2)
 
-    resp_body = raw.split("\r\n\r\n", 1)[1]
-    # Handle chunked transfer encoding
-    if "transfer-encoding: chunked" in raw.lower():
-        decoded = []
-        idx = 0
-        while idx < len(resp_body):
-            end = resp_body.index("\r\n", idx)
-            size = int(resp_body[idx:end], 16)
-            if size == 0:
-                break
-            decoded.append(resp_body[end + 2 : end + 2 + size])
-            idx = end + 2 + size + 2
-        resp_body = "".join(decoded)
 
-    data = json.loads(resp_body)
-    if "error" in data:
-        raise RuntimeError(f"Anthropic API error: {data['error']}")
-    return data["content"][0]["text"]
+async def _call_anthropic(
+    system: str | list[dict], user_message: str, on_token: TokenCallback | None = None,
+) -> str:
+    """Stream a Messages API call over the pooled keep-alive transport (bypasses httpx)."""
+    message = await anthropic_transport.stream(
+        {
+            "model": "claude-haiku-4-5-20251001",
+            "max_tokens": 2048,
+            "system": system,
+            "messages": [{"role": "user", "content": user_message}],
+        },
+        on_token=on_token,
+    )
+    prompt_cache_stats.record_usage(message.usage)
+    return message.text
 
 
 class DynamicAgent(BaseAgent):
@@ -197,7 +103,10 @@ class DynamicAgent(BaseAgent):
         self.system_prompt = system_prompt
         self.price_per_call = price_per_call
 
-    async def execute(self, query: str, wallet_address: str | None = None) -> str:
+    async def execute(
+        self, query: str, wallet_address: str | None = None, on_token: TokenCallback | None = None,
+    ) -> str:
+        """Run the agent; on_token, if given, receives the response text as it streams."""
         try:
             # Fetch all context in parallel (wallet, prices, Hedera DeFi data)
             wallet_banner = ""
@@ -206,13 +115,13 @@ class DynamicAgent(BaseAgent):
 
             # Always fetch Hedera DeFi data (SaucerSwap + Bonzo) in parallel
             fetches = [
-                asyncio.to_thread(_fetch_saucerswap_pools),
-                asyncio.to_thread(_fetch_bonzo_markets),
+                _fetch_saucerswap_pools(),
+                _fetch_bonzo_markets(),
             ]
 
             if wallet_address:
-                fetches.insert(0, asyncio.to_thread(_fetch_wallet_balance, wallet_address))
-                fetches.insert(1, asyncio.to_thread(_fetch_prices))
+                fetches.insert(0, _fetch_wallet_balance(wallet_address))
+                fetches.insert(1, _fetch_prices())
                 results = await asyncio.gather(*fetches)
                 bal_data, prices, saucerswap_data, bonzo_data = results[0], results[1], results[2], results[3]
 
@@ -233,30 +142,24 @@ class DynamicAgent(BaseAgent):
                 results = await asyncio.gather(*fetches)
                 saucerswap_data, bonzo_data = results[0], results[1]
 
-            # Enhance system prompt with context injection rules
-            enhanced_system = self.system_prompt
-
-            # Inject Hedera DeFi data
-            enhanced_system += (
-                f"\n\nSAUCERSWAP DEX — TOP LIQUIDITY POOLS (live from SaucerSwap API):\n{saucerswap_data}\n\n"
-                f"BONZO FINANCE — LENDING/BORROWING MARKETS (live from Bonzo Finance API):\n{bonzo_data}\n\n"
-            )
-
-            if price_context:
-                enhanced_system += f"CURRENT MARKET PRICES (live from CoinGecko):\n{price_context}\n\n"
-
-            enhanced_system += (
-                "IMPORTANT RULES:\n"
-                "- NEVER ask the user for more information. Always analyze with whatever data is provided.\n"
-                "- Use the real-time data above in your analysis.\n"
-                "- If the user mentions token allocations (e.g. '80% ETH'), treat those as their portfolio.\n"
-                "- Always give concrete numbers, tables, and actionable recommendations.\n"
-                "- Format output as clean markdown with tables."
+            # Prompt-cached blocks, least volatile first: persona + rules, Hedera
+            # DeFi snapshot, then prices (only present when a wallet is connected)
+            enhanced_system = cacheable_system(
+                self.system_prompt + _CONTEXT_RULES,
+                f"SAUCERSWAP DEX — TOP LIQUIDITY POOLS (live from SaucerSwap API):\n{saucerswap_data}\n\n"
+                f"BONZO FINANCE — LENDING/BORROWING MARKETS (live from Bonzo Finance API):\n{bonzo_data}",
+                f"CURRENT MARKET PRICES (live from CoinGecko):\n{price_context}" if price_context else "",
             )
 
             user_message = holdings_line + query
-            llm_result = await asyncio.to_thread(_call_anthropic, enhanced_system, user_message)
+            budget = estimate_tokens(sum(len(b["text"]) for b in enhanced_system) + len(user_message), 2048)
+            if on_token is not None and wallet_banner:
+                on_token(wallet_banner)
+            async with llm_governor.slot(budget):
+                llm_result = await _call_anthropic(enhanced_system, user_message, on_token)
             return wallet_banner + llm_result
+        except LLMOverloadedError:
+            raise
         except Exception as e:
             logger.error(f"Dynamic agent '{self.name}' error: {e}")
             return f"Agent error: {str(e)}"
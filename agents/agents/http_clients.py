@@ -0,0 +1,108 @@
+"""Shared HTTP clients — one keep-alive connection pool per upstream, reused process-wide.
+
+Every data fetcher (defi_data, the LangChain DeFi tools, x402 verification,
+cross-agent balance reads) goes through these clients instead of opening a
+fresh httpx client per call, so DNS + TCP + TLS setup is paid once per
+upstream instead of once per request.
+
+The FastAPI lifespan in api.py warms the pools at startup and closes them on
+shutdown. Clients are also created lazily on first use, so scripts and
+one-off imports keep working without the lifespan.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Hedera network (testnet, previewnet or mainnet); selects the mirror node host
+HEDERA_NETWORK = os.getenv("HEDERA_NETWORK", "testnet")
+
+# Upstream name -> pool settings. max_connections is the per-host limit.
+UPSTREAMS: dict[str, dict] = {
+    "coingecko": {"base_url": "https://api.coingecko.com", "max_connections": 10, "timeout": 10},
+    "defillama": {"base_url": "https://yields.llama.fi", "max_connections": 4, "timeout": 15},
+    "bonzo": {"base_url": "https://api.bonzo.finance", "max_connections": 4, "timeout": 10},
+    "saucerswap": {"base_url": "https://api.saucerswap.finance", "max_connections": 4, "timeout": 10},
+    "og_rpc": {"base_url": os.getenv("OG_RPC_URL", "https://evmrpc-testnet.0g.ai"), "max_connections": 10, "timeout": 10},
+    "mirror_node": {"base_url": f"https://{HEDERA_NETWORK}.mirrornode.hedera.com", "max_connections": 10, "timeout": 10},
+    "pieverse": {"base_url": "https://facilitator.pieverse.io", "max_connections": 4, "timeout": 30},
+}
+
+_KEEPALIVE_EXPIRY = 60.0
+
+_async_clients: dict[str, httpx.AsyncClient] = {}
+_limiters: dict[str, asyncio.Semaphore] = {}
+
+
+def _http2_supported() -> bool:
+    """HTTP/2 needs the optional `h2` package (httpx[http2])."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+_HTTP2 = _http2_supported()
+
+
+def _client_kwargs(upstream: str) -> dict:
+    cfg = UPSTREAMS[upstream]
+    return {
+        "base_url": cfg["base_url"],
+        "timeout": cfg["timeout"],
+        "http2": _HTTP2,
+        "limits": httpx.Limits(
+            max_connections=cfg["max_connections"],
+            max_keepalive_connections=cfg["max_connections"],
+            keepalive_expiry=_KEEPALIVE_EXPIRY,
+        ),
+    }
+
+
+def get_http_client(upstream: str) -> httpx.AsyncClient:
+    """Return the shared async client for an upstream (created on first use)."""
+    client = _async_clients.get(upstream)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(**_client_kwargs(upstream))
+        _async_clients[upstream] = client
+    return client
+
+
+def upstream_limit(upstream: str) -> asyncio.Semaphore:
+    """Semaphore capping concurrent in-flight requests to an upstream.
+
+    Sized like the connection pool, so fan-out callers queue here instead of
+    timing out waiting for a pooled connection.
+    """
+    limiter = _limiters.get(upstream)
+    if limiter is None:
+        limiter = asyncio.Semaphore(UPSTREAMS[upstream]["max_connections"])
+        _limiters[upstream] = limiter
+    return limiter
+
+
+async def _warm(upstream: str) -> None:
+    try:
+        await get_http_client(upstream).head("/", timeout=5)
+    except Exception as e:
+        logger.debug("Warm-up for %s failed (non-blocking): %s", upstream, e)
+
+
+async def warm_up_http_clients() -> None:
+    """Open one connection per upstream so the first request skips the handshake."""
+    await asyncio.gather(*(_warm(name) for name in UPSTREAMS))
+    logger.info("HTTP client pools warmed for %d upstreams (http2=%s)", len(UPSTREAMS), _HTTP2)
+
+
+async def close_http_clients() -> None:
+    """Close every pooled client. Called from the FastAPI lifespan on shutdown."""
+    for client in _async_clients.values():
+        await client.aclose()
+    _async_clients.clear()
+    _limiters.clear()
@@ -0,0 +1,160 @@
+"""Local intent router — answers common planning requests without the LLM planner.
+
+A keyword / regex scorer built from the planner's own agent list
+(ROUTER_PROMPT) and the token vocabularies the agents already understand
+(TOKEN_MAP symbols and CoinGecko ids, DeFi Llama protocol names). When it is
+confident it emits the same step list the planner would; otherwise the
+orchestrator falls back to the LLM.
+
+Every decision is logged with its confidence, and stats() reports the
+LLM-bypass rate and an estimate of planning latency saved (bypassed calls ×
+mean observed LLM planning latency).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any
+
+from agents.defi_data import YIELD_PROTOCOLS
+from agents.portfolio_analyzer import TOKEN_MAP as ANALYZER_TOKENS
+from agents.risk_scorer import TOKEN_MAP as RISK_TOKENS
+
+logger = logging.getLogger(__name__)
+
+INTENT_ROUTER_MIN_CONFIDENCE = float(os.getenv("INTENT_ROUTER_MIN_CONFIDENCE", "0.75"))
+
+# Intent keywords per planner agent (regex fragments, matched on word starts)
+_AGENT_KEYWORDS: dict[str, dict[str, float]] = {
+    "portfolio_analyzer": {
+        r"portfolio": 2.0, r"holdings?\b": 2.0, r"allocation": 1.5, r"analy[sz]": 1.5,
+        r"diversif": 1.5, r"rebalanc": 1.5, r"balances?\b": 1.0, r"wallet": 1.0,
+        r"positions?\b": 1.0, r"assets?\b": 0.5, r"breakdown": 1.0,
+    },
+    "risk_scorer": {
+        r"risk": 2.0, r"volatil": 2.0, r"drawdown": 2.0, r"safe": 1.5, r"danger": 1.5,
+        r"exposure": 1.0, r"concentrat": 1.0, r"score": 1.0, r"hedg": 1.0,
+    },
+    "yield_optimizer": {
+        r"yields?\b": 2.0, r"apy\b": 2.0, r"apr\b": 2.0, r"farm": 1.5, r"stak": 1.5,
+        r"lend": 1.5, r"earn": 1.5, r"interest": 1.0, r"liquidity": 1.0, r"pools?\b": 1.0,
+        r"passive income": 2.0,
+    },
+}
+
+# Cues that the user wants a custom chain the fixed templates cannot express
+_SEQUENCING = re.compile(r"\b(then|after that|afterwards|based on|using the result|compare|versus|vs\.?)\b")
+_ALLOCATION = re.compile(r"\d+(?:\.\d+)?\s*%")
+
+# Canonical execution order; later agents consume the portfolio analysis when present
+_ORDER = ["portfolio_analyzer", "risk_scorer", "yield_optimizer"]
+
+
+def _planner_agents(router_prompt: str) -> list[str]:
+    m = re.search(r"Available agents:\s*(.+)", router_prompt)
+    if not m:
+        return list(_ORDER)
+    return [a.strip(" .") for a in m.group(1).split(",") if a.strip(" .")]
+
+
+@dataclass
+class RouteDecision:
+    steps: list[dict[str, Any]] | None
+    confidence: float
+    scores: dict[str, float]
+
+
+class IntentRouter:
+    def __init__(self, router_prompt: str, min_confidence: float = INTENT_ROUTER_MIN_CONFIDENCE) -> None:
+        self.agents = [a for a in _planner_agents(router_prompt) if a in _AGENT_KEYWORDS]
+        self.min_confidence = min_confidence
+        self._patterns = {
+            agent: [(re.compile(rf"\b{kw}"), w) for kw, w in _AGENT_KEYWORDS[agent].items()]
+            for agent in self.agents
+        }
+        symbols = set(ANALYZER_TOKENS) | set(RISK_TOKENS)
+        cg_ids = set(ANALYZER_TOKENS.values()) | set(RISK_TOKENS.values())
+        self._tokens = re.compile(
+            r"\b(" + "|".join(sorted((re.escape(t.lower()) for t in symbols | cg_ids), key=len, reverse=True)) + r")\b"
+        )
+        self._protocols = re.compile(
+            r"\b(" + "|".join(re.escape(p.split("-")[0]) for p in YIELD_PROTOCOLS) + r")\b"
+        )
+
+        self._lock = threading.Lock()
+        self.local = 0
+        self.llm = 0
+        self.llm_ms_total = 0.0
+
+    def score(self, query: str) -> dict[str, float]:
+        q = query.lower()
+        scores = {
+            agent: sum(w for pattern, w in patterns if pattern.search(q))
+            for agent, patterns in self._patterns.items()
+        }
+        tokens = len(set(self._tokens.findall(q)))
+        if "portfolio_analyzer" in scores and tokens:
+            scores["portfolio_analyzer"] += min(tokens, 3) * 0.5
+            # "60% ETH, 40% USDC" is a concrete allocation to analyse
+            if _ALLOCATION.search(q):
+                scores["portfolio_analyzer"] += 1.0
+        if "yield_optimizer" in scores and self._protocols.search(q):
+            scores["yield_optimizer"] += 1.0
+        return scores
+
+    def route(self, query: str) -> RouteDecision:
+        """Score the query and build a plan when confident enough."""
+        scores = self.score(query)
+        selected = [a for a in _ORDER if scores.get(a, 0.0) >= 1.5]
+        if not selected:
+            return RouteDecision(None, 0.0, scores)
+
+        # Each selected agent needs a clear signal; weak runners-up lower confidence
+        confidence = min(min(scores[a] / 2.0, 1.0) for a in selected)
+        if any(0.0 < s < 1.5 for a, s in scores.items() if a not in selected):
+            confidence *= 0.8
+        if _SEQUENCING.search(query.lower()):
+            confidence *= 0.5
+
+        steps: list[dict[str, Any]] = []
+        for agent in selected:
+            # Only the portfolio analysis feeds later steps; otherwise they run in parallel
+            if steps and steps[0]["agent"] == "portfolio_analyzer":
+                steps.append({"agent": agent, "input": f"{query}\n\nPortfolio analysis: {{step_0}}"})
+            else:
+                steps.append({"agent": agent, "input": query})
+
+        plan = steps if confidence >= self.min_confidence else None
+        return RouteDecision(plan, round(confidence, 2), scores)
+
+    def record(self, decision: RouteDecision, llm_ms: float | None = None) -> None:
+        """Log a routing decision; pass llm_ms when the LLM planner was used."""
+        with self._lock:
+            if decision.steps is not None:
+                self.local += 1
+            else:
+                self.llm += 1
+                if llm_ms is not None:
+                    self.llm_ms_total += llm_ms
+        logger.info(
+            "[router] %s confidence=%.2f agents=%s%s",
+            "local" if decision.steps is not None else "llm",
+            decision.confidence,
+            [s["agent"] for s in decision.steps] if decision.steps else
+            {a: round(s, 1) for a, s in decision.scores.items() if s},
+            f" llm_ms={llm_ms:.0f}" if llm_ms is not None else "",
+        )
+
+    def stats(self) -> dict[str, Any]:
+        total = self.local + self.llm
+        mean_llm_ms = self.llm_ms_total / self.llm if self.llm else 0.0
+        return {
+            "local": self.local,
+            "llm": self.llm,
+            "bypass_rate": round(self.local / total, 3) if total else 0.0,
+            "mean_llm_plan_ms": round(mean_llm_ms, 1),
+            "est_saved_ms": round(self.local * mean_llm_ms, 1),
+        }
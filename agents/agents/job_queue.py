@@ -0,0 +1,312 @@
+"""Durable background jobs for long-running agent executions.
+
+ReAct executions can outlast proxy timeouts (Railway cuts idle requests), so
+POST /agents/{agent_id}/jobs enqueues the execution and returns at once;
+GET /jobs/{id} reports status and, when finished, the same payload the
+synchronous endpoint returns.
+
+Jobs live in a local SQLite database (JOBS_DB_PATH), so queued work survives
+a restart. A graceful shutdown puts running jobs back on the queue without
+charging them an attempt; jobs still running after a crash are re-queued at
+startup, up to JOBS_MAX_ATTEMPTS runs, after which they are marked failed.
+Store calls run in worker threads, off the event loop.
+Each job carries a persisted checkpoint in which the runner records the
+side-effecting steps it has completed (attestation, reward, ...), so a re-run
+skips them instead of repeating them.
+
+A bounded pool of JOBS_WORKERS asyncio workers drains the queue in FIFO
+order, skipping agents already at their concurrency cap (JOBS_MAX_PER_AGENT,
+overridable per agent via JOBS_AGENT_CONCURRENCY, e.g.
+"yield_optimizer:1,risk_scorer:4").
+
+The job runner itself is supplied by api.py. x402 payments are settled when
+the job is submitted, inside the payment window, so the signed payment never
+reaches the job row; attestation and reward match the synchronous endpoint.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Coroutine
+
+logger = logging.getLogger(__name__)
+
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", str(Path(__file__).resolve().parent.parent / "jobs.db"))
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "4"))
+JOBS_MAX_PER_AGENT = int(os.getenv("JOBS_MAX_PER_AGENT", "2"))
+JOBS_AGENT_CONCURRENCY: dict[str, int] = {
+    agent: int(limit)
+    for agent, _, limit in (
+        item.partition(":") for item in os.getenv("JOBS_AGENT_CONCURRENCY", "").split(",") if ":" in item
+    )
+}
+# Finished jobs are kept this long for polling, then purged
+JOBS_RETENTION_SECONDS = float(os.getenv("JOBS_RETENTION_SECONDS", str(7 * 24 * 3600)))
+# A job interrupted by this many crashes mid-run is failed instead of re-queued
+JOBS_MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS", "3"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    agent_id TEXT NOT NULL,
+    request TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    checkpoint TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+
+
+class JobCheckpoint:
+    """Per-job record of completed steps, persisted so re-runs do not repeat side effects."""
+
+    def __init__(self, store: JobStore, job_id: str, state: dict[str, Any] | None) -> None:
+        self._store = store
+        self._job_id = job_id
+        self.state: dict[str, Any] = state or {}
+
+    def __contains__(self, step: str) -> bool:
+        return step in self.state
+
+    def get(self, step: str) -> Any:
+        return self.state.get(step)
+
+    async def save(self, step: str, value: Any) -> None:
+        self.state[step] = value
+        await asyncio.to_thread(self._store.save_checkpoint, self._job_id, dict(self.state))
+
+
+JobRunner = Callable[[str, dict[str, Any], JobCheckpoint], Coroutine[Any, Any, dict[str, Any]]]
+
+
+class JobStore:
+    """SQLite persistence for jobs; all methods are short synchronous statements."""
+
+    def __init__(self, path: str = JOBS_DB_PATH) -> None:
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "checkpoint" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN checkpoint TEXT")
+        self._lock = threading.Lock()
+
+    def create(self, agent_id: str, request: dict[str, Any]) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, agent_id, request, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                (job_id, agent_id, json.dumps(request), time.time()),
+            )
+        return job_id
+
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["request"] = json.loads(job["request"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["checkpoint"] = json.loads(job["checkpoint"]) if job["checkpoint"] else None
+        return job
+
+    def claim(self, busy: Callable[[str], bool]) -> dict[str, Any] | None:
+        """Mark the oldest queued job whose agent is not busy as running and return it."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, agent_id FROM jobs WHERE status = 'queued' ORDER BY created_at"
+            ).fetchall()
+            for row in rows:
+                if busy(row["agent_id"]):
+                    continue
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                    (time.time(), row["id"]),
+                )
+                break
+            else:
+                return None
+        return self.get(row["id"])
+
+    def save_checkpoint(self, job_id: str, state: dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET checkpoint = ? WHERE id = ?", (json.dumps(state, default=str), job_id),
+            )
+
+    def finish(self, job_id: str, result: dict[str, Any] | None, error: str | None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (
+                    "failed" if error else "succeeded",
+                    json.dumps(result, default=str) if result is not None else None,
+                    error,
+                    time.time(),
+                    job_id,
+                ),
+            )
+
+    def requeue_running(self, max_attempts: int = JOBS_MAX_ATTEMPTS) -> tuple[int, int]:
+        """Put jobs interrupted by a crash back on the queue.
+
+        Jobs that already used max_attempts runs are failed instead, so a job
+        that brings the process down is not re-run on every restart.
+        Returns (re-queued, failed).
+        """
+        with self._lock:
+            failed = self._conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE status = 'running' AND attempts >= ?",
+                (f"Interrupted {max_attempts} times; giving up", time.time(), max_attempts),
+            ).rowcount
+            requeued = self._conn.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'").rowcount
+        return requeued, failed
+
+    def release_running(self) -> int:
+        """Re-queue jobs cut short by a graceful shutdown without charging them an attempt."""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = MAX(attempts - 1, 0) WHERE status = 'running'"
+            ).rowcount
+
+    def purge(self, older_than: float) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND finished_at < ?", (older_than,)
+            ).rowcount
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class JobQueue:
+    """Bounded asyncio worker pool over a JobStore with per-agent concurrency caps."""
+
+    def __init__(
+        self,
+        workers: int = JOBS_WORKERS,
+        max_per_agent: int = JOBS_MAX_PER_AGENT,
+        agent_limits: dict[str, int] | None = None,
+    ) -> None:
+        self.workers = workers
+        self.max_per_agent = max_per_agent
+        self.agent_limits = dict(JOBS_AGENT_CONCURRENCY if agent_limits is None else agent_limits)
+        self._store: JobStore | None = None
+        self._running: Counter[str] = Counter()
+        self._wake: asyncio.Event | None = None
+        # Claims are serialised so two workers cannot both take an agent's last slot
+        self._claim_lock: asyncio.Lock | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def store(self) -> JobStore:
+        if self._store is None:
+            self._store = JobStore()
+        return self._store
+
+    def limit_for(self, agent_id: str) -> int:
+        return self.agent_limits.get(agent_id, self.max_per_agent)
+
+    async def start(self, runner: JobRunner) -> None:
+        """Open the store, recover interrupted jobs and start the workers."""
+        if self._tasks:
+            return
+        wake = self._wake = asyncio.Event()
+        self._claim_lock = asyncio.Lock()
+        requeued, abandoned = await asyncio.to_thread(self.store.requeue_running)
+        purged = await asyncio.to_thread(self.store.purge, time.time() - JOBS_RETENTION_SECONDS)
+        if requeued or abandoned or purged:
+            logger.info(
+                "[jobs] re-queued %d interrupted jobs, failed %d past %d attempts, purged %d old jobs",
+                requeued, abandoned, JOBS_MAX_ATTEMPTS, purged,
+            )
+        self._tasks = [asyncio.create_task(self._worker(runner, wake, self._claim_lock)) for _ in range(self.workers)]
+        wake.set()
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._store is not None:
+            # Jobs cancelled mid-run go back on the queue; a redeploy is not a failed attempt
+            await asyncio.to_thread(self._store.release_running)
+
+    async def submit(self, agent_id: str, request: dict[str, Any]) -> str:
+        job_id = await asyncio.to_thread(self.store.create, agent_id, request)
+        if self._wake is not None:
+            self._wake.set()
+        return job_id
+
+    async def get(self, job_id: str) -> dict[str, Any] | None:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def _claim(self, lock: asyncio.Lock) -> dict[str, Any] | None:
+        async with lock:
+            busy = {a for a, n in self._running.items() if n >= self.limit_for(a)}
+            job = await asyncio.to_thread(self.store.claim, busy.__contains__)
+            if job is not None:
+                self._running[job["agent_id"]] += 1
+            return job
+
+    async def _worker(self, runner: JobRunner, wake: asyncio.Event, lock: asyncio.Lock) -> None:
+        store = self.store
+        while True:
+            # Cleared before claiming, so a submit during the claim still wakes us
+            wake.clear()
+            job = await self._claim(lock)
+            if job is None:
+                await wake.wait()
+                continue
+            # Another job may be claimable by an idle worker
+            wake.set()
+            agent_id = job["agent_id"]
+            result, error = None, None
+            try:
+                # Own task, so context set by the runner (LLM priority, cache opt-out) ends with the job
+                checkpoint = JobCheckpoint(store, job["id"], job["checkpoint"])
+                result = await asyncio.create_task(runner(agent_id, job["request"], checkpoint))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("[jobs] job %s (%s) failed: %s", job["id"], agent_id, e)
+                error = str(e)
+            finally:
+                self._running[agent_id] -= 1
+                # A slot for this agent freed up; queued jobs for it can now be claimed
+                wake.set()
+            await asyncio.to_thread(store.finish, job["id"], result, error)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "running": {a: n for a, n in self._running.items() if n},
+            "jobs": self._store.counts() if self._store is not None else {},
+        }
+
+
+job_queue = JobQueue()
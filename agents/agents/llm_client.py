@@ -0,0 +1,206 @@
+"""Shared Anthropic client — one pooled, keep-alive connection set for every LLM call.
+
+The static agents, the orchestrator planner and the LangChain ChatAnthropic
+wrapper all go through get_anthropic_client(), so TLS setup to
+api.anthropic.com is paid once per pooled connection instead of once per
+request. Pool size, keep-alive, timeout and retry policy come from env.
+
+Calls go through create_message() / get_chat_model(), which admit each
+request through the global LLM governor (agents.llm_governor) first.
+
+Large prompts are split with cacheable_system(): the stable prefix (persona,
+rules, market snapshot) ends in Anthropic prompt-cache breakpoints and the
+per-request suffix follows, so repeat calls read the prefix from the cache.
+Breakpoints are only placed once the prefix reaches the model's minimum
+cacheable length (MIN_CACHEABLE_TOKENS).
+Cached-token counts from every response are aggregated in prompt_cache_stats().
+
+The FastAPI lifespan warms the pool at startup and closes it on shutdown;
+the client is also created lazily so scripts work without the lifespan.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from functools import cache, cached_property
+from typing import Any
+
+import httpx
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
+
+from agents.http_clients import _HTTP2
+from agents.llm_governor import estimate_tokens, llm_governor
+
+logger = logging.getLogger(__name__)
+
+ANTHROPIC_MAX_CONNECTIONS = int(os.getenv("ANTHROPIC_MAX_CONNECTIONS", "20"))
+ANTHROPIC_KEEPALIVE_EXPIRY = float(os.getenv("ANTHROPIC_KEEPALIVE_EXPIRY", "120"))
+ANTHROPIC_TIMEOUT = float(os.getenv("ANTHROPIC_TIMEOUT", "60"))
+ANTHROPIC_MAX_RETRIES = int(os.getenv("ANTHROPIC_MAX_RETRIES", "2"))
+
+# Anthropic allows at most four cache breakpoints per request
+_MAX_CACHE_BREAKPOINTS = 4
+# Shortest prefix Anthropic caches for claude-haiku-4-5 (the model every agent uses)
+MIN_CACHEABLE_TOKENS = int(os.getenv("ANTHROPIC_MIN_CACHEABLE_TOKENS", "4096"))
+
+_client: AsyncAnthropic | None = None
+
+
+def get_anthropic_client() -> AsyncAnthropic:
+    """Return the process-wide AsyncAnthropic client (created on first use)."""
+    global _client
+    if _client is None or _client.is_closed():
+        _client = AsyncAnthropic(
+            max_retries=ANTHROPIC_MAX_RETRIES,
+            timeout=ANTHROPIC_TIMEOUT,
+            http_client=DefaultAsyncHttpxClient(
+                http2=_HTTP2,
+                limits=httpx.Limits(
+                    max_connections=ANTHROPIC_MAX_CONNECTIONS,
+                    max_keepalive_connections=ANTHROPIC_MAX_CONNECTIONS,
+                    keepalive_expiry=ANTHROPIC_KEEPALIVE_EXPIRY,
+                ),
+            ),
+        )
+    return _client
+
+
+def cacheable_system(*stable: str, volatile: str = "", prefix_tokens: int = 0) -> list[dict[str, Any]]:
+    """System prompt as text blocks: each stable part ends in a cache breakpoint, then the volatile suffix.
+
+    Order stable parts from least to most frequently changing (persona and
+    rules before a market snapshot) so a data change only re-writes the tail.
+    A breakpoint is only placed once the cached prefix — `prefix_tokens` of
+    tool schemas ahead of the system prompt, plus the stable parts so far —
+    reaches MIN_CACHEABLE_TOKENS; the API ignores shorter prefixes anyway.
+    """
+    parts = [p for p in stable if p]
+    if len(parts) > _MAX_CACHE_BREAKPOINTS:
+        raise ValueError(f"at most {_MAX_CACHE_BREAKPOINTS} cacheable prompt parts")
+    blocks: list[dict[str, Any]] = []
+    tokens = prefix_tokens
+    for p in parts:
+        tokens += len(p) // 4
+        block: dict[str, Any] = {"type": "text", "text": p}
+        if tokens >= MIN_CACHEABLE_TOKENS:
+            block["cache_control"] = {"type": "ephemeral"}
+        blocks.append(block)
+    if volatile:
+        blocks.append({"type": "text", "text": volatile})
+    return blocks
+
+
+class PromptCacheStats:
+    """Input-token accounting across all LLM calls: uncached vs read from / written to the prompt cache."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.input_tokens = 0
+        self.cache_read_tokens = 0
+        self.cache_creation_tokens = 0
+
+    def record(self, input_tokens: int, cache_read: int, cache_creation: int) -> None:
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += input_tokens
+            self.cache_read_tokens += cache_read
+            self.cache_creation_tokens += cache_creation
+        if cache_read or cache_creation:
+            logger.debug("[prompt-cache] read=%d written=%d uncached=%d", cache_read, cache_creation, input_tokens)
+
+    def record_usage(self, usage: Any) -> None:
+        """Record an Anthropic `usage` object or dict (input_tokens excludes cached tokens)."""
+        get = usage.get if isinstance(usage, dict) else lambda k: getattr(usage, k, None)
+        self.record(get("input_tokens") or 0, get("cache_read_input_tokens") or 0, get("cache_creation_input_tokens") or 0)
+
+    def record_usage_metadata(self, metadata: dict | None) -> None:
+        """Record LangChain usage_metadata (input_tokens there includes cached tokens)."""
+        if not metadata:
+            return
+        details = metadata.get("input_token_details") or {}
+        read = details.get("cache_read") or 0
+        created = details.get("cache_creation") or 0
+        self.record(max(metadata.get("input_tokens", 0) - read - created, 0), read, created)
+
+    def stats(self) -> dict[str, Any]:
+        total = self.input_tokens + self.cache_read_tokens + self.cache_creation_tokens
+        return {
+            "calls": self.calls,
+            "input_tokens": total,
+            "uncached_input_tokens": self.input_tokens,
+            "cache_read_input_tokens": self.cache_read_tokens,
+            "cache_creation_input_tokens": self.cache_creation_tokens,
+            "cache_read_ratio": round(self.cache_read_tokens / total, 3) if total else 0.0,
+        }
+
+
+prompt_cache_stats = PromptCacheStats()
+
+
+async def create_message(**kwargs):
+    """messages.create on the shared client, admitted through the LLM governor."""
+    chars = len(str(kwargs.get("system", ""))) + len(str(kwargs.get("messages", "")))
+    async with llm_governor.slot(estimate_tokens(chars, kwargs.get("max_tokens", 1024))):
+        response = await get_anthropic_client().messages.create(**kwargs)
+    prompt_cache_stats.record_usage(response.usage)
+    return response
+
+
+@cache
+def _shared_chat_class():
+    from langchain_anthropic import ChatAnthropic
+
+    class SharedChatAnthropic(ChatAnthropic):
+        @cached_property
+        def _async_client(self) -> AsyncAnthropic:
+            return get_anthropic_client()
+
+        def _budget(self, messages) -> int:
+            return estimate_tokens(sum(len(str(m.content)) for m in messages), self.max_tokens)
+
+        async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+            async with llm_governor.slot(self._budget(messages)):
+                result = await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            if result.generations:
+                prompt_cache_stats.record_usage_metadata(getattr(result.generations[0].message, "usage_metadata", None))
+            return result
+
+        async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+            async with llm_governor.slot(self._budget(messages)):
+                async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                    # Usage (incl. cache reads) arrives once, on the final message_delta chunk
+                    usage = getattr(chunk.message, "usage_metadata", None)
+                    if usage and usage.get("input_tokens"):
+                        prompt_cache_stats.record_usage_metadata(usage)
+                    yield chunk
+
+    return SharedChatAnthropic
+
+
+def get_chat_model(model: str, max_tokens: int, **kwargs):
+    """ChatAnthropic whose async calls use the shared client and its pool."""
+    return _shared_chat_class()(
+        model=model,
+        anthropic_api_key=os.getenv("ANTHROPIC_API_KEY"),
+        max_tokens=max_tokens,
+        max_retries=ANTHROPIC_MAX_RETRIES,
+        **kwargs,
+    )
+
+
+async def warm_up_anthropic_client() -> None:
+    """Open a pooled connection to the API so the first LLM call skips the handshake."""
+    try:
+        client = get_anthropic_client()
+        await client._client.head(str(client.base_url), timeout=5)
+    except Exception as e:
+        logger.debug("Anthropic warm-up failed (non-blocking): %s", e)
+
+
+async def close_anthropic_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -0,0 +1,279 @@
+"""Global LLM concurrency governor — one admission queue for every Anthropic call.
+
+Static agents, the orchestrator planner, the LangChain ChatAnthropic wrapper
+and DynamicAgent all acquire a slot here before calling the API. A call is
+admitted only while all three budgets allow it:
+
+- concurrent in-flight calls (LLM_MAX_CONCURRENCY)
+- requests per rolling minute (LLM_REQUESTS_PER_MINUTE)
+- estimated tokens per rolling minute (LLM_TOKENS_PER_MINUTE)
+
+Waiters are served by priority lane — x402-paid and compliant (Mode B)
+requests before free ones — and FIFO within a lane. The lane comes from a
+context variable the endpoints set, so nested calls (cross-agent sub-calls,
+LangChain tool loops) inherit it.
+
+If the estimated queue wait already exceeds LLM_QUEUE_DEADLINE the call is
+shed immediately with LLMOverloadedError; a waiter still queued at the
+deadline is shed the same way. Queue wait times are recorded per lane.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator
+
+logger = logging.getLogger(__name__)
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "50"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "50000"))
+LLM_QUEUE_DEADLINE = float(os.getenv("LLM_QUEUE_DEADLINE", "20"))
+
+PRIORITY_PAID = 0
+PRIORITY_FREE = 1
+LANES = {PRIORITY_PAID: "paid", PRIORITY_FREE: "free"}
+
+_WINDOW = 60.0
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("llm_priority", default=PRIORITY_FREE)
+# Set while the current task holds a slot, so nested wrappers do not re-acquire
+_holding: contextvars.ContextVar[bool] = contextvars.ContextVar("llm_holding", default=False)
+
+
+class LLMOverloadedError(RuntimeError):
+    """Raised when an LLM call cannot be admitted before the queue deadline."""
+
+    def __init__(self, message: str, retry_after: float) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def set_llm_priority(priority: int) -> contextvars.Token:
+    """Set the priority lane for LLM calls made from the current context."""
+    return _priority.set(priority)
+
+
+def llm_priority() -> int:
+    """Priority lane LLM calls from the current context are admitted in."""
+    return _priority.get()
+
+
+def estimate_tokens(text_chars: int, max_tokens: int) -> int:
+    """Rough budget charge: ~4 characters per input token plus the output cap."""
+    return text_chars // 4 + max_tokens
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    tokens: int = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class LLMGovernor:
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        requests_per_minute: int = LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = LLM_TOKENS_PER_MINUTE,
+        queue_deadline: float = LLM_QUEUE_DEADLINE,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.queue_deadline = queue_deadline
+
+        self._active = 0
+        self._queue: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._window: deque[tuple[float, int]] = deque()
+        self._window_tokens = 0
+        self._timer: asyncio.TimerHandle | None = None
+        # EMA of seconds a slot is held; unknown until the first call completes
+        self._service_time: float | None = None
+
+        self.admitted = {lane: 0 for lane in LANES.values()}
+        self.shed = {lane: 0 for lane in LANES.values()}
+        self._waits: dict[str, deque[float]] = {lane: deque(maxlen=500) for lane in LANES.values()}
+
+    # --- budgets ---
+
+    def _prune(self, now: float) -> None:
+        while self._window and now - self._window[0][0] >= _WINDOW:
+            _, tokens = self._window.popleft()
+            self._window_tokens -= tokens
+
+    def _rate_delay(self, tokens: int, now: float) -> float:
+        """Seconds until the rolling window admits a call of `tokens` (0 = now)."""
+        self._prune(now)
+        delay = 0.0
+        if len(self._window) >= self.requests_per_minute:
+            delay = self._window[0][0] + _WINDOW - now
+        # An oversized call is admitted into an empty window rather than never
+        if self._window and self._window_tokens + tokens > self.tokens_per_minute:
+            freed = 0
+            for ts, t in self._window:
+                freed += t
+                if self._window_tokens - freed + tokens <= self.tokens_per_minute:
+                    delay = max(delay, ts + _WINDOW - now)
+                    break
+        return max(delay, 0.0)
+
+    def _estimate_wait(self, priority: int, tokens: int) -> float:
+        ahead = sum(1 for w in self._queue if w.priority <= priority and not w.future.done())
+        over = ahead + 1 - (self.max_concurrency - self._active)
+        # No completed call yet: no basis for a wait estimate, so never shed on it
+        concurrency_wait = max(over, 0) / self.max_concurrency * (self._service_time or 0.0)
+
+        now = time.monotonic()
+        rate_wait = self._rate_delay(tokens, now)
+        # Requests beyond the per-minute budget wait for older calls to age out
+        excess = len(self._window) + ahead + 1 - self.requests_per_minute
+        if 0 < excess <= len(self._window):
+            rate_wait = max(rate_wait, self._window[excess - 1][0] + _WINDOW - now)
+        elif excess > len(self._window):
+            rate_wait = max(rate_wait, _WINDOW * (1 + (excess - len(self._window)) / self.requests_per_minute))
+        return max(concurrency_wait, rate_wait)
+
+    # --- admission ---
+
+    def _admit(self, waiter: _Waiter, now: float) -> None:
+        self._active += 1
+        self._window.append((now, waiter.tokens))
+        self._window_tokens += waiter.tokens
+        lane = LANES[waiter.priority]
+        self.admitted[lane] += 1
+        self._waits[lane].append(now - waiter.enqueued_at)
+
+    def _pump(self) -> None:
+        self._timer = None
+        now = time.monotonic()
+        while self._queue and self._active < self.max_concurrency:
+            head = self._queue[0]
+            if head.future.done():  # shed or cancelled while queued
+                heapq.heappop(self._queue)
+                continue
+            delay = self._rate_delay(head.tokens, now)
+            if delay > 0:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._pump)
+                return
+            heapq.heappop(self._queue)
+            self._admit(head, now)
+            head.future.set_result(now)
+
+    def _drop_abandoned(self) -> None:
+        """Remove shed or cancelled waiters so they neither block admission nor count as load."""
+        live = [w for w in self._queue if not w.future.done()]
+        if len(live) != len(self._queue):
+            heapq.heapify(live)
+            self._queue = live
+
+    def _release(self, held: float | None) -> None:
+        """Free a slot; `held` feeds the service-time EMA (None: slot was never used)."""
+        self._active -= 1
+        if held is not None:
+            self._service_time = held if self._service_time is None else 0.8 * self._service_time + 0.2 * held
+        if self._timer is None:
+            self._pump()
+
+    @asynccontextmanager
+    async def slot(self, tokens: int) -> AsyncIterator[None]:
+        """Hold one admitted LLM call for the duration of the block.
+
+        Re-entrant within a task: nested wrappers around the same call
+        (e.g. LangChain's generate -> stream) share the outer slot.
+        """
+        if _holding.get():
+            yield
+            return
+
+        priority = _priority.get()
+        lane = LANES[priority]
+        now = time.monotonic()
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(priority, next(self._seq), tokens, now, loop.create_future())
+
+        if not self._queue and self._active < self.max_concurrency and self._rate_delay(tokens, now) == 0:
+            self._admit(waiter, now)
+        else:
+            expected = self._estimate_wait(priority, tokens)
+            if expected > self.queue_deadline:
+                self.shed[lane] += 1
+                logger.warning("[llm-governor] shed %s call: estimated wait %.1fs > %.0fs", lane, expected, self.queue_deadline)
+                raise LLMOverloadedError(
+                    f"LLM capacity exhausted: estimated queue wait {expected:.0f}s exceeds {self.queue_deadline:.0f}s. Retry later.",
+                    retry_after=expected,
+                )
+            heapq.heappush(self._queue, waiter)
+            if self._timer is None:
+                self._pump()
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_deadline)
+            except asyncio.TimeoutError:
+                if waiter.future.done() and not waiter.future.cancelled():
+                    self._release(None)  # admitted in the same loop turn the deadline fired
+                else:
+                    waiter.future.cancel()
+                    self._drop_abandoned()
+                self.shed[lane] += 1
+                logger.warning("[llm-governor] shed %s call after waiting %.0fs", lane, self.queue_deadline)
+                raise LLMOverloadedError(
+                    f"LLM capacity exhausted: queued longer than {self.queue_deadline:.0f}s. Retry later.",
+                    retry_after=self._service_time or 1.0,
+                ) from None
+            except asyncio.CancelledError:
+                if waiter.future.done() and not waiter.future.cancelled():
+                    self._release(None)  # admitted just as the caller went away
+                else:
+                    waiter.future.cancel()
+                    self._drop_abandoned()
+                raise
+
+        started = time.monotonic()
+        token = _holding.set(True)
+        try:
+            yield
+        finally:
+            _holding.reset(token)
+            self._release(time.monotonic() - started)
+
+    # --- observability ---
+
+    def stats(self) -> dict[str, Any]:
+        def pct(values: deque, q: float) -> float:
+            if not values:
+                return 0.0
+            ordered = sorted(values)
+            return round(ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000, 1)
+
+        self._prune(time.monotonic())
+        queued = {lane: 0 for lane in LANES.values()}
+        for w in self._queue:
+            if not w.future.done():
+                queued[LANES[w.priority]] += 1
+        return {
+            "active": self._active,
+            "max_concurrency": self.max_concurrency,
+            "queued": queued,
+            "requests_last_minute": len(self._window),
+            "tokens_last_minute": self._window_tokens,
+            "admitted": dict(self.admitted),
+            "shed": dict(self.shed),
+            "queue_wait_ms": {
+                lane: {"p50": pct(w, 0.5), "p95": pct(w, 0.95)} for lane, w in self._waits.items()
+            },
+        }
+
+
+llm_governor = LLMGovernor()
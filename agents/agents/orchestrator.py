@@ -3,11 +3,15 @@ from __future__ import annotations
 import json
 import logging
 import os
+import time
 from typing import Any
 
-from anthropic import AsyncAnthropic
-
 from agents.base_agent import BaseAgent
+from agents.intent_router import IntentRouter
+from agents.llm_client import create_message
+from agents.plan_cache import plan_cache
+from agents.plan_dag import PlanDAG, PlanStep
+from agents.prefetch import prefetcher
 from agents.payments.base_payment import BasePaymentProvider
 from agents.payments.mock_provider import MockPaymentProvider
 from agents.portfolio_analyzer import PortfolioAnalyzerAgent
@@ -48,13 +52,45 @@ Return ONLY valid JSON, no markdown, no explanation:
 """
 
 
+intent_router = IntentRouter(ROUTER_PROMPT)
+
+
 class AgentOrchestrator:
     def __init__(self, payment_provider: BasePaymentProvider | None = None) -> None:
-        self.client = AsyncAnthropic()
         self.payment_provider = payment_provider or MockPaymentProvider()
 
     async def _plan(self, query: str) -> list[dict[str, Any]]:
-        response = await self.client.messages.create(
+        """Plan steps for a query.
+
+        Order: cached plan for the same query shape, then the local intent
+        router when it is confident, then the LLM planner.
+        """
+        steps = plan_cache.get(query, AGENT_REGISTRY)
+        if steps is not None:
+            logger.debug("[orchestrator] plan cache hit")
+            return steps
+
+        decision = intent_router.route(query)
+        if decision.steps is not None:
+            intent_router.record(decision)
+            return decision.steps
+
+        started = time.perf_counter()
+        steps = await self._plan_llm(query)
+        intent_router.record(decision, llm_ms=(time.perf_counter() - started) * 1000)
+        plan_cache.put(query, AGENT_REGISTRY, steps)
+        return steps
+
+    @staticmethod
+    def planning_stats() -> dict[str, Any]:
+        return {
+            "plan_cache": plan_cache.stats(),
+            "router": intent_router.stats(),
+            "prefetch": prefetcher.stats(),
+        }
+
+    async def _plan_llm(self, query: str) -> list[dict[str, Any]]:
+        response = await create_message(
             model="claude-haiku-4-5-20251001",
             max_tokens=300,
             system=ROUTER_PROMPT,
@@ -71,24 +107,26 @@ class AgentOrchestrator:
         return json.loads(content)["steps"]
 
     async def execute(self, query: str, wallet_address: str | None = None) -> dict[str, Any]:
-        steps = await self._plan(query)
-        outputs: list[str] = []
+        # Warm the market data the likely agents read while the planner runs
+        prefetch = prefetcher.begin(intent_router.score(query), wallet_address)
+        try:
+            steps = await self._plan(query)
+            prefetcher.record_plan(steps)
+            return await self._run_plan(steps, wallet_address)
+        finally:
+            prefetcher.finish(prefetch)
+
+    async def _run_plan(self, steps: list[dict[str, Any]], wallet_address: str | None) -> dict[str, Any]:
         hedera_proofs: list[dict] = []
 
-        for i, step in enumerate(steps):
-            agent_name: str = step["agent"]
-            agent_input: str = step["input"]
-
-            # Inject previous outputs using {step_N} placeholders
-            for j, prev in enumerate(outputs):
-                agent_input = agent_input.replace(f"{{step_{j}}}", prev)
+        async def run_step(step: PlanStep) -> str:
+            i, agent_name, agent_input = step.index, step.agent, step.input
 
             agent = AGENT_REGISTRY.get(agent_name)
             if not agent:
-                outputs.append(f"[unknown agent: {agent_name}]")
-                continue
+                return f"[unknown agent: {agent_name}]"
 
-            logger.info("[orchestrator] step %d: %s", i, agent_name)
+            logger.info("[orchestrator] step %d: %s (deps=%s)", i, agent_name, list(step.deps))
             result = await agent.execute(agent_input, wallet_address=wallet_address)
 
             # Optional payment — non-blocking, never crashes the flow
@@ -112,12 +150,25 @@ class AgentOrchestrator:
                 except Exception as h_err:
                     logger.warning("[orchestrator] Hedera attestation skipped: %s", h_err)
 
-            outputs.append(result)
+            return result
+
+        # Steps run as soon as the {step_N} outputs they reference are ready;
+        # a failed step cancels its downstream steps only.
+        dag = PlanDAG(steps)
+        await dag.run(run_step)
+
+        if not dag.steps:
+            final = "No result produced."
+        else:
+            last = dag.steps[-1]
+            final = last.output if last.status == "done" else f"Step {last.index} ({last.agent}) {last.status}: {last.error}"
 
         return {
-            "result": outputs[-1] if outputs else "No result produced.",
+            "result": final,
             "hedera_proof": {
                 "hcs_messages": [p["hcs_tx"] for p in hedera_proofs if p.get("hcs_tx")],
-                "agents_used": [s["agent"] for s in steps],
+                "execution_hashes": [p["execution_hash"] for p in hedera_proofs if p.get("execution_hash")],
+                "agents_used": [s.agent for s in dag.steps if s.status == "done"],
             },
+            "steps": dag.timings(),
         }
@@ -0,0 +1,174 @@
+"""Plan cache for AgentOrchestrator — skips the planner round trip for repeat query shapes.
+
+Queries are normalised before lookup: lower-cased, whitespace collapsed,
+and wallet addresses / Hedera account ids / numbers replaced by indexed
+placeholders. The cached plan stores step inputs with the same placeholders,
+so a hit for "score 0xabc… with 60% ETH" rebinds the new address and numbers
+into the plan instead of replaying the old ones. Queries that repeat a value
+("50% ETH, 50% BTC") are not cached: the plan text cannot tell which
+occurrence each literal came from, so it could not be rebound safely. Nor
+are plans whose inputs still contain an address or number after templating
+(the planner rewrote a value, e.g. "10000" for "$10,000"): the literal would
+leak one caller's wallet or amount into another caller's plan.
+
+Entries expire after a TTL, the least recently used entry is evicted at
+capacity, and the whole cache is dropped when the set of available agents
+changes.
+"""
+from __future__ import annotations
+
+import copy
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Iterable
+
+logger = logging.getLogger(__name__)
+
+PLAN_CACHE_SIZE = int(os.getenv("PLAN_CACHE_SIZE", "256"))
+PLAN_CACHE_TTL = float(os.getenv("PLAN_CACHE_TTL", "3600"))
+
+# Addresses first so their digits are not split into numbers
+_VALUE = re.compile(
+    r"(?P<addr>0x[0-9a-fA-F]{40}\b|\b\d+\.\d+\.\d+\b)|(?P<num>\b\d+(?:[.,]\d+)*\b)"
+)
+_SLOT = re.compile(r"<<(addr|num)(\d+)>>")
+_WS = re.compile(r"\s+")
+
+
+def normalise(query: str) -> tuple[str, list[str]]:
+    """Return (cache key text, placeholder values in order of appearance)."""
+    values: list[str] = []
+
+    def slot(m: re.Match) -> str:
+        values.append(m.group(0))
+        return f"<<{m.lastgroup}{len(values) - 1}>>"
+
+    text = _VALUE.sub(slot, query)
+    return _WS.sub(" ", text).strip().lower(), values
+
+
+def _canonical(value: str) -> str:
+    # Addresses are case-insensitive hex; "10,000" and "10000" are the same number
+    return value.lower().replace(",", "")
+
+
+def _template(text: str, values: list[str]) -> str:
+    """Replace literal query values in a plan input with their placeholders."""
+    index = {_canonical(v): i for i, v in reversed(list(enumerate(values)))}
+
+    def slot(m: re.Match) -> str:
+        i = index.get(_canonical(m.group(0)))
+        return m.group(0) if i is None else f"<<{m.lastgroup}{i}>>"
+
+    return _VALUE.sub(slot, text)
+
+
+def _has_literals(text: str) -> bool:
+    """True when a templated input still holds an address or number outside a placeholder."""
+    return _VALUE.search(_SLOT.sub(" ", text)) is not None
+
+
+def _bind(text: str, values: list[str]) -> str:
+    def value(m: re.Match) -> str:
+        i = int(m.group(2))
+        return values[i] if i < len(values) else m.group(0)
+
+    return _SLOT.sub(value, text)
+
+
+class PlanCache:
+    """LRU + TTL cache of planner output keyed by normalised query."""
+
+    def __init__(self, maxsize: int = PLAN_CACHE_SIZE, ttl: float = PLAN_CACHE_TTL) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, list[dict[str, Any]]]] = OrderedDict()
+        self._agents: tuple[str, ...] = ()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.skipped = 0
+
+    def _check_agents(self, agents: Iterable[str]) -> None:
+        signature = tuple(sorted(agents))
+        if signature != self._agents:
+            if self._entries:
+                logger.info("[plan-cache] agent set changed — dropping %d plans", len(self._entries))
+                self.invalidations += 1
+            self._entries.clear()
+            self._agents = signature
+
+    def get(self, query: str, agents: Iterable[str]) -> list[dict[str, Any]] | None:
+        """Return the cached plan rebound to this query's values, or None."""
+        key, values = normalise(query)
+        with self._lock:
+            self._check_agents(agents)
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            steps = copy.deepcopy(entry[1])
+        for step in steps:
+            step["input"] = _bind(step["input"], values)
+        return steps
+
+    def put(self, query: str, agents: Iterable[str], steps: list[dict[str, Any]]) -> None:
+        """Cache a plan unless its values cannot be rebound safely.
+
+        >>> cache = PlanCache()
+        >>> wallet = "0xAbCd" + "0" * 36
+        >>> cache.put(f"Analyze wallet {wallet} with $10,000", ["risk_scorer"],
+        ...           [{"agent": "risk_scorer", "input": f"analyze {wallet.lower()} worth 10000 USD"}])
+        >>> cache.get("Analyze wallet 0x" + "1" * 40 + " with $5", ["risk_scorer"])
+        [{'agent': 'risk_scorer', 'input': 'analyze 0x1111111111111111111111111111111111111111 worth 5 USD'}]
+        >>> cache.put("top 5 pools", ["yield_optimizer"], [{"agent": "yield_optimizer", "input": "top 3 pools"}])
+        >>> cache.get("top 7 pools", ["yield_optimizer"]) is None
+        True
+        """
+        key, values = normalise(query)
+        if len(set(map(_canonical, values))) != len(values):
+            with self._lock:
+                self.skipped += 1
+            return
+        templated = [{**step, "input": _template(step["input"], values)} for step in steps]
+        if any(_has_literals(step["input"]) for step in templated):
+            with self._lock:
+                self.skipped += 1
+            return
+        with self._lock:
+            self._check_agents(agents)
+            self._entries[key] = (time.monotonic(), templated)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "skipped": self.skipped,
+        }
+
+
+plan_cache = PlanCache()
@@ -0,0 +1,123 @@
+"""Execution DAG for orchestrator plans.
+
+The planner returns an ordered list of steps whose inputs may reference
+earlier outputs with {step_N}. PlanDAG turns that list into a dependency
+graph, starts every step as soon as the steps it references have finished,
+and records per-step status and timing. When a step fails, everything
+downstream of it is cancelled while independent branches keep running.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+_STEP_REF = re.compile(r"\{step_(\d+)\}")
+
+
+@dataclass
+class PlanStep:
+    index: int
+    agent: str
+    template: str
+    deps: tuple[int, ...]
+    status: str = "pending"  # pending | running | done | failed | cancelled
+    input: str | None = None
+    output: str | None = None
+    error: str | None = None
+    started_at: float | None = None
+    finished_at: float | None = None
+    _done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def duration_ms(self) -> float | None:
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return round((self.finished_at - self.started_at) * 1000, 1)
+
+    def timing(self, origin: float) -> dict[str, Any]:
+        return {
+            "step": self.index,
+            "agent": self.agent,
+            "deps": list(self.deps),
+            "status": self.status,
+            "started_ms": None if self.started_at is None else round((self.started_at - origin) * 1000, 1),
+            "duration_ms": self.duration_ms,
+            "error": self.error,
+        }
+
+
+StepRunner = Callable[[PlanStep], Awaitable[str]]
+
+
+class PlanDAG:
+    """Dependency graph over a planner step list."""
+
+    def __init__(self, steps: list[dict[str, Any]]) -> None:
+        self.steps: list[PlanStep] = []
+        for i, step in enumerate(steps):
+            template = step["input"]
+            # Only earlier steps can feed a step; other refs stay literal text
+            deps = tuple(sorted({int(n) for n in _STEP_REF.findall(template) if int(n) < i}))
+            self.steps.append(PlanStep(index=i, agent=step["agent"], template=template, deps=deps))
+        self._tasks: list[asyncio.Task] = []
+        self.started_at: float | None = None
+
+    def _resolve(self, step: PlanStep) -> str:
+        def sub(m: re.Match) -> str:
+            n = int(m.group(1))
+            return self.steps[n].output if n in step.deps else m.group(0)
+        return _STEP_REF.sub(sub, step.template)
+
+    async def _run_step(self, step: PlanStep, runner: StepRunner) -> None:
+        try:
+            for d in step.deps:
+                await self.steps[d]._done.wait()
+            failed = [d for d in step.deps if self.steps[d].status != "done"]
+            if failed:
+                step.status = "cancelled"
+                step.error = f"upstream step(s) {failed} did not complete"
+                return
+
+            step.input = self._resolve(step)
+            step.status = "running"
+            step.started_at = time.perf_counter()
+            try:
+                step.output = await runner(step)
+                step.status = "done"
+            except asyncio.CancelledError:
+                step.status = "cancelled"
+                raise
+            except Exception as e:
+                step.status = "failed"
+                step.error = str(e)
+                logger.warning("[plan] step %d (%s) failed: %s", step.index, step.agent, e)
+            finally:
+                step.finished_at = time.perf_counter()
+        except asyncio.CancelledError:
+            if step.status == "pending":
+                step.status = "cancelled"
+            raise
+        finally:
+            step._done.set()
+
+    async def run(self, runner: StepRunner) -> list[PlanStep]:
+        """Execute every step with `runner`, maximising concurrency. Never raises for step errors."""
+        self.started_at = time.perf_counter()
+        self._tasks = [asyncio.create_task(self._run_step(s, runner)) for s in self.steps]
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        return self.steps
+
+    def cancel(self) -> None:
+        """Cancel every step that has not finished yet."""
+        for task in self._tasks:
+            task.cancel()
+
+    def timings(self) -> list[dict[str, Any]]:
+        origin = self.started_at or 0.0
+        return [s.timing(origin) for s in self.steps]
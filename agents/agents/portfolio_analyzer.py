@@ -1,8 +1,11 @@
 """Portfolio Analyzer Agent — uses real market data from CoinGecko."""
 import json
 
-from anthropic import AsyncAnthropic
 from agents.base_agent import BaseAgent
+from agents.llm_client import cacheable_system
+from agents.llm_governor import LLMOverloadedError
+from agents.prefetch import AGENT_DATA_NEEDS
+from agents.response_cache import cached_completion
 from agents.defi_data import get_token_prices, get_wallet_balances
 import logging
 
@@ -16,6 +19,29 @@ TOKEN_MAP = {
 }
 
 
+# Stable prompt prefix; the live price snapshot follows it as a separate cached block
+_PERSONA = """You are a DeFi portfolio analyzer with access to REAL-TIME market data.
+
+IMPORTANT RULES:
+- NEVER ask the user for more information. Always analyze with whatever data is provided.
+- If the user only holds one token, analyze that single-token portfolio.
+- OG is the native gas token of 0G Chain (a testnet token with no USD market price).
+
+Your job:
+1. Parse the user's portfolio allocation from their query
+2. Calculate USD values using the REAL prices below
+3. Assess concentration risk (>50% in one asset = high risk)
+4. Calculate 24h portfolio change using real 24h change data
+5. Identify any red flags (high concentration, stablecoin-heavy, volatile mix)
+
+ALWAYS use the real prices below in your calculations. Show your math.
+Format your response as a structured analysis with sections:
+- Portfolio Breakdown (with real USD values)
+- 24h Performance
+- Concentration Risk Assessment
+- Key Observations"""
+
+
 class PortfolioAnalyzerAgent(BaseAgent):
     name: str = "portfolio_analyzer"
     description: str = "Analyzes DeFi portfolio composition using real-time market data"
@@ -54,35 +80,17 @@ class PortfolioAnalyzerAgent(BaseAgent):
                     f"That is 100% of my on-chain portfolio. "
                 )
 
-            # 3. Ask Claude to analyze with real data
-            system_prompt = f"""You are a DeFi portfolio analyzer with access to REAL-TIME market data.
-
-CURRENT MARKET PRICES (live from CoinGecko):
-{price_context}
-
-IMPORTANT RULES:
-- NEVER ask the user for more information. Always analyze with whatever data is provided.
-- If the user only holds one token, analyze that single-token portfolio.
-- OG is the native gas token of 0G Chain (a testnet token with no USD market price).
-
-Your job:
-1. Parse the user's portfolio allocation from their query
-2. Calculate USD values using the REAL prices above
-3. Assess concentration risk (>50% in one asset = high risk)
-4. Calculate 24h portfolio change using real 24h change data
-5. Identify any red flags (high concentration, stablecoin-heavy, volatile mix)
-
-ALWAYS use the real prices above in your calculations. Show your math.
-Format your response as a structured analysis with sections:
-- Portfolio Breakdown (with real USD values)
-- 24h Performance
-- Concentration Risk Assessment
-- Key Observations"""
+            # 3. Ask Claude to analyze with real data (persona + price snapshot are prompt-cached)
+            system_prompt = cacheable_system(
+                _PERSONA,
+                f"CURRENT MARKET PRICES (live from CoinGecko):\n{price_context}",
+            )
 
             user_message = holdings_line + query
 
-            client = AsyncAnthropic()
-            response = await client.messages.create(
+            llm_result = await cached_completion(
+                self.name,
+                AGENT_DATA_NEEDS[self.name],
                 model="claude-haiku-4-5-20251001",
                 max_tokens=600,
                 system=system_prompt,
@@ -90,8 +98,9 @@ Format your response as a structured analysis with sections:
                     {"role": "user", "content": user_message},
                 ],
             )
-            llm_result = response.content[0].text or ""
             return wallet_banner + llm_result
+        except LLMOverloadedError:
+            raise
         except Exception as e:
             logger.error(f"Portfolio analyzer error: {e}")
             return f"Portfolio analysis error: {str(e)}"
@@ -0,0 +1,154 @@
+"""Speculative market-data prefetch for orchestrated requests.
+
+Planning is an LLM round trip during which the process would otherwise sit
+idle, yet nearly every plan needs the same market data. When an
+orchestration request arrives, the prefetcher predicts which agents the plan
+will schedule and starts fetching the data those agents read (prices, wallet
+balance, DeFi Llama yields, Bonzo markets, SaucerSwap pools) concurrently
+with planning.
+
+Prediction combines request features (intent-router keyword scores, whether
+a wallet was supplied) with historical plan statistics (how often each agent
+appears in plans). The warmed results are published through a context
+variable; defi_data's fetchers consume a matching prefetch instead of going
+upstream again. Prefetches no scheduled agent consumed are counted per data
+kind so the heuristic can be tuned.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+from collections import Counter
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"
+# Agents whose historical plan frequency reaches this are prefetched for
+PREFETCH_MIN_PROBABILITY = float(os.getenv("PREFETCH_MIN_PROBABILITY", "0.5"))
+
+# Market data each static agent reads during execute()
+AGENT_DATA_NEEDS: dict[str, set[str]] = {
+    "portfolio_analyzer": {"prices", "wallet"},
+    "risk_scorer": {"prices", "wallet"},
+    "yield_optimizer": {"yields", "bonzo", "wallet"},
+}
+# Market data every DynamicAgent reads, whatever its persona
+DYNAMIC_DATA_NEEDS: set[str] = {"prices", "wallet", "bonzo", "saucerswap"}
+
+_active: contextvars.ContextVar[MarketPrefetch | None] = contextvars.ContextVar("market_prefetch", default=None)
+
+
+class MarketPrefetch:
+    """In-flight prefetches for one orchestration request."""
+
+    def __init__(self, wallet_address: str | None) -> None:
+        self.wallet_address = wallet_address
+        self.tasks: dict[str, asyncio.Task] = {}
+        self.used: set[str] = set()
+        self._token: contextvars.Token | None = None
+
+    def start(self, kind: str, fetch: Callable[[], Awaitable[Any]]) -> None:
+        self.tasks[kind] = asyncio.create_task(fetch())
+
+    def take(self, kind: str, key: str | None = None) -> asyncio.Task | None:
+        if kind == "wallet" and key != self.wallet_address:
+            return None
+        task = self.tasks.get(kind)
+        if task is not None:
+            self.used.add(kind)
+        return task
+
+    def unused(self) -> list[str]:
+        return [kind for kind in self.tasks if kind not in self.used]
+
+
+def prefetched(kind: str, key: str | None = None) -> asyncio.Task | None:
+    """Return the active request's prefetch task for `kind`, if any (marks it used)."""
+    prefetch = _active.get()
+    return prefetch.take(kind, key) if prefetch is not None else None
+
+
+class Prefetcher:
+    """Predicts, starts and accounts for per-request market-data prefetches."""
+
+    def __init__(self, min_probability: float = PREFETCH_MIN_PROBABILITY) -> None:
+        self.min_probability = min_probability
+        self._lock = threading.Lock()
+        self.plans = 0
+        self.agent_counts: Counter[str] = Counter()
+        self.started: Counter[str] = Counter()
+        self.used: Counter[str] = Counter()
+        self.unused: Counter[str] = Counter()
+
+    def probability(self, agent: str) -> float:
+        """Laplace-smoothed share of past plans that scheduled `agent`."""
+        return (self.agent_counts[agent] + 1) / (self.plans + 2)
+
+    def predict(self, scores: dict[str, float], wallet_address: str | None) -> set[str]:
+        """Data kinds the likely agents will read."""
+        kinds: set[str] = set()
+        for agent, needs in AGENT_DATA_NEEDS.items():
+            if scores.get(agent, 0.0) >= 1.5 or self.probability(agent) >= self.min_probability:
+                kinds |= needs
+        # Dynamic agents are never keyword-routed; predict them from plan history alone
+        if any(
+            agent not in AGENT_DATA_NEEDS and self.probability(agent) >= self.min_probability
+            for agent in list(self.agent_counts)
+        ):
+            kinds |= DYNAMIC_DATA_NEEDS
+        if not wallet_address:
+            kinds.discard("wallet")
+        return kinds
+
+    def begin(self, scores: dict[str, float], wallet_address: str | None) -> MarketPrefetch:
+        """Start prefetching for a request and make it visible to this context's fetchers."""
+        from agents import defi_data
+
+        prefetch = MarketPrefetch(wallet_address)
+        if PREFETCH_ENABLED:
+            fetchers: dict[str, Callable[[], Awaitable[Any]]] = {
+                "prices": defi_data.get_token_prices,
+                "yields": defi_data.get_defi_yields,
+                "bonzo": defi_data.get_bonzo_data,
+                "saucerswap": defi_data.get_saucerswap_pools,
+                "wallet": lambda: defi_data.get_wallet_balances(wallet_address),
+            }
+            for kind in sorted(self.predict(scores, wallet_address)):
+                prefetch.start(kind, fetchers[kind])
+            logger.debug("[prefetch] started %s", sorted(prefetch.tasks))
+        prefetch._token = _active.set(prefetch)
+        return prefetch
+
+    def record_plan(self, steps: list[dict[str, Any]]) -> None:
+        with self._lock:
+            self.plans += 1
+            self.agent_counts.update({s["agent"] for s in steps})
+
+    def finish(self, prefetch: MarketPrefetch) -> None:
+        """Detach the prefetch, cancel what nobody consumed and update counters."""
+        _active.reset(prefetch._token)
+        unused = prefetch.unused()
+        for kind in unused:
+            prefetch.tasks[kind].cancel()
+        with self._lock:
+            self.started.update(prefetch.tasks.keys())
+            self.used.update(prefetch.used & prefetch.tasks.keys())
+            self.unused.update(unused)
+        if unused:
+            logger.info("[prefetch] unused: %s", unused)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "plans": self.plans,
+            "agent_probability": {a: round(self.probability(a), 3) for a in AGENT_DATA_NEEDS},
+            "started": dict(self.started),
+            "used": dict(self.used),
+            "unused": dict(self.unused),
+        }
+
+
+prefetcher = Prefetcher()
@@ -0,0 +1,216 @@
+"""Shared CoinGecko price cache — per-id TTLs with stale-while-revalidate.
+
+Every price consumer (static agents, the LangChain price tool, dynamic agents)
+reads through one process-wide cache keyed by CoinGecko id:
+
+- fresh entries (age < ttl) are served directly
+- stale entries (ttl <= age < stale_ttl) are served immediately and refreshed
+  in the background
+- missing or expired ids are fetched in a single upstream call
+
+At most one refresh is in flight per id; concurrent callers that need the
+same id await the same task instead of hitting CoinGecko again. Ids that
+CoinGecko leaves out of a successful response are remembered as unknown for
+PRICE_CACHE_MISSING_TTL seconds, so repeat lookups do not refetch them.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+PRICE_TTL = float(os.getenv("PRICE_CACHE_TTL", "5"))
+PRICE_STALE_TTL = float(os.getenv("PRICE_CACHE_STALE_TTL", "120"))
+PRICE_MISSING_TTL = float(os.getenv("PRICE_CACHE_MISSING_TTL", "60"))
+
+# Stablecoins barely move — keep them much longer than volatile assets.
+_TTL_OVERRIDES: dict[str, float] = {
+    "tether": 60.0,
+    "usd-coin": 60.0,
+    "dai": 60.0,
+}
+
+PriceFetcher = Callable[[list[str]], Awaitable[dict]]
+
+
+@dataclass
+class _Entry:
+    data: dict
+    fetched_at: float
+
+
+class PriceCache:
+    """In-memory price cache keyed by CoinGecko id."""
+
+    def __init__(
+        self,
+        ttl: float = PRICE_TTL,
+        stale_ttl: float = PRICE_STALE_TTL,
+        ttl_overrides: dict[str, float] | None = None,
+        missing_ttl: float = PRICE_MISSING_TTL,
+    ) -> None:
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.ttl_overrides = dict(ttl_overrides or {})
+        self.missing_ttl = missing_ttl
+        self._entries: dict[str, _Entry] = {}
+        # Ids upstream returned no data for -> when that was observed
+        self._unknown: dict[str, float] = {}
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.unknown_hits = 0
+
+    def ttl_for(self, cg_id: str) -> float:
+        return self.ttl_overrides.get(cg_id, self.ttl)
+
+    def _age(self, cg_id: str, now: float) -> float | None:
+        entry = self._entries.get(cg_id)
+        return None if entry is None else now - entry.fetched_at
+
+    def _known_unknown(self, cg_id: str, now: float) -> bool:
+        seen = self._unknown.get(cg_id)
+        return seen is not None and now - seen < self.missing_ttl
+
+    def store(self, data: dict, requested: list[str] | None = None) -> None:
+        """Insert upstream price data ({cg_id: {...}}) into the cache.
+
+        Requested ids absent from data are remembered as unknown upstream.
+        """
+        now = time.monotonic()
+        with self._lock:
+            for cg_id, info in data.items():
+                if isinstance(info, dict):
+                    self._entries[cg_id] = _Entry(data=info, fetched_at=now)
+                    self._unknown.pop(cg_id, None)
+            for cg_id in requested or ():
+                if not isinstance(data.get(cg_id), dict):
+                    self._unknown[cg_id] = now
+
+    def peek(self, ids: list[str], allow_stale: bool = True) -> tuple[dict, list[str]]:
+        """Synchronous lookup: return (cached data, ids that must be fetched).
+
+        Used by call sites that are not yet async. Stale entries count as hits
+        when allow_stale is set; no background refresh is scheduled. Ids known
+        to be unknown upstream are in neither.
+        """
+        now = time.monotonic()
+        found: dict = {}
+        missing: list[str] = []
+        with self._lock:
+            for cg_id in ids:
+                age = self._age(cg_id, now)
+                ttl = self.ttl_for(cg_id)
+                limit = max(ttl, self.stale_ttl) if allow_stale else ttl
+                if age is not None and age < limit:
+                    found[cg_id] = self._entries[cg_id].data
+                elif self._known_unknown(cg_id, now):
+                    self.unknown_hits += 1
+                else:
+                    missing.append(cg_id)
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def _start_fetch(self, ids: list[str], fetch: PriceFetcher) -> asyncio.Task:
+        async def _run() -> dict:
+            try:
+                data = await fetch(ids)
+                self.store(data, ids)
+                return data
+            finally:
+                for cg_id in ids:
+                    if self._inflight.get(cg_id) is task:
+                        del self._inflight[cg_id]
+
+        task = asyncio.get_running_loop().create_task(_run())
+        for cg_id in ids:
+            self._inflight[cg_id] = task
+        return task
+
+    @staticmethod
+    def _log_refresh_error(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Background price refresh failed: %s", task.exception())
+
+    async def get_many(self, ids: list[str], fetch: PriceFetcher) -> dict:
+        """Return prices for ids, fetching only what the cache cannot serve.
+
+        Raises if the upstream fetch fails and no cached value exists for
+        any requested id, so callers can apply their own fallback.
+        """
+        now = time.monotonic()
+        result: dict = {}
+        to_fetch: list[str] = []
+        to_refresh: list[str] = []
+        waiting: dict[str, asyncio.Task] = {}
+
+        with self._lock:
+            for cg_id in dict.fromkeys(ids):
+                age = self._age(cg_id, now)
+                inflight = self._inflight.get(cg_id)
+                if age is not None and age < self.ttl_for(cg_id):
+                    result[cg_id] = self._entries[cg_id].data
+                    self.hits += 1
+                elif age is not None and age < self.stale_ttl:
+                    result[cg_id] = self._entries[cg_id].data
+                    self.stale_hits += 1
+                    if inflight is None:
+                        to_refresh.append(cg_id)
+                elif inflight is not None:
+                    waiting[cg_id] = inflight
+                    self.misses += 1
+                elif self._known_unknown(cg_id, now):
+                    self.unknown_hits += 1
+                else:
+                    to_fetch.append(cg_id)
+                    self.misses += 1
+
+        if to_refresh:
+            refresh = self._start_fetch(to_refresh, fetch)
+            refresh.add_done_callback(self._log_refresh_error)
+
+        if to_fetch:
+            task = self._start_fetch(to_fetch, fetch)
+            for cg_id in to_fetch:
+                waiting[cg_id] = task
+
+        errors: list[Exception] = []
+        for task in set(waiting.values()):
+            try:
+                await asyncio.shield(task)
+            except Exception as e:
+                errors.append(e)
+
+        # A failed fetch still serves the last known value, however old.
+        with self._lock:
+            for cg_id in waiting:
+                entry = self._entries.get(cg_id)
+                if entry is not None:
+                    result[cg_id] = entry.data
+
+        if errors and not result:
+            raise errors[0]
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "unknown": len(self._unknown),
+            "unknown_hits": self.unknown_hits,
+            "inflight": len(set(self._inflight.values())),
+        }
+
+
+price_cache = PriceCache(ttl_overrides=_TTL_OVERRIDES)
@@ -0,0 +1,213 @@
+"""Content-addressed cache for static-agent LLM responses.
+
+The static agents render live market data into their system prompt and then
+call Haiku. When neither the data nor the query changed, the answer does not
+need regenerating, so completions are cached under
+
+    sha256(agent_id, model, max_tokens, rendered system prompt, messages)
+
+Because the rendered data is part of the key, a price or APY move produces a
+new key on its own; the TTL only bounds how long an answer may outlive the
+freshness window of the data it was built from (the shortest window among the
+data kinds the agent reads, see DATA_TTLS).
+
+Tiers: a bounded in-memory LRU, plus an optional on-disk tier
+(RESPONSE_CACHE_DIR) that survives restarts and is shared between workers.
+Requests can opt out (ExecuteRequest.no_cache or `Cache-Control: no-cache`);
+an opted-out call skips the lookup but still stores its fresh answer.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable
+
+from agents.llm_client import create_message
+from agents.price_cache import PRICE_STALE_TTL
+from agents.yield_index import YIELD_REFRESH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+RESPONSE_CACHE_DIR = os.getenv("RESPONSE_CACHE_DIR", "")
+
+# How long an answer may be served for, per data kind it was rendered from
+DATA_TTLS: dict[str, float] = {
+    "prices": PRICE_STALE_TTL,
+    "yields": YIELD_REFRESH_SECONDS,
+    "bonzo": float(os.getenv("RESPONSE_CACHE_BONZO_TTL", "300")),
+    "wallet": float(os.getenv("RESPONSE_CACHE_WALLET_TTL", "30")),
+}
+_DEFAULT_TTL = 60.0
+
+_bypass: contextvars.ContextVar[bool] = contextvars.ContextVar("response_cache_bypass", default=False)
+
+
+def bypass_response_cache(bypass: bool = True) -> contextvars.Token:
+    """Skip response-cache lookups for LLM calls made from the current context."""
+    return _bypass.set(bypass)
+
+
+def response_cache_bypassed() -> bool:
+    return _bypass.get()
+
+
+def ttl_for(kinds: Iterable[str]) -> float:
+    """Shortest freshness window among the data kinds an answer was built from."""
+    return min((DATA_TTLS.get(k, _DEFAULT_TTL) for k in kinds), default=_DEFAULT_TTL)
+
+
+def cache_key(agent_id: str, model: str, max_tokens: int, system: Any, messages: Any) -> str:
+    payload = json.dumps([agent_id, model, max_tokens, system, messages], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+@dataclass
+class _Entry:
+    text: str
+    expires_at: float  # wall clock, so disk entries stay valid across restarts
+    generation_ms: float
+
+
+class ResponseCache:
+    """In-memory LRU with an optional JSON-file disk tier."""
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE, directory: str = RESPONSE_CACHE_DIR) -> None:
+        self.maxsize = maxsize
+        self.directory = Path(directory) if directory else None
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.generated = 0
+        self.saved_ms = 0.0
+        self.generation_ms = 0.0
+
+    # --- disk tier ---
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _read_disk(self, key: str) -> _Entry | None:
+        path = self._path(key)
+        try:
+            raw = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+        entry = _Entry(raw["text"], raw["expires_at"], raw.get("generation_ms", 0.0))
+        if entry.expires_at <= time.time():
+            path.unlink(missing_ok=True)
+            return None
+        return entry
+
+    def _write_disk(self, key: str, entry: _Entry) -> None:
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(entry.__dict__))
+            tmp.replace(path)
+        except OSError as e:
+            logger.debug("[response-cache] disk write failed: %s", e)
+
+    # --- lookups ---
+
+    def _remember(self, key: str, entry: _Entry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    async def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self.saved_ms += entry.generation_ms
+                    return entry.text
+                del self._entries[key]
+
+        if self.directory is not None:
+            entry = await asyncio.to_thread(self._read_disk, key)
+            if entry is not None:
+                self._remember(key, entry)
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                    self.saved_ms += entry.generation_ms
+                return entry.text
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    async def put(self, key: str, text: str, ttl: float, generation_ms: float) -> None:
+        entry = _Entry(text, time.time() + ttl, generation_ms)
+        self._remember(key, entry)
+        with self._lock:
+            self.generated += 1
+            self.generation_ms += generation_ms
+        if self.directory is not None:
+            await asyncio.to_thread(self._write_disk, key, entry)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": RESPONSE_CACHE_ENABLED,
+            "entries": len(self._entries),
+            "disk_tier": str(self.directory) if self.directory else None,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "latency_saved_ms": round(self.saved_ms, 1),
+            "mean_generation_ms": round(self.generation_ms / self.generated, 1) if self.generated else 0.0,
+        }
+
+
+response_cache = ResponseCache()
+
+
+async def cached_completion(
+    agent_id: str, data_kinds: Iterable[str], *, model: str, max_tokens: int, system: Any, messages: list[dict],
+) -> str:
+    """Text of messages.create(...) for a static agent, served from the response cache when possible."""
+    if not RESPONSE_CACHE_ENABLED:
+        response = await create_message(model=model, max_tokens=max_tokens, system=system, messages=messages)
+        return response.content[0].text or ""
+
+    key = cache_key(agent_id, model, max_tokens, system, messages)
+    if response_cache_bypassed():
+        response_cache.bypassed += 1
+    else:
+        text = await response_cache.get(key)
+        if text is not None:
+            logger.info("[response-cache] hit for %s", agent_id)
+            return text
+
+    started = time.perf_counter()
+    response = await create_message(model=model, max_tokens=max_tokens, system=system, messages=messages)
+    text = response.content[0].text or ""
+    if text:
+        await response_cache.put(key, text, ttl_for(data_kinds), (time.perf_counter() - started) * 1000)
+    return text
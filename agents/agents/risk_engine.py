@@ -0,0 +1,148 @@
+"""Vectorized portfolio risk engine — one scoring model for every caller.
+
+Portfolios are scored as a matrix (rows = portfolios, cols = assets) against
+per-asset volatility, 24h change and stablecoin vectors, so scoring N
+portfolios is a handful of NumPy operations instead of N Python loops.
+
+Sub-scores (total 0-10):
+- Volatility (0-3): weighted annualized volatility
+- Concentration (0-3): largest single-asset weight
+- Stablecoin exposure (0-2): more stables = lower risk
+- 24h drawdown (0-2): weighted 24h price change
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Sequence
+
+import numpy as np
+
+STABLECOINS = {"USDC", "USDT", "DAI", "BUSD"}
+
+# Volatility assumed for assets without usable price history (stablecoins included)
+DEFAULT_VOLATILITY = 50.0
+
+
+def annualized_volatility(prices: Sequence[float]) -> float:
+    """Annualized volatility (%) of a price series from daily returns."""
+    if len(prices) < 3:
+        return 0.0
+    p = np.asarray(prices, dtype=float)
+    returns = np.diff(p) / p[:-1]
+    return float(np.std(returns, ddof=1) * np.sqrt(365) * 100)
+
+
+def classify(score: float) -> str:
+    if score >= 7:
+        return "HIGH RISK"
+    if score >= 5:
+        return "ELEVATED RISK"
+    if score >= 3:
+        return "MODERATE RISK"
+    return "LOW RISK"
+
+
+@dataclass
+class RiskScores:
+    """Per-portfolio score arrays, all of shape (n_portfolios,)."""
+
+    total: np.ndarray
+    volatility: np.ndarray
+    concentration: np.ndarray
+    stablecoin_exposure: np.ndarray
+    drawdown_24h: np.ndarray
+    weighted_volatility_pct: np.ndarray
+    weighted_24h_change_pct: np.ndarray
+    max_single_asset_weight: np.ndarray
+    stablecoin_pct: np.ndarray
+
+    def breakdown(self, i: int) -> dict:
+        """Rounded sub-scores and inputs for portfolio i."""
+        return {
+            "volatility": round(float(self.volatility[i]), 2),
+            "concentration": round(float(self.concentration[i]), 2),
+            "stablecoin_exposure": round(float(self.stablecoin_exposure[i]), 2),
+            "drawdown_24h": round(float(self.drawdown_24h[i]), 2),
+            "weighted_volatility_pct": round(float(self.weighted_volatility_pct[i]), 1),
+            "weighted_24h_change_pct": round(float(self.weighted_24h_change_pct[i]), 2),
+            "max_single_asset_weight": round(float(self.max_single_asset_weight[i]) * 100, 1),
+            "stablecoin_pct": round(float(self.stablecoin_pct[i]) * 100, 1),
+        }
+
+
+def portfolio_matrix(portfolios: Sequence[dict[str, float]], assets: Sequence[str]) -> np.ndarray:
+    """Pack {symbol: allocation} dicts into a (n_portfolios, n_assets) matrix."""
+    col = {a: j for j, a in enumerate(assets)}
+    m = np.zeros((len(portfolios), len(assets)))
+    for i, holdings in enumerate(portfolios):
+        for symbol, pct in holdings.items():
+            m[i, col[symbol]] = pct
+    return m
+
+
+def score_portfolios(
+    allocations: np.ndarray,
+    volatility: np.ndarray,
+    change_24h: np.ndarray,
+    stable: np.ndarray,
+) -> RiskScores:
+    """Score every row of `allocations` (any positive units, normalised per row).
+
+    volatility / change_24h are per-asset percentages, stable is a per-asset
+    boolean mask.
+    """
+    allocations = np.atleast_2d(np.asarray(allocations, dtype=float))
+    totals = allocations.sum(axis=1, keepdims=True)
+    weights = allocations / np.where(totals == 0, 1.0, totals)
+
+    weighted_vol = weights @ np.asarray(volatility, dtype=float)
+    vol_score = np.where(
+        weighted_vol < 20,
+        weighted_vol / 20.0,
+        np.where(weighted_vol < 60, 1.0 + (weighted_vol - 20) / 40.0 * 2.0, 3.0),
+    )
+
+    max_weight = weights.max(axis=1) if weights.shape[1] else np.zeros(len(weights))
+    conc_score = np.select(
+        [max_weight > 0.7, max_weight > 0.5, max_weight > 0.3], [3.0, 2.0, 1.0], default=0.5,
+    )
+
+    stable_pct = weights @ np.asarray(stable, dtype=float)
+    stable_score = 2.0 * (1.0 - stable_pct)
+
+    weighted_24h = weights @ np.asarray(change_24h, dtype=float)
+    loss = np.abs(weighted_24h)
+    drawdown_score = np.select(
+        [weighted_24h >= 0, weighted_24h > -2, weighted_24h > -5],
+        [0.0, loss / 2.0, 1.0 + (loss - 2) / 3.0],
+        default=2.0,
+    )
+
+    total = np.clip(np.round(vol_score + conc_score + stable_score + drawdown_score, 1), 0.0, 10.0)
+
+    return RiskScores(
+        total=total,
+        volatility=vol_score,
+        concentration=conc_score,
+        stablecoin_exposure=stable_score,
+        drawdown_24h=drawdown_score,
+        weighted_volatility_pct=weighted_vol,
+        weighted_24h_change_pct=weighted_24h,
+        max_single_asset_weight=max_weight,
+        stablecoin_pct=stable_pct,
+    )
+
+
+def asset_vectors(
+    assets: Sequence[str],
+    volatilities: dict[str, float],
+    changes_24h: dict[str, float],
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Build (volatility, change_24h, stable) vectors aligned with `assets`.
+
+    Assets missing from `volatilities` get DEFAULT_VOLATILITY.
+    """
+    stable = np.array([a.upper() in STABLECOINS for a in assets], dtype=bool)
+    vol = np.array([volatilities.get(a, DEFAULT_VOLATILITY) for a in assets], dtype=float)
+    change = np.array([changes_24h.get(a, 0.0) or 0.0 for a in assets], dtype=float)
+    return vol, change, stable
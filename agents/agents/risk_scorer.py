@@ -1,12 +1,24 @@
 """Risk Scorer Agent — deterministic scoring from real market data."""
+import asyncio
 import json
+import os
 
-from anthropic import AsyncAnthropic
 from agents.base_agent import BaseAgent
+from agents.llm_client import cacheable_system
+from agents.llm_governor import LLMOverloadedError
+from agents.prefetch import AGENT_DATA_NEEDS
+from agents.response_cache import cached_completion
 from agents.defi_data import get_token_prices, get_token_history, get_wallet_balances
+from agents.risk_engine import (
+    DEFAULT_VOLATILITY,
+    annualized_volatility,
+    asset_vectors,
+    classify,
+    portfolio_matrix,
+    score_portfolios,
+)
 import logging
 import re
-import statistics
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +30,11 @@ TOKEN_MAP = {
     "DAI": "dai", "SOL": "solana", "MATIC": "matic-network", "AVAX": "avalanche-2",
 }
 
-STABLECOINS = {"USDC", "USDT", "DAI"}
+# Seconds the history phase may take before missing tokens fall back
+HISTORY_DEADLINE = float(os.getenv("RISK_HISTORY_DEADLINE", "6"))
+
+# Last successfully computed volatility per CoinGecko id
+_volatility_cache: dict[str, float] = {}
 
 
 def parse_portfolio(query: str) -> dict[str, float]:
@@ -55,14 +71,48 @@ def parse_portfolio(query: str) -> dict[str, float]:
 
 def compute_volatility(prices: list[float]) -> float:
     """Compute annualized volatility from a price series."""
-    if len(prices) < 2:
-        return 0.0
-    returns = [(prices[i] - prices[i - 1]) / prices[i - 1] for i in range(1, len(prices))]
-    if not returns:
-        return 0.0
-    daily_std = statistics.stdev(returns) if len(returns) > 1 else 0.0
-    # Annualize (sqrt of 365)
-    return daily_std * (365 ** 0.5) * 100  # as percentage
+    return annualized_volatility(prices)
+
+
+async def fetch_volatilities(
+    portfolio: dict[str, float],
+    deadline: float = HISTORY_DEADLINE,
+) -> tuple[dict[str, float], dict[str, str]]:
+    """Fetch 30-day history for all tokens concurrently and compute volatility.
+
+    Fetches share the CoinGecko concurrency limit. Tokens whose history is
+    empty or misses the deadline use their last cached volatility, else the
+    engine default. Returns (volatilities, fallbacks) where fallbacks maps
+    each such token to "cached" or "default".
+    """
+    tasks = {
+        token: asyncio.create_task(get_token_history(TOKEN_MAP[token], days=30))
+        for token in portfolio
+        if token in TOKEN_MAP
+    }
+    done: set = set()
+    if tasks:
+        done, pending = await asyncio.wait(tasks.values(), timeout=deadline)
+        for task in pending:
+            task.cancel()
+
+    volatilities: dict[str, float] = {}
+    fallbacks: dict[str, str] = {}
+    for token, task in tasks.items():
+        cg_id = TOKEN_MAP[token]
+        history = task.result() if task in done else []
+        if len(history) >= 2:
+            volatilities[token] = _volatility_cache[cg_id] = compute_volatility(history)
+        elif cg_id in _volatility_cache:
+            volatilities[token] = _volatility_cache[cg_id]
+            fallbacks[token] = "cached"
+        else:
+            volatilities[token] = DEFAULT_VOLATILITY
+            fallbacks[token] = "default"
+
+    if fallbacks:
+        logger.info(f"Volatility fallbacks (deadline {deadline}s): {fallbacks}")
+    return volatilities, fallbacks
 
 
 def compute_risk_score(
@@ -72,74 +122,65 @@ def compute_risk_score(
 ) -> tuple[float, dict]:
     """Compute a deterministic risk score 0-10 from real data.
 
-    Sub-scores:
-    - Volatility (0-3): weighted avg volatility of portfolio
-    - Concentration (0-3): how concentrated in a single asset
-    - Stablecoin ratio (0-2): more stables = lower risk
-    - 24h drawdown (0-2): based on actual 24h changes
+    Single-portfolio view of risk_engine.score_portfolios; see that module
+    for the sub-score definitions.
     """
-    total_pct = sum(portfolio.values()) or 1.0
-
-    # --- Volatility score (0-3) ---
-    weighted_vol = 0.0
-    for token, pct in portfolio.items():
-        vol = volatilities.get(token, 50.0)  # default high if unknown
-        weighted_vol += (pct / total_pct) * vol
-    # Map: 0-20% vol → 0, 20-60% → 1-2, 60%+ → 3
-    if weighted_vol < 20:
-        vol_score = weighted_vol / 20.0
-    elif weighted_vol < 60:
-        vol_score = 1.0 + (weighted_vol - 20) / 40.0 * 2.0
-    else:
-        vol_score = 3.0
-
-    # --- Concentration score (0-3) ---
-    weights = [pct / total_pct for pct in portfolio.values()]
-    max_weight = max(weights) if weights else 0
-    if max_weight > 0.7:
-        conc_score = 3.0
-    elif max_weight > 0.5:
-        conc_score = 2.0
-    elif max_weight > 0.3:
-        conc_score = 1.0
-    else:
-        conc_score = 0.5
-
-    # --- Stablecoin ratio score (0-2) — more stables = LOWER risk ---
-    stable_pct = sum(pct for token, pct in portfolio.items() if token in STABLECOINS) / total_pct
-    stable_score = 2.0 * (1.0 - stable_pct)  # 100% stable → 0, 0% stable → 2
-
-    # --- 24h drawdown score (0-2) ---
-    weighted_24h = 0.0
-    for token, pct in portfolio.items():
-        cg_id = TOKEN_MAP.get(token, "")
-        change = prices.get(cg_id, {}).get("usd_24h_change", 0) or 0
-        weighted_24h += (pct / total_pct) * change
-    # Map: positive → 0, -2% → 1, -5%+ → 2
-    if weighted_24h >= 0:
-        drawdown_score = 0.0
-    elif weighted_24h > -2:
-        drawdown_score = abs(weighted_24h) / 2.0
-    elif weighted_24h > -5:
-        drawdown_score = 1.0 + (abs(weighted_24h) - 2) / 3.0
-    else:
-        drawdown_score = 2.0
-
-    total = round(vol_score + conc_score + stable_score + drawdown_score, 1)
-    total = min(10.0, max(0.0, total))
-
-    breakdown = {
-        "volatility": round(vol_score, 2),
-        "concentration": round(conc_score, 2),
-        "stablecoin_exposure": round(stable_score, 2),
-        "drawdown_24h": round(drawdown_score, 2),
-        "weighted_volatility_pct": round(weighted_vol, 1),
-        "weighted_24h_change_pct": round(weighted_24h, 2),
-        "max_single_asset_weight": round(max_weight * 100, 1),
-        "stablecoin_pct": round(stable_pct * 100, 1),
-    }
+    assets = list(portfolio)
+    changes = {t: prices.get(TOKEN_MAP.get(t, ""), {}).get("usd_24h_change", 0) for t in assets}
+    vol, change, stable = asset_vectors(assets, volatilities, changes)
+    scores = score_portfolios(portfolio_matrix([portfolio], assets), vol, change, stable)
+    return float(scores.total[0]), scores.breakdown(0)
+
+
+async def score_portfolio_batch(
+    portfolios: list[dict[str, float]],
+    volatilities: dict[str, float] | None = None,
+    changes_24h: dict[str, float] | None = None,
+) -> list[dict]:
+    """Score many portfolios in one vectorized pass.
+
+    Market inputs not supplied by the caller are fetched once for the union
+    of assets (prices from the shared cache, volatility from price history).
+    """
+    assets = sorted({t.upper() for p in portfolios for t in p})
+    portfolios = [{t.upper(): pct for t, pct in p.items()} for p in portfolios]
+    volatilities = {t.upper(): v for t, v in (volatilities or {}).items()}
+    changes_24h = {t.upper(): c for t, c in (changes_24h or {}).items()}
+
+    known = [t for t in assets if t in TOKEN_MAP]
+    need_vol = dict.fromkeys(t for t in known if t not in volatilities)
+    need_change = [TOKEN_MAP[t] for t in known if t not in changes_24h]
+    prices_task = get_token_prices(need_change) if need_change else asyncio.sleep(0, result={})
+    prices, (fetched_vol, _) = await asyncio.gather(prices_task, fetch_volatilities(need_vol))
+    volatilities.update(fetched_vol)
+    for t in known:
+        if t not in changes_24h:
+            changes_24h[t] = prices.get(TOKEN_MAP[t], {}).get("usd_24h_change", 0)
+
+    vol, change, stable = asset_vectors(assets, volatilities, changes_24h)
+    scores = score_portfolios(portfolio_matrix(portfolios, assets), vol, change, stable)
+    return [
+        {
+            "total_score": float(scores.total[i]),
+            "classification": classify(float(scores.total[i])),
+            "breakdown": scores.breakdown(i),
+        }
+        for i in range(len(portfolios))
+    ]
+
 
-    return total, breakdown
+# Stable prompt prefix; the per-request portfolio, data and score follow it
+_PERSONA = """You are a DeFi risk analyst. A risk score has ALREADY been computed from real data.
+Your job is to EXPLAIN the score — do NOT change it.
+
+IMPORTANT: NEVER ask the user for more information. Always analyze with whatever data is provided.
+
+RULES:
+1. Report the COMPUTED RISK SCORE given below exactly — do not change it
+2. Explain each sub-score using the real numbers below
+3. Classify: 0-3 = Low Risk, 3-5 = Moderate, 5-7 = Elevated, 7-10 = High Risk
+4. Provide 2-3 actionable suggestions to reduce risk
+5. Keep the response structured and concise"""
 
 
 class RiskScorerAgent(BaseAgent):
@@ -157,19 +198,15 @@ class RiskScorerAgent(BaseAgent):
             # 2. Determine which tokens to fetch
             cg_ids = [TOKEN_MAP[t] for t in portfolio if t in TOKEN_MAP]
 
-            # 3. Fetch real prices
-            prices = await get_token_prices(cg_ids) if cg_ids else {}
-
-            # 4. Fetch real price history and compute volatility
-            volatilities: dict[str, float] = {}
-            for token in portfolio:
-                cg_id = TOKEN_MAP.get(token)
-                if cg_id:
-                    history = await get_token_history(cg_id, days=30)
-                    volatilities[token] = compute_volatility(history)
+            # 3-4. Fetch real prices and price history concurrently, compute volatility
+            prices_task = get_token_prices(cg_ids) if cg_ids else asyncio.sleep(0, result={})
+            prices, (volatilities, vol_fallbacks) = await asyncio.gather(
+                prices_task, fetch_volatilities(portfolio),
+            )
 
             # 5. Compute deterministic risk score
             total_score, breakdown = compute_risk_score(portfolio, prices, volatilities)
+            breakdown["volatility_fallbacks"] = vol_fallbacks
 
             # 6. Build context for LLM explanation
             price_lines = []
@@ -180,8 +217,13 @@ class RiskScorerAgent(BaseAgent):
                     f"- {token}: ${p.get('usd', 'N/A')} (24h: {p.get('usd_24h_change', 0):.2f}%)"
                 )
 
+            fallback_notes = {
+                "cached": " (live history unavailable — last known value)",
+                "default": " (live history unavailable — default estimate)",
+            }
             vol_lines = [
                 f"- {token}: {volatilities.get(token, 0):.1f}% annualized"
+                f"{fallback_notes.get(vol_fallbacks.get(token, ''), '')}"
                 for token in portfolio
             ]
 
@@ -206,12 +248,8 @@ class RiskScorerAgent(BaseAgent):
                     f"That is 100% of my on-chain portfolio. "
                 )
 
-            system_prompt = f"""You are a DeFi risk analyst. A risk score has ALREADY been computed from real data.
-Your job is to EXPLAIN the score — do NOT change it.
-
-IMPORTANT: NEVER ask the user for more information. Always analyze with whatever data is provided.
-
-PORTFOLIO:
+            # Persona and rules are prompt-cached; the portfolio and its score vary per request
+            system_prompt = cacheable_system(_PERSONA, volatile=f"""PORTFOLIO:
 {chr(10).join(portfolio_lines)}
 
 REAL-TIME PRICES (CoinGecko):
@@ -228,17 +266,13 @@ SCORE BREAKDOWN:
 - Stablecoin exposure sub-score: {breakdown['stablecoin_exposure']}/2 (stablecoin allocation: {breakdown['stablecoin_pct']}%)
 - 24h Drawdown sub-score: {breakdown['drawdown_24h']}/2 (weighted 24h change: {breakdown['weighted_24h_change_pct']}%)
 
-RULES:
-1. Report the score as {total_score}/10 — do not change it
-2. Explain each sub-score using the real numbers above
-3. Classify: 0-3 = Low Risk, 3-5 = Moderate, 5-7 = Elevated, 7-10 = High Risk
-4. Provide 2-3 actionable suggestions to reduce risk
-5. Keep the response structured and concise"""
+Report the score as {total_score}/10 — do not change it.""")
 
             user_message = holdings_line + query
 
-            client = AsyncAnthropic()
-            response = await client.messages.create(
+            llm_result = await cached_completion(
+                self.name,
+                AGENT_DATA_NEEDS[self.name],
                 model="claude-haiku-4-5-20251001",
                 max_tokens=600,
                 system=system_prompt,
@@ -246,8 +280,9 @@ RULES:
                     {"role": "user", "content": user_message},
                 ],
             )
-            llm_result = response.content[0].text or ""
             return wallet_banner + llm_result
+        except LLMOverloadedError:
+            raise
         except Exception as e:
             logger.error(f"Risk scorer error: {e}")
             return f"Risk scoring error: {str(e)}"
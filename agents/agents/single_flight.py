@@ -0,0 +1,73 @@
+"""Single-flight request coalescing for identical concurrent executions.
+
+When the same (agent_id, query, wallet_address) execution is already in
+flight in the same LLM priority lane — a trending prompt, or a frontend double-submit — later callers
+attach to the running task and share its result instead of paying the LLM
+and every upstream fetch again. Only the execution is shared: payment
+checks, settlement, HCS attestations and AFC rewards stay with each caller.
+
+A caller that goes away (client disconnect, orchestration timeout) detaches
+without cancelling the shared task; the task is cancelled only once every
+attached caller has gone. Entries are removed as soon as the task finishes,
+so nothing is cached beyond the in-flight window.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key onto one asyncio task."""
+
+    def __init__(self) -> None:
+        self._flights: dict[Hashable, _Flight] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await fn() — or the identical call already in flight for `key`."""
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _t, k=key, f=flight: self._done(k, f))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+            logger.info("[single-flight] coalesced onto in-flight execution (%d waiting)", flight.waiters + 1)
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    def _done(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Nobody left to observe the outcome; retrieve it so asyncio does not warn
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    def stats(self) -> dict[str, Any]:
+        total = self.leaders + self.coalesced
+        return {
+            "in_flight": len(self._flights),
+            "executions": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesce_rate": round(self.coalesced / total, 3) if total else 0.0,
+        }
@@ -0,0 +1,321 @@
+"""DeFi Llama yield index — background ingestion into a compact column store.
+
+The full yields.llama.fi/pools payload is tens of MB, so instead of
+downloading it per request a background ingester refreshes it on a schedule
+(with ETag / Last-Modified conditional requests) and loads it into a
+YieldIndex:
+
+- one typed array per numeric column (tvl, apy, apy_base, apy_reward)
+- project / chain stored as small integer codes, stable flag as a bytearray
+- rows pre-sorted by APY descending, with per-project and per-chain
+  posting lists, so a query walks only the candidate rows in APY order and
+  stops as soon as it has `limit` matches
+
+Before the first ingestion completes, callers fall back to streaming the
+payload through PoolStreamParser + TopPools, which decode pools one at a
+time and keep only the running top-N, so a cold request holds O(N) pools
+instead of the whole response.
+"""
+from __future__ import annotations
+
+import asyncio
+import codecs
+import heapq
+import json
+import logging
+import os
+import re
+import time
+from array import array
+from typing import Iterable
+
+from agents.http_clients import get_http_client
+
+logger = logging.getLogger(__name__)
+
+POOLS_URL = "https://yields.llama.fi/pools"
+YIELD_REFRESH_SECONDS = float(os.getenv("YIELD_REFRESH_SECONDS", "300"))
+
+
+class YieldIndex:
+    """Immutable column-oriented index over DeFi Llama pools."""
+
+    def __init__(self, pools: Iterable[dict]) -> None:
+        rows = [p for p in pools if p.get("apy") is not None and p.get("tvlUsd") is not None]
+        rows.sort(key=lambda p: p["apy"], reverse=True)
+
+        self.projects: list[str] = []
+        self.chains: list[str] = []
+        project_codes: dict[str, int] = {}
+        chain_codes: dict[str, int] = {}
+
+        self.project = array("H")
+        self.chain = array("H")
+        self.symbol: list[str] = []
+        self.tvl = array("d")
+        self.apy = array("d")
+        self.apy_base = array("d")
+        self.apy_reward = array("d")
+        self.stable = bytearray()
+        self.by_project: dict[str, array] = {}
+        self.by_chain: dict[str, array] = {}
+
+        for i, p in enumerate(rows):
+            project, chain = p["project"], p["chain"]
+            if project not in project_codes:
+                project_codes[project] = len(self.projects)
+                self.projects.append(project)
+                self.by_project[project] = array("I")
+            if chain not in chain_codes:
+                chain_codes[chain] = len(self.chains)
+                self.chains.append(chain)
+                self.by_chain[chain] = array("I")
+
+            self.project.append(project_codes[project])
+            self.chain.append(chain_codes[chain])
+            self.symbol.append(p.get("symbol", ""))
+            self.tvl.append(float(p["tvlUsd"]))
+            self.apy.append(float(p["apy"]))
+            self.apy_base.append(float(p.get("apyBase") or 0))
+            self.apy_reward.append(float(p.get("apyReward") or 0))
+            self.stable.append(1 if p.get("stablecoin") else 0)
+            self.by_project[project].append(i)
+            self.by_chain[chain].append(i)
+
+        self.chain_codes = chain_codes
+        self.project_codes = project_codes
+
+    def __len__(self) -> int:
+        return len(self.apy)
+
+    def _row(self, i: int) -> dict:
+        return {
+            "protocol": self.projects[self.project[i]],
+            "chain": self.chains[self.chain[i]],
+            "pool": self.symbol[i],
+            "tvl": self.tvl[i],
+            "apy": self.apy[i],
+            "apy_base": self.apy_base[i],
+            "apy_reward": self.apy_reward[i],
+            "stable": bool(self.stable[i]),
+        }
+
+    def query(
+        self,
+        protocols: Iterable[str] | None = None,
+        chains: Iterable[str] | None = None,
+        min_tvl: float = 0.0,
+        min_apy: float = 0.0,
+        stable: bool | None = None,
+        limit: int = 20,
+    ) -> list[dict]:
+        """Top `limit` pools by APY with tvl > min_tvl and apy > min_apy."""
+        chain_filter = None
+        if chains is not None:
+            chain_filter = {self.chain_codes[c] for c in chains if c in self.chain_codes}
+
+        # Posting lists hold ascending row ids, i.e. descending APY, so a
+        # k-way merge keeps the global APY order without sorting.
+        if protocols is not None:
+            candidates: Iterable[int] = heapq.merge(
+                *(self.by_project[p] for p in protocols if p in self.by_project)
+            )
+        elif chain_filter is not None:
+            candidates = heapq.merge(*(self.by_chain[self.chains[c]] for c in chain_filter))
+            chain_filter = None
+        else:
+            candidates = range(len(self))
+
+        out: list[dict] = []
+        tvl, apy, chain, stab = self.tvl, self.apy, self.chain, self.stable
+        for i in candidates:
+            if apy[i] <= min_apy:
+                break
+            if tvl[i] <= min_tvl:
+                continue
+            if chain_filter is not None and chain[i] not in chain_filter:
+                continue
+            if stable is not None and bool(stab[i]) != stable:
+                continue
+            out.append(self._row(i))
+            if len(out) >= limit:
+                break
+        return out
+
+
+# --- Streaming parse (cold path) ---
+
+_DATA_ARRAY = re.compile(r'"data"\s*:\s*\[')
+
+
+class PoolStreamParser:
+    """Incrementally decodes the objects of the top-level "data" array.
+
+    feed() accepts raw response chunks and returns the pool dicts completed
+    so far; only the unparsed tail of the stream is buffered.
+    """
+
+    def __init__(self) -> None:
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buf = ""
+        self._in_array = False
+        self.done = False
+
+    def feed(self, chunk: bytes) -> list[dict]:
+        if self.done:
+            return []
+        self._buf += self._text.decode(chunk)
+
+        if not self._in_array:
+            m = _DATA_ARRAY.search(self._buf)
+            if not m:
+                # Keep a short tail in case the key straddles two chunks
+                self._buf = self._buf[-16:]
+                return []
+            self._buf = self._buf[m.end():]
+            self._in_array = True
+
+        out: list[dict] = []
+        buf, pos, n = self._buf, 0, len(self._buf)
+        while True:
+            while pos < n and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= n:
+                break
+            if buf[pos] == "]":
+                self.done = True
+                break
+            try:
+                obj, pos = self._json.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break  # object continues in the next chunk
+            out.append(obj)
+        self._buf = buf[pos:]
+        return out
+
+    def close(self) -> None:
+        if not self.done:
+            raise ValueError("DeFi Llama pools payload ended before the data array closed")
+
+
+class TopPools:
+    """Bounded min-heap keeping the `limit` highest-APY pools that pass the filters."""
+
+    def __init__(
+        self,
+        protocols: Iterable[str],
+        chains: Iterable[str],
+        min_tvl: float = 0.0,
+        min_apy: float = 0.0,
+        limit: int = 20,
+    ) -> None:
+        self.protocols = set(protocols)
+        self.chains = set(chains)
+        self.min_tvl = min_tvl
+        self.min_apy = min_apy
+        self.limit = limit
+        self._heap: list[tuple[float, int, dict]] = []
+        self._seq = 0
+
+    def offer(self, p: dict) -> None:
+        apy = p.get("apy")
+        if (
+            apy is None
+            or apy <= self.min_apy
+            or p.get("project") not in self.protocols
+            or p.get("chain") not in self.chains
+            or (p.get("tvlUsd") or 0) <= self.min_tvl
+        ):
+            return
+        self._seq += 1
+        item = (apy, -self._seq, p)
+        if len(self._heap) < self.limit:
+            heapq.heappush(self._heap, item)
+        elif apy > self._heap[0][0]:
+            heapq.heapreplace(self._heap, item)
+
+    def result(self) -> list[dict]:
+        """Matching raw pool dicts, highest APY first."""
+        return [p for _, _, p in sorted(self._heap, reverse=True)]
+
+
+async def stream_top_pools(top: TopPools) -> list[dict]:
+    """Download the pool set chunk by chunk, feeding each pool into `top`."""
+    parser = PoolStreamParser()
+    async with get_http_client("defillama").stream("GET", POOLS_URL) as resp:
+        resp.raise_for_status()
+        async for chunk in resp.aiter_bytes():
+            for pool in parser.feed(chunk):
+                top.offer(pool)
+    parser.close()
+    return top.result()
+
+
+# --- Background ingestion ---
+
+
+class YieldIngester:
+    """Refreshes the DeFi Llama pool set in the background."""
+
+    def __init__(self, refresh_seconds: float = YIELD_REFRESH_SECONDS) -> None:
+        self.refresh_seconds = refresh_seconds
+        self.index: YieldIndex | None = None
+        self.loaded_at: float | None = None
+        self._etag: str | None = None
+        self._last_modified: str | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self.index is not None
+
+    async def refresh(self) -> bool:
+        """Fetch the pool set if it changed. Returns True when the index was rebuilt."""
+        headers = {}
+        if self._etag:
+            headers["If-None-Match"] = self._etag
+        if self._last_modified:
+            headers["If-Modified-Since"] = self._last_modified
+
+        resp = await get_http_client("defillama").get(POOLS_URL, headers=headers, timeout=60)
+        if resp.status_code == 304:
+            self.loaded_at = time.time()
+            logger.debug("DeFi Llama pools unchanged (304)")
+            return False
+        resp.raise_for_status()
+
+        # Parsing tens of MB of JSON and indexing it would stall every request on the loop
+        index = await asyncio.to_thread(lambda: YieldIndex(json.loads(resp.content)["data"]))
+        self.index = index
+        self.loaded_at = time.time()
+        self._etag = resp.headers.get("ETag")
+        self._last_modified = resp.headers.get("Last-Modified")
+        logger.info("Yield index rebuilt with %d pools", len(index))
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"DeFi Llama ingestion failed: {e}")
+            await asyncio.sleep(self.refresh_seconds)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+yield_ingester = YieldIngester()
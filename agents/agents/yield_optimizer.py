@@ -1,14 +1,42 @@
 """Yield Optimizer Agent — uses real APY data from DeFi Llama + Bonzo Finance."""
 import json
 
-from anthropic import AsyncAnthropic
 from agents.base_agent import BaseAgent
+from agents.llm_client import cacheable_system
+from agents.llm_governor import LLMOverloadedError
+from agents.prefetch import AGENT_DATA_NEEDS
+from agents.response_cache import cached_completion
 from agents.defi_data import get_defi_yields, get_bonzo_data, get_wallet_balances
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+# Stable prompt prefix; the live yield snapshot follows it as a separate cached block
+_PERSONA = """You are a DeFi yield optimizer with access to REAL-TIME yield data.
+
+IMPORTANT RULES:
+- NEVER ask the user for more information. Always recommend with whatever data is provided.
+- OG is the native gas token of 0G Chain (a testnet token).
+
+Your job:
+1. Parse the user's risk profile and asset preferences from their query
+2. Filter opportunities by risk tolerance:
+   - Conservative: stablecoin pools only, TVL > $50M, APY < 10%
+   - Moderate: any pool with TVL > $10M
+   - Aggressive: all pools including higher APY/lower TVL
+3. Recommend 3-5 specific strategies using the REAL pools below
+4. ALWAYS include at least one Bonzo Finance (Hedera) recommendation — this shows cross-chain capability
+5. For each recommendation include: protocol, pool, chain, APY, TVL, and risk level
+
+ALWAYS use the real APYs and TVLs below. Never invent numbers.
+Format as a structured recommendation with:
+- Risk Profile Assessment
+- Top Yield Strategies (numbered, with real APYs)
+- Hedera Opportunity (Bonzo Finance)
+- Portfolio Allocation Suggestion"""
+
+
 class YieldOptimizerAgent(BaseAgent):
     name: str = "yield_optimizer"
     description: str = "Recommends optimal yield strategies using real protocol APYs"
@@ -60,40 +88,18 @@ class YieldOptimizerAgent(BaseAgent):
                     f"That is 100% of my on-chain portfolio. "
                 )
 
-            # 5. Ask Claude to recommend with real data
-            system_prompt = f"""You are a DeFi yield optimizer with access to REAL-TIME yield data.
-
-LIVE YIELD OPPORTUNITIES (from DeFi Llama):
-{yield_context}
-
-HEDERA ECOSYSTEM — BONZO FINANCE (Hedera-native lending):
-{bonzo_context}
-
-IMPORTANT RULES:
-- NEVER ask the user for more information. Always recommend with whatever data is provided.
-- OG is the native gas token of 0G Chain (a testnet token).
-
-Your job:
-1. Parse the user's risk profile and asset preferences from their query
-2. Filter opportunities by risk tolerance:
-   - Conservative: stablecoin pools only, TVL > $50M, APY < 10%
-   - Moderate: any pool with TVL > $10M
-   - Aggressive: all pools including higher APY/lower TVL
-3. Recommend 3-5 specific strategies using the REAL pools above
-4. ALWAYS include at least one Bonzo Finance (Hedera) recommendation — this shows cross-chain capability
-5. For each recommendation include: protocol, pool, chain, APY, TVL, and risk level
-
-ALWAYS use the real APYs and TVLs above. Never invent numbers.
-Format as a structured recommendation with:
-- Risk Profile Assessment
-- Top Yield Strategies (numbered, with real APYs)
-- Hedera Opportunity (Bonzo Finance)
-- Portfolio Allocation Suggestion"""
+            # 5. Ask Claude to recommend with real data (persona + yield snapshot are prompt-cached)
+            system_prompt = cacheable_system(
+                _PERSONA,
+                f"LIVE YIELD OPPORTUNITIES (from DeFi Llama):\n{yield_context}\n\n"
+                f"HEDERA ECOSYSTEM — BONZO FINANCE (Hedera-native lending):\n{bonzo_context}",
+            )
 
             user_message = holdings_line + query
 
-            client = AsyncAnthropic()
-            response = await client.messages.create(
+            llm_result = await cached_completion(
+                self.name,
+                AGENT_DATA_NEEDS[self.name],
                 model="claude-haiku-4-5-20251001",
                 max_tokens=700,
                 system=system_prompt,
@@ -101,8 +107,9 @@ Format as a structured recommendation with:
                     {"role": "user", "content": user_message},
                 ],
             )
-            llm_result = response.content[0].text or ""
             return wallet_banner + llm_result
+        except LLMOverloadedError:
+            raise
         except Exception as e:
             logger.error(f"Yield optimizer error: {e}")
             return f"Yield optimization error: {str(e)}"
@@ -1,10 +1,12 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any
+from typing import Any, AsyncIterator, Awaitable, Callable
 
 import uvicorn
 from dotenv import load_dotenv
@@ -13,12 +15,21 @@ load_dotenv(Path(__file__).resolve().parent / ".env", override=True)  # Must run
 
 from fastapi import FastAPI, Request  # noqa: E402
 from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
-from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.responses import JSONResponse, StreamingResponse  # noqa: E402
 from pydantic import BaseModel  # noqa: E402
 
+from agents.anthropic_transport import anthropic_transport  # noqa: E402
+from agents.http_clients import close_http_clients, warm_up_http_clients  # noqa: E402
+from agents.job_queue import JobCheckpoint, job_queue  # noqa: E402
+from agents.llm_client import close_anthropic_client, prompt_cache_stats, warm_up_anthropic_client  # noqa: E402
+from agents.llm_governor import PRIORITY_PAID, LLMOverloadedError, llm_governor, llm_priority, set_llm_priority  # noqa: E402
+from agents.response_cache import bypass_response_cache, response_cache, response_cache_bypassed  # noqa: E402
+from agents.yield_index import yield_ingester  # noqa: E402
 from agents.orchestrator import AGENT_REGISTRY, AgentOrchestrator, HEDERA_ENABLED  # noqa: E402
 from agents.payments.mock_provider import MockPaymentProvider  # noqa: E402
-from agent_factory import run_agent  # noqa: E402
+from agents.single_flight import SingleFlight  # noqa: E402
+from agent_factory import run_agent, stream_agent, warm_agent_cache  # noqa: E402
+from hedera_agent_kit_setup import reset_hedera_toolkit  # noqa: E402
 from dynamic_registry import register_agent as registry_register, get_token_map, get_dynamic_agents, set_hedera_info, get_all_hedera_accounts, get_afc_balances  # noqa: E402
 
 # Lazy imports: x402/adi depend on web3 which can hang on some platforms (Windows/MINGW).
@@ -126,7 +137,34 @@ cross_agent_service = CrossAgentService(
     afc_token_id=os.getenv("HEDERA_TOKEN_ID", ""),
 )
 
-app = FastAPI(title="AgentFi API", version="0.2.0")
+
+# ── Lifespan ───────────────────────────────────────────────────────
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm shared upstream connection pools and start background ingestion."""
+    await asyncio.gather(warm_up_http_clients(), warm_up_anthropic_client())
+    yield_ingester.start()
+    await job_queue.start(_run_job)
+    if HEDERA_ENABLED:
+        from hedera.attestation_batcher import attestation_batcher
+        await attestation_batcher.resume()
+    # Initialise the Hedera toolkit and compile the static LangGraph agents
+    # off the event loop; requests that arrive first build on demand.
+    asyncio.get_running_loop().run_in_executor(None, warm_agent_cache)
+    yield
+    reset_hedera_toolkit()
+    await job_queue.stop()
+    if HEDERA_ENABLED:
+        await attestation_batcher.flush_all()
+    await yield_ingester.stop()
+    await close_anthropic_client()
+    await anthropic_transport.close()
+    await close_http_clients()
+
+
+app = FastAPI(title="AgentFi API", version="0.2.0", lifespan=lifespan)
 
 _origins = [
     "http://localhost:3000",
@@ -145,10 +183,21 @@ app.add_middleware(
 )
 
 
+@app.exception_handler(LLMOverloadedError)
+async def llm_overloaded_handler(request: Request, exc: LLMOverloadedError) -> JSONResponse:
+    """Load shed by the LLM governor — tell the client when to retry."""
+    return JSONResponse(
+        status_code=503,
+        content={"success": False, "data": None, "error": str(exc)},
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+    )
+
+
 class ExecuteRequest(BaseModel):
     query: str
     wallet_address: str | None = None
     cross_agent: bool = False
+    no_cache: bool = False  # skip the LLM response cache for this request
 
 
 class AgentResponse(BaseModel):
@@ -184,7 +233,23 @@ async def list_agents() -> AgentResponse:
     return AgentResponse(success=True, data=[a.model_dump() for a in agents], error=None)
 
 
+# Identical concurrent executions share one run; payment/attestation/reward stay per caller
+_execution_flights = SingleFlight()
+
+
 async def _execute_with_fallback(agent_id: str, query: str, wallet_address: str | None) -> str:
+    """Execute an agent, coalescing with an identical execution already in flight.
+
+    The LLM lane is part of the key: the shared run is admitted in the
+    leader's lane, so a paid caller never waits behind a free leader.
+    """
+    return await _execution_flights.do(
+        (agent_id, query, wallet_address, response_cache_bypassed(), llm_priority()),
+        lambda: _run_with_fallback(agent_id, query, wallet_address),
+    )
+
+
+async def _run_with_fallback(agent_id: str, query: str, wallet_address: str | None) -> str:
     """Try new LangChain agent first, fall back to legacy agent.
 
     Dynamic agents (user-created via /agents/register) skip the LangChain
@@ -200,6 +265,8 @@ async def _execute_with_fallback(agent_id: str, query: str, wallet_address: str
     # Static agents use the full LangChain ReAct agent with Hedera/DeFi tools
     try:
         return await run_agent(agent_id, query, wallet_address)
+    except LLMOverloadedError:
+        raise
     except Exception as e:
         logger.warning(f"LangChain agent failed, falling back to legacy: {e}")
         if agent:
@@ -207,59 +274,142 @@ async def _execute_with_fallback(agent_id: str, query: str, wallet_address: str
         raise
 
 
-@app.post("/agents/{agent_id}/execute")
-async def execute_single(agent_id: str, request: Request, body: ExecuteRequest) -> AgentResponse:
-    if agent_id not in AGENT_REGISTRY:
-        return AgentResponse(success=False, data=None, error=f"Unknown agent: {agent_id}")
+async def _stream_with_fallback(
+    agent_id: str, query: str, wallet_address: str | None,
+) -> AsyncIterator[tuple[str, dict]]:
+    """Streaming counterpart of _execute_with_fallback, yielding (event, data) pairs.
 
-    # ─── x402 middleware check (on-chain isAuthorized or x402 payment) ───
-    payment_response = await x402_middleware_check(request, agent_id, body.wallet_address)
-    if payment_response is not None:
-        return payment_response
+    Always ends with a ("result", {"result": ...}) pair. A ("stage",
+    {"stage": "fallback"}) pair tells the client to discard tokens streamed
+    so far because the legacy agent produced the result instead.
+    """
+    from agents.dynamic_agent import DynamicAgent
+
+    agent = AGENT_REGISTRY.get(agent_id)
+    if isinstance(agent, DynamicAgent):
+        # Relay the transport's token callbacks as they arrive
+        tokens: asyncio.Queue[str | None] = asyncio.Queue()
+        task = asyncio.create_task(agent.execute(query, wallet_address=wallet_address, on_token=tokens.put_nowait))
+        task.add_done_callback(lambda _t: tokens.put_nowait(None))
+        try:
+            while (text := await tokens.get()) is not None:
+                yield "token", {"text": text}
+            yield "result", {"result": await task}
+        finally:
+            task.cancel()
+        return
 
     try:
-        result = await _execute_with_fallback(agent_id, body.query, body.wallet_address)
+        async for item in stream_agent(agent_id, query, wallet_address):
+            yield item
+    except LLMOverloadedError:
+        raise
     except Exception as e:
-        return AgentResponse(success=False, data=None, error=str(e))
+        logger.warning(f"LangChain agent failed, falling back to legacy: {e}")
+        if not agent:
+            raise
+        yield "stage", {"stage": "fallback", "reason": str(e)}
+        yield "result", {"result": await agent.execute(query, wallet_address=wallet_address)}
+
+
+async def _attest(agent_id: str, query: str, result: str) -> dict | None:
+    """HCS attestation for one execution, or None when Hedera is off or it fails."""
+    if not HEDERA_ENABLED:
+        return None
+    try:
+        from hedera.attestation import attest_execution
+        return await attest_execution(agent_id, query, result)
+    except Exception:
+        return None
+
+
+async def _reward(agent_id: str) -> dict | None:
+    """AFC token reward (1.00 AFC per execution), or None when Hedera is off or it fails."""
+    if not HEDERA_ENABLED:
+        return None
+    try:
+        from hedera.afc_rewards import reward_agent
+        return await reward_agent(agent_id)
+    except Exception:
+        return None
+
+
+def _apply_cache_opt_out(request: Request, body: ExecuteRequest) -> None:
+    """Per-request response-cache opt-out: body.no_cache or a Cache-Control: no-cache header."""
+    if body.no_cache or "no-cache" in request.headers.get("cache-control", "").lower():
+        bypass_response_cache()
+
+
+def _sse(event: str, data: Any) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+_SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
 
+async def _once(checkpoint: JobCheckpoint | None, step: str, run: Callable[[], Awaitable[Any]]) -> Any:
+    """Run a side-effecting step at most once per background job (always, outside jobs).
+
+    The step is marked as started before it runs, so a job re-run after a
+    crash mid-step skips it (returns None) rather than pay or attest twice.
+    """
+    if checkpoint is None:
+        return await run()
+    if step in checkpoint:
+        return checkpoint.get(step)
+    await checkpoint.save(step, None)
+    value = await run()
+    await checkpoint.save(step, value)
+    return value
+
+
+async def _finish_execution(
+    agent_id: str,
+    body: ExecuteRequest,
+    result: str,
+    payment_data: dict | None,
+    checkpoint: JobCheckpoint | None = None,
+) -> tuple[dict, str | None]:
+    """Per-caller work after an execution: HCS proof, AFC reward, cross-agent and x402 settlement.
+
+    Shared by /agents/{agent_id}/execute and background jobs. Returns the
+    response payload and the settlement receipt (None when nothing was settled).
+    """
     # Hedera attestation for single-agent calls
     hedera_proof = None
-    if HEDERA_ENABLED:
-        try:
-            from hedera.attestation import attest_execution
-            proof = await attest_execution(agent_id, body.query, result)
-            hedera_proof = {
-                "hcs_messages": [proof["hcs_tx"]] if proof.get("hcs_tx") else [],
-                "agents_used": [agent_id],
-            }
-        except Exception:
-            pass
+    proof = await _once(checkpoint, "attestation", lambda: _attest(agent_id, body.query, result))
+    if proof is not None:
+        hedera_proof = {
+            "hcs_messages": [proof["hcs_tx"]] if proof.get("hcs_tx") else [],
+            "execution_hashes": [proof["execution_hash"]] if proof.get("execution_hash") else [],
+            "agents_used": [agent_id],
+        }
 
     # AFC token reward — 1.00 AFC per execution
-    afc_reward = None
-    if HEDERA_ENABLED:
-        try:
-            from hedera.afc_rewards import reward_agent
-            afc_reward = await reward_agent(agent_id)
-        except Exception:
-            pass
+    afc_reward = await _once(checkpoint, "afc_reward", lambda: _reward(agent_id))
 
     # ─── Cross-agent collaboration (x402) ────────────────
-    cross_agent_data = {"enhanced_result": result, "cross_agent_report": [], "x402_payments": []}
+    cross_agent_data = None
     if body.cross_agent:
-        try:
-            cross_agent_data = await cross_agent_service.execute_with_cross_agent(
-                caller_agent_name=agent_id,
-                query=body.query,
-                main_result=result,
-                cross_agent_enabled=True,
-            )
-        except Exception as e:
-            logger.error(f"Cross-agent collaboration failed: {e}")
+        async def collaborate() -> dict | None:
+            try:
+                return await cross_agent_service.execute_with_cross_agent(
+                    caller_agent_name=agent_id,
+                    query=body.query,
+                    main_result=result,
+                    cross_agent_enabled=True,
+                )
+            except Exception as e:
+                logger.error(f"Cross-agent collaboration failed: {e}")
+                return None
+
+        cross_agent_data = await _once(checkpoint, "cross_agent", collaborate)
+    if cross_agent_data is None:
+        cross_agent_data = {"enhanced_result": result, "cross_agent_report": [], "x402_payments": []}
 
     # ─── x402 settlement (Pieverse /v2/settle) ───────────
     x402_settlement = None
-    payment_data = getattr(request.state, "x402_payment", None)
     if payment_data:
         x402_settlement = await settle_x402_payment(payment_data)
 
@@ -274,6 +424,33 @@ async def execute_single(agent_id: str, request: Request, body: ExecuteRequest)
         },
     }
 
+    return response_data, x402_settlement
+
+
+@app.post("/agents/{agent_id}/execute")
+async def execute_single(agent_id: str, request: Request, body: ExecuteRequest) -> AgentResponse:
+    if agent_id not in AGENT_REGISTRY:
+        return AgentResponse(success=False, data=None, error=f"Unknown agent: {agent_id}")
+
+    # ─── x402 middleware check (on-chain isAuthorized or x402 payment) ───
+    payment_response = await x402_middleware_check(request, agent_id, body.wallet_address)
+    if payment_response is not None:
+        return payment_response
+    if getattr(request.state, "x402_payment", None):
+        set_llm_priority(PRIORITY_PAID)
+    _apply_cache_opt_out(request, body)
+
+    try:
+        result = await _execute_with_fallback(agent_id, body.query, body.wallet_address)
+    except LLMOverloadedError:
+        raise
+    except Exception as e:
+        return AgentResponse(success=False, data=None, error=str(e))
+
+    response_data, x402_settlement = await _finish_execution(
+        agent_id, body, result, getattr(request.state, "x402_payment", None),
+    )
+
     if x402_settlement:
         response_data["x402_settled"] = True
         return JSONResponse(
@@ -284,63 +461,299 @@ async def execute_single(agent_id: str, request: Request, body: ExecuteRequest)
     return AgentResponse(success=True, data=response_data, error=None)
 
 
+@app.post("/agents/{agent_id}/execute/stream", response_model=None)
+async def execute_single_stream(
+    agent_id: str, request: Request, body: ExecuteRequest,
+) -> StreamingResponse | AgentResponse | JSONResponse:
+    """Server-Sent Events variant of /agents/{agent_id}/execute.
+
+    Events, in order: stage (payment_verified, tool_start/tool_end, fallback),
+    token (LLM text deltas), result, proof, reward, cross_agent, settlement,
+    done — or error if the agent itself fails.
+    """
+    if agent_id not in AGENT_REGISTRY:
+        return AgentResponse(success=False, data=None, error=f"Unknown agent: {agent_id}")
+
+    # Payment must be resolved before streaming starts so 402 keeps its status and headers
+    payment_response = await x402_middleware_check(request, agent_id, body.wallet_address)
+    if payment_response is not None:
+        return payment_response
+    payment_data = getattr(request.state, "x402_payment", None)
+    if payment_data:
+        set_llm_priority(PRIORITY_PAID)
+    _apply_cache_opt_out(request, body)
+
+    async def events() -> AsyncIterator[str]:
+        yield _sse("stage", {"stage": "payment_verified", "x402": payment_data is not None})
+
+        result = ""
+        try:
+            async for event, data in _stream_with_fallback(agent_id, body.query, body.wallet_address):
+                if event == "result":
+                    result = data["result"]
+                elif event in ("tool_start", "tool_end"):
+                    yield _sse("stage", {"stage": event, **data})
+                else:
+                    yield _sse(event, data)
+        except Exception as e:
+            yield _sse("error", {"error": str(e)})
+            return
+        yield _sse("result", {"result": result})
+
+        proof = await _attest(agent_id, body.query, result)
+        yield _sse("proof", {
+            "hedera_proof": None if proof is None else {
+                "hcs_messages": [proof["hcs_tx"]] if proof.get("hcs_tx") else [],
+                "execution_hashes": [proof["execution_hash"]] if proof.get("execution_hash") else [],
+                "agents_used": [agent_id],
+            },
+        })
+        yield _sse("reward", {"afc_reward": await _reward(agent_id)})
+
+        if body.cross_agent:
+            try:
+                cross = await cross_agent_service.execute_with_cross_agent(
+                    caller_agent_name=agent_id,
+                    query=body.query,
+                    main_result=result,
+                    cross_agent_enabled=True,
+                )
+                yield _sse("cross_agent", {
+                    "enhanced_result": cross["enhanced_result"],
+                    "report": cross["cross_agent_report"],
+                    "payments": cross["x402_payments"],
+                })
+            except Exception as e:
+                logger.error(f"Cross-agent collaboration failed: {e}")
+
+        if payment_data:
+            settlement = await settle_x402_payment(payment_data)
+            yield _sse("settlement", {"x402_settled": bool(settlement), "payment_response": settlement})
+
+        yield _sse("done", {})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=_SSE_HEADERS)
+
+
+ORCHESTRATE_AGENTS = ["portfolio_analyzer", "risk_scorer", "yield_optimizer"]
+
+# The orchestrate agents are independent (same query, no shared output), so
+# they run concurrently; ORCHESTRATE_CONCURRENCY=1 restores sequential mode.
+ORCHESTRATE_CONCURRENCY = max(1, int(os.getenv("ORCHESTRATE_CONCURRENCY", "3")))
+ORCHESTRATE_AGENT_TIMEOUT = float(os.getenv("ORCHESTRATE_AGENT_TIMEOUT", "90"))
+# Per-agent overrides, e.g. "risk_scorer=30,yield_optimizer=60"
+ORCHESTRATE_AGENT_TIMEOUTS = {
+    name.strip(): float(seconds)
+    for name, seconds in (
+        item.split("=", 1) for item in os.getenv("ORCHESTRATE_AGENT_TIMEOUTS", "").split(",") if "=" in item
+    )
+}
+
+
+def _agent_timeout(agent_id: str) -> float:
+    return ORCHESTRATE_AGENT_TIMEOUTS.get(agent_id, ORCHESTRATE_AGENT_TIMEOUT)
+
+
+def _section(
+    agent_id: str,
+    result: str | None = None,
+    error: str | None = None,
+    hcs_tx: str | None = None,
+    afc_reward: dict | None = None,
+    execution_hash: str | None = None,
+) -> dict:
+    """One agent's part of an orchestrate response."""
+    content = f"Error: {error}" if error is not None else result
+    return {
+        "agent": agent_id,
+        "markdown": f"## {agent_id.replace('_', ' ').title()}\n\n{content}",
+        "error": error,
+        "hcs_tx": hcs_tx,
+        "execution_hash": execution_hash,
+        "afc_reward": afc_reward,
+    }
+
+
+async def _orchestrate_section(agent_id: str, query: str, wallet_address: str | None) -> dict:
+    """Run one orchestrate agent under its timeout, then attest and reward it."""
+    timeout = _agent_timeout(agent_id)
+    try:
+        result = await asyncio.wait_for(_execute_with_fallback(agent_id, query, wallet_address), timeout)
+    except asyncio.TimeoutError:
+        return _section(agent_id, error=f"Timed out after {timeout:g}s")
+    except Exception as e:
+        return _section(agent_id, error=str(e))
+    proof = await _attest(agent_id, query, result)
+    afc = await _reward(agent_id)
+    return _section(
+        agent_id,
+        result,
+        hcs_tx=(proof or {}).get("hcs_tx"),
+        afc_reward=afc if afc and afc.get("status") else None,
+        execution_hash=(proof or {}).get("execution_hash"),
+    )
+
+
+def _combine_sections(sections: list[dict]) -> dict:
+    """Orchestrate response payload from sections in display order."""
+    return {
+        "result": "\n\n---\n\n".join(s["markdown"] for s in sections),
+        "hedera_proof": {
+            "hcs_messages": [s["hcs_tx"] for s in sections if s["hcs_tx"]],
+            "execution_hashes": [s["execution_hash"] for s in sections if s["execution_hash"]],
+            "agents_used": [s["agent"] for s in sections if s["error"] is None],
+        },
+        "afc_rewards": [s["afc_reward"] for s in sections if s["afc_reward"]],
+    }
+
+
 @app.post("/orchestrate")
 async def orchestrate(request: Request, body: ExecuteRequest) -> AgentResponse:
-    """Chain all 3 agents: analyze -> score -> optimize."""
+    """Run all 3 agents concurrently; sections keep the analyze -> score -> optimize order."""
     # ─── x402 middleware check (uses portfolio_analyzer as representative agent) ───
     payment_response = await x402_middleware_check(request, "portfolio_analyzer", body.wallet_address)
     if payment_response is not None:
         return payment_response
+    if getattr(request.state, "x402_payment", None):
+        set_llm_priority(PRIORITY_PAID)
+    _apply_cache_opt_out(request, body)
 
-    results = []
-    all_hcs: list[str] = []
-    all_afc: list[dict] = []
-    agents_used: list[str] = []
+    limit = asyncio.Semaphore(ORCHESTRATE_CONCURRENCY)
 
-    for agent_id in ["portfolio_analyzer", "risk_scorer", "yield_optimizer"]:
-        try:
-            result = await _execute_with_fallback(agent_id, body.query, body.wallet_address)
-            results.append(f"## {agent_id.replace('_', ' ').title()}\n\n{result}")
-            agents_used.append(agent_id)
+    async def run(agent_id: str) -> dict:
+        async with limit:
+            return await _orchestrate_section(agent_id, body.query, body.wallet_address)
 
-            # Hedera attestation
-            if HEDERA_ENABLED:
-                try:
-                    from hedera.attestation import attest_execution
-                    proof = await attest_execution(agent_id, body.query, result)
-                    if proof.get("hcs_tx"):
-                        all_hcs.append(proof["hcs_tx"])
-                except Exception:
-                    pass
-
-            # AFC token reward
-            if HEDERA_ENABLED:
-                try:
-                    from hedera.afc_rewards import reward_agent
-                    afc = await reward_agent(agent_id)
-                    if afc.get("status"):
-                        all_afc.append(afc)
-                except Exception:
-                    pass
-        except Exception as e:
-            results.append(f"## {agent_id.replace('_', ' ').title()}\n\nError: {e}")
+    # gather keeps ORCHESTRATE_AGENTS order regardless of completion order
+    sections = await asyncio.gather(*(run(agent_id) for agent_id in ORCHESTRATE_AGENTS))
 
-    combined = "\n\n---\n\n".join(results)
+    return AgentResponse(success=True, data=_combine_sections(list(sections)), error=None)
 
+
+async def _orchestrate_section_events(
+    index: int, agent_id: str, query: str, wallet_address: str | None, sections: list,
+) -> AsyncIterator[str]:
+    """SSE events for one orchestrate agent; stores its final section in sections[index]."""
+    yield _sse("section_start", {"agent": agent_id, "index": index})
+
+    result = ""
+    timeout = _agent_timeout(agent_id)
+    try:
+        async with asyncio.timeout(timeout):
+            async for event, data in _stream_with_fallback(agent_id, query, wallet_address):
+                if event == "result":
+                    result = data["result"]
+                elif event in ("tool_start", "tool_end"):
+                    yield _sse("stage", {"agent": agent_id, "stage": event, **data})
+                else:
+                    yield _sse(event, {"agent": agent_id, **data})
+    except TimeoutError:
+        sections[index] = _section(agent_id, error=f"Timed out after {timeout:g}s")
+        yield _sse("section", {"index": index, **sections[index]})
+        return
+    except Exception as e:
+        sections[index] = _section(agent_id, error=str(e))
+        yield _sse("section", {"index": index, **sections[index]})
+        return
+
+    sections[index] = _section(agent_id, result)
+    yield _sse("section", {"index": index, **sections[index]})
+
+    proof = await _attest(agent_id, query, result)
+    sections[index]["hcs_tx"] = (proof or {}).get("hcs_tx")
+    sections[index]["execution_hash"] = (proof or {}).get("execution_hash")
+    yield _sse("proof", {
+        "agent": agent_id,
+        "index": index,
+        "hcs_tx": sections[index]["hcs_tx"],
+        "execution_hash": sections[index]["execution_hash"],
+    })
+
+    afc = await _reward(agent_id)
+    sections[index]["afc_reward"] = afc if afc and afc.get("status") else None
+    yield _sse("reward", {"agent": agent_id, "index": index, "afc_reward": sections[index]["afc_reward"]})
+
+
+async def _merge_event_streams(streams: list[AsyncIterator[str]], limit: int) -> AsyncIterator[str]:
+    """Interleave several event streams as items arrive, running at most `limit` at once."""
+    queue: asyncio.Queue = asyncio.Queue()
+    finished = object()
+    gate = asyncio.Semaphore(limit)
+
+    async def pump(stream: AsyncIterator[str]) -> None:
+        try:
+            async with gate:
+                async for item in stream:
+                    await queue.put(item)
+        finally:
+            await queue.put(finished)
+
+    tasks = [asyncio.create_task(pump(s)) for s in streams]
+    remaining = len(tasks)
+    try:
+        while remaining:
+            item = await queue.get()
+            if item is finished:
+                remaining -= 1
+            else:
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+@app.post("/orchestrate/stream", response_model=None)
+async def orchestrate_stream(request: Request, body: ExecuteRequest) -> StreamingResponse | AgentResponse | JSONResponse:
+    """Server-Sent Events variant of /orchestrate.
+
+    Each agent streams section_start, token/stage events, then its section
+    (markdown, or error), proof and reward as soon as they are available.
+    Agents run concurrently, so events interleave; every event carries the
+    agent and its section index. A final summary event carries the same
+    payload /orchestrate returns, in ORCHESTRATE_AGENTS order.
+    """
+    payment_response = await x402_middleware_check(request, "portfolio_analyzer", body.wallet_address)
+    if payment_response is not None:
+        return payment_response
+    payment_data = getattr(request.state, "x402_payment", None)
+    if payment_data:
+        set_llm_priority(PRIORITY_PAID)
+    _apply_cache_opt_out(request, body)
+
+    async def events() -> AsyncIterator[str]:
+        yield _sse("stage", {"stage": "payment_verified", "x402": payment_data is not None})
+        sections: list = [None] * len(ORCHESTRATE_AGENTS)
+        streams = [
+            _orchestrate_section_events(index, agent_id, body.query, body.wallet_address, sections)
+            for index, agent_id in enumerate(ORCHESTRATE_AGENTS)
+        ]
+        async for chunk in _merge_event_streams(streams, ORCHESTRATE_CONCURRENCY):
+            yield chunk
+        yield _sse("summary", _combine_sections(sections))
+        yield _sse("done", {})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=_SSE_HEADERS)
+
+
+@app.get("/llm/governor")
+async def llm_governor_status() -> AgentResponse:
     return AgentResponse(
         success=True,
-        data={
-            "result": combined,
-            "hedera_proof": {
-                "hcs_messages": all_hcs,
-                "agents_used": agents_used,
-            },
-            "afc_rewards": all_afc,
-        },
+        data={**llm_governor.stats(), "coalescing": _execution_flights.stats()},
         error=None,
     )
 
 
+@app.get("/llm/response-cache")
+async def llm_response_cache_status() -> AgentResponse:
+    return AgentResponse(success=True, data=response_cache.stats(), error=None)
+
+
+@app.get("/llm/prompt-cache")
+async def llm_prompt_cache_status() -> AgentResponse:
+    return AgentResponse(success=True, data=prompt_cache_stats.stats(), error=None)
+
+
 @app.get("/payments/status")
 async def payment_status() -> AgentResponse:
     provider = MockPaymentProvider()
@@ -356,6 +769,119 @@ async def payment_status() -> AgentResponse:
     )
 
 
+# ── Background jobs ────────────────────────────────────────────────
+
+# Overload sheds are retried in the background rather than failing the job
+_JOB_OVERLOAD_RETRIES = 5
+
+
+async def _run_job(agent_id: str, request: dict, checkpoint: JobCheckpoint) -> dict:
+    """Job runner: same execution, proof and reward as /agents/{agent_id}/execute.
+
+    Payment was settled at submission. Progress is checkpointed, so a job
+    re-run after a restart reuses its result and skips finish steps already done.
+    """
+    body = ExecuteRequest(**request["body"])
+    if request.get("paid"):
+        set_llm_priority(PRIORITY_PAID)
+    if body.no_cache:
+        bypass_response_cache()
+
+    if "result" in checkpoint:
+        result = checkpoint.get("result")
+    else:
+        for attempt in range(_JOB_OVERLOAD_RETRIES + 1):
+            try:
+                result = await _execute_with_fallback(agent_id, body.query, body.wallet_address)
+                break
+            except LLMOverloadedError as e:
+                if attempt == _JOB_OVERLOAD_RETRIES:
+                    raise
+                await asyncio.sleep(e.retry_after)
+        await checkpoint.save("result", result)
+
+    response_data, _ = await _finish_execution(agent_id, body, result, None, checkpoint)
+    if request.get("x402_payment_response"):
+        response_data["x402_settled"] = True
+        response_data["x402_payment_response"] = request["x402_payment_response"]
+    return response_data
+
+
+@app.post("/agents/{agent_id}/jobs")
+async def submit_job(agent_id: str, request: Request, body: ExecuteRequest) -> AgentResponse:
+    """Enqueue an execution; poll GET /jobs/{job_id} for the result."""
+    if agent_id not in AGENT_REGISTRY:
+        return AgentResponse(success=False, data=None, error=f"Unknown agent: {agent_id}")
+
+    # Payment is verified and settled up front: a queued job can outlast the
+    # payment's maxTimeoutSeconds, and the signed payment never hits jobs.db
+    payment_response = await x402_middleware_check(request, agent_id, body.wallet_address)
+    if payment_response is not None:
+        return payment_response
+    payment_data = getattr(request.state, "x402_payment", None)
+    x402_settlement = None
+    if payment_data:
+        x402_settlement = await settle_x402_payment(payment_data)
+        if x402_settlement is None and "payment_requirements" in payment_data:
+            return AgentResponse(success=False, data=None, error="x402 payment settlement failed; job not queued")
+    if "no-cache" in request.headers.get("cache-control", "").lower():
+        body.no_cache = True
+
+    job_id = await job_queue.submit(agent_id, {
+        "body": body.model_dump(),
+        "paid": payment_data is not None,
+        "x402_payment_response": x402_settlement,
+    })
+    return AgentResponse(
+        success=True,
+        data={"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"},
+        error=None,
+    )
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str) -> AgentResponse:
+    job = await job_queue.get(job_id)
+    if job is None:
+        return AgentResponse(success=False, data=None, error=f"Unknown job: {job_id}")
+    return AgentResponse(
+        success=True,
+        data={
+            "job_id": job["id"],
+            "agent_id": job["agent_id"],
+            "status": job["status"],
+            "result": job["result"],
+            "error": job["error"],
+            "attempts": job["attempts"],
+            "created_at": job["created_at"],
+            "started_at": job["started_at"],
+            "finished_at": job["finished_at"],
+        },
+        error=None,
+    )
+
+
+# ── Risk endpoints ─────────────────────────────────────────────────
+
+
+class RiskBatchRequest(BaseModel):
+    portfolios: list[dict[str, float]]
+    volatilities: dict[str, float] | None = None  # symbol -> annualized vol %, fetched if omitted
+    changes_24h: dict[str, float] | None = None  # symbol -> 24h change %, fetched if omitted
+
+
+@app.post("/risk/score-batch")
+async def risk_score_batch(body: RiskBatchRequest) -> AgentResponse:
+    """Score many portfolios in one vectorized pass (same model as the risk_scorer agent)."""
+    from agents.risk_scorer import score_portfolio_batch
+
+    try:
+        scores = await score_portfolio_batch(body.portfolios, body.volatilities, body.changes_24h)
+    except Exception as e:
+        return AgentResponse(success=False, data=None, error=str(e))
+    return AgentResponse(success=True, data=scores, error=None)
+
+
 # ── Dynamic agent endpoints ────────────────────────────────────────
 
 
@@ -527,6 +1053,33 @@ async def get_agent_topics_endpoint(agent_id: str) -> AgentResponse:
     )
 
 
+@app.get("/attestations/{execution_hash}/proof")
+async def get_attestation_proof(execution_hash: str) -> AgentResponse:
+    """Merkle inclusion proof of one execution in its HCS-anchored attestation batch."""
+    from hedera.attestation_batcher import attestation_batcher
+    from hedera.merkle import verify_proof
+
+    entry = await asyncio.to_thread(attestation_batcher.store.get, execution_hash.lower().removeprefix("0x"))
+    if entry is None:
+        return AgentResponse(success=False, data=None, error=f"Unknown attestation: {execution_hash}")
+    data = {
+        "execution_hash": entry["execution_hash"],
+        "record": entry["record"],
+        "agent": entry["agent"],
+        "topic_id": entry["topic_id"],
+        "status": entry["status"],
+        "hcs_tx": entry["hcs_tx"],
+        "batch_root": entry["batch_root"],
+        "batch_size": entry["batch_size"],
+        "leaf_index": entry["leaf_index"],
+        "proof": entry["proof"],
+        "anchored_at": entry["anchored_at"],
+    }
+    if entry["status"] == "anchored":
+        data["verified"] = verify_proof(entry["execution_hash"], entry["proof"], entry["batch_root"])
+    return AgentResponse(success=True, data=data, error=None)
+
+
 @app.get("/hedera/accounts")
 async def hedera_accounts() -> AgentResponse:
     """Return tokenId -> Hedera account mapping for all agents (static + dynamic)."""
@@ -569,6 +1122,7 @@ class ComplianceExecuteRequest(BaseModel):
     adi_payment_id: int
     wallet_address: str
     cross_agent: bool = False
+    no_cache: bool = False
 
 
 @app.post("/agents/{agent_id}/execute-compliant")
@@ -614,9 +1168,16 @@ async def execute_agent_compliant(
             error="Payment already processed.",
         )
 
+    # Paid Mode B requests share the priority lane with x402-paid ones
+    set_llm_priority(PRIORITY_PAID)
+    if body.no_cache:
+        bypass_response_cache()
+
     # ─── Step 3: Execute agent (SAME as Mode A) ────────
     try:
         result = await _execute_with_fallback(agent_id, body.query, body.wallet_address)
+    except LLMOverloadedError:
+        raise
     except Exception as e:
         return AgentResponse(success=False, data=None, error=str(e))
 
@@ -630,6 +1191,7 @@ async def execute_agent_compliant(
             hedera_topic_id = proof.get("topic_id", "")
             hedera_proof = {
                 "hcs_messages": [proof["hcs_tx"]] if proof.get("hcs_tx") else [],
+                "execution_hashes": [proof["execution_hash"]] if proof.get("execution_hash") else [],
                 "agents_used": [agent_id],
             }
         except Exception:
@@ -1,15 +1,23 @@
-"""On-chain attestation — submit proof of agent execution to Hedera."""
+"""On-chain attestation — submit proof of agent execution to Hedera (Merkle-batched, see attestation_batcher)."""
 
 from __future__ import annotations
 
+import asyncio
 import hashlib
+import json
 import logging
 import os
+import time
+from typing import Any
 
+from hedera.attestation_batcher import attestation_batcher
 from hedera.service_factory import get_hcs_service
 
 logger = logging.getLogger(__name__)
 
+# Batch executions into Merkle roots (one HCS message per batch) instead of one message each
+ATTESTATION_BATCHING = os.getenv("ATTESTATION_BATCHING", "true").lower() == "true"
+
 # Map agent names → env var prefixes for their Hedera topic IDs
 _AGENT_ENV_PREFIX = {
     "portfolio_analyzer": "HEDERA_PORTFOLIO_ANALYZER",
@@ -48,8 +56,26 @@ def get_agent_topics(agent_name: str) -> dict[str, str]:
     return {}
 
 
+def execution_record(agent_name: str, query: str, result: str) -> tuple[str, dict[str, Any]]:
+    """(execution hash, the record it commits to) for one agent execution."""
+    record = {
+        "agent": agent_name,
+        "query_hash": hashlib.sha256(query.encode()).hexdigest(),
+        "result_hash": hashlib.sha256(result.encode()).hexdigest(),
+        "ts_ns": time.time_ns(),
+    }
+    execution_hash = hashlib.sha256(json.dumps(record, sort_keys=True).encode()).hexdigest()
+    return execution_hash, record
+
+
 async def attest_execution(agent_name: str, query: str, result: str) -> dict:
-    """Submit execution proof to Hedera. Non-blocking — errors are logged, not raised."""
+    """Submit execution proof to Hedera. Non-blocking — errors are logged, not raised.
+
+    With ATTESTATION_BATCHING (default) the execution joins its topic's next
+    Merkle batch and this returns at once: hcs_tx stays None and the leaf
+    index, inclusion proof and batch transaction are served later from
+    GET /attestations/{execution_hash}/proof.
+    """
     proof: dict[str, str | None] = {
         "hcs_tx": None,
     }
@@ -64,10 +90,18 @@ async def attest_execution(agent_name: str, query: str, result: str) -> dict:
             logger.debug("No inbound topic for %s — skipping attestation", agent_name)
             return proof
 
+        proof["topic_id"] = inbound_topic
+        if ATTESTATION_BATCHING:
+            execution_hash, record = execution_record(agent_name, query, result)
+            await attestation_batcher.submit(agent_name, inbound_topic, execution_hash, record)
+            proof["execution_hash"] = execution_hash
+            proof["proof_url"] = f"/attestations/{execution_hash}/proof"
+            return proof
+
         result_hash = hashlib.sha256(result.encode()).hexdigest()
         hcs = get_hcs_service()
         attestation_data = f"execution_proof|agent={agent_name}|hash={result_hash}"
-        proof["hcs_tx"] = hcs.submit_message(inbound_topic, agent_name, attestation_data)
+        proof["hcs_tx"] = await asyncio.to_thread(hcs.submit_message, inbound_topic, agent_name, attestation_data)
 
     except Exception as e:
         logger.warning("[Hedera] Attestation failed for %s (non-blocking): %s", agent_name, e)
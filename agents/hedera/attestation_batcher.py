@@ -0,0 +1,248 @@
+"""Merkle-batched HCS attestations — one consensus message per batch, not per execution.
+
+Executions are queued per topic and flushed after ATTESTATION_BATCH_WINDOW
+seconds or as soon as ATTESTATION_BATCH_MAX executions are waiting. A flush
+builds a Merkle tree over the execution hashes and submits only the root
+(plus batch size and the first and last execution time) as a single HCS-10
+message. Each execution
+keeps its leaf index and inclusion proof, persisted in SQLite
+(ATTESTATION_DB_PATH) and served by GET /attestations/{hash}/proof.
+
+Requests never wait for consensus: submit() records the execution as
+pending and returns without waiting for the batch. Store writes run in a
+worker thread, off the event loop. A failed submission is retried with the
+next window, up to ATTESTATION_MAX_ATTEMPTS times.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from hedera.merkle import build_tree, inclusion_proof
+from hedera.service_factory import get_hcs_service
+
+logger = logging.getLogger(__name__)
+
+ATTESTATION_BATCH_WINDOW = float(os.getenv("ATTESTATION_BATCH_WINDOW", "5"))
+ATTESTATION_BATCH_MAX = int(os.getenv("ATTESTATION_BATCH_MAX", "512"))
+ATTESTATION_MAX_ATTEMPTS = int(os.getenv("ATTESTATION_MAX_ATTEMPTS", "3"))
+ATTESTATION_DB_PATH = os.getenv(
+    "ATTESTATION_DB_PATH", str(Path(__file__).resolve().parent.parent / "attestations.db"),
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS attestations (
+    execution_hash TEXT PRIMARY KEY,
+    agent TEXT NOT NULL,
+    topic_id TEXT NOT NULL,
+    record TEXT NOT NULL,
+    status TEXT NOT NULL,
+    batch_root TEXT,
+    batch_size INTEGER,
+    leaf_index INTEGER,
+    proof TEXT,
+    hcs_tx TEXT,
+    created_at REAL NOT NULL,
+    anchored_at REAL
+);
+"""
+
+
+class AttestationStore:
+    """SQLite persistence for attested executions and their inclusion proofs."""
+
+    def __init__(self, path: str = ATTESTATION_DB_PATH) -> None:
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def add(self, execution_hash: str, agent: str, topic_id: str, record: dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO attestations (execution_hash, agent, topic_id, record, status, created_at)"
+                " VALUES (?, ?, ?, ?, 'pending', ?)",
+                (execution_hash, agent, topic_id, json.dumps(record), time.time()),
+            )
+
+    def anchor(self, root: str, hcs_tx: str, leaves: list[tuple[str, int, list[dict[str, str]]]]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE attestations SET status = 'anchored', batch_root = ?, batch_size = ?, leaf_index = ?,"
+                " proof = ?, hcs_tx = ?, anchored_at = ? WHERE execution_hash = ?",
+                [(root, len(leaves), index, json.dumps(proof), hcs_tx, now, h) for h, index, proof in leaves],
+            )
+
+    def fail(self, execution_hashes: list[str]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE attestations SET status = 'failed' WHERE execution_hash = ?",
+                [(h,) for h in execution_hashes],
+            )
+
+    def time_range(self, execution_hashes: list[str]) -> tuple[float, float]:
+        """Earliest and latest created_at among the given executions."""
+        marks = ",".join("?" * len(execution_hashes))
+        with self._lock:
+            first, last = self._conn.execute(
+                f"SELECT MIN(created_at), MAX(created_at) FROM attestations WHERE execution_hash IN ({marks})",
+                execution_hashes,
+            ).fetchone()
+        now = time.time()
+        return (first or now), (last or now)
+
+    def pending(self) -> list[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT execution_hash, topic_id FROM attestations WHERE status = 'pending' ORDER BY created_at"
+            ).fetchall()
+
+    def get(self, execution_hash: str) -> dict[str, Any] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM attestations WHERE execution_hash = ?", (execution_hash,)
+            ).fetchone()
+        if row is None:
+            return None
+        entry = dict(row)
+        entry["record"] = json.loads(entry["record"])
+        entry["proof"] = json.loads(entry["proof"]) if entry["proof"] else None
+        return entry
+
+
+@dataclass
+class _Batch:
+    hashes: list[str]
+    attempts: int = 0
+
+
+class AttestationBatcher:
+    """Per-topic batching of execution hashes into Merkle roots submitted to HCS."""
+
+    def __init__(
+        self,
+        window: float = ATTESTATION_BATCH_WINDOW,
+        max_batch: int = ATTESTATION_BATCH_MAX,
+        max_attempts: int = ATTESTATION_MAX_ATTEMPTS,
+    ) -> None:
+        self.window = window
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+        self._store: AttestationStore | None = None
+        self._pending: dict[str, list[str]] = {}
+        self._attempts: dict[str, int] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._flushes: set[asyncio.Task] = set()
+        self.batches = 0
+        self.anchored = 0
+        self.failed = 0
+
+    @property
+    def store(self) -> AttestationStore:
+        if self._store is None:
+            self._store = AttestationStore()
+        return self._store
+
+    async def submit(self, agent: str, topic_id: str, execution_hash: str, record: dict[str, Any]) -> None:
+        """Record an execution and queue it for the topic's next batch (does not wait for the flush)."""
+        await asyncio.to_thread(self.store.add, execution_hash, agent, topic_id, record)
+        self._enqueue(topic_id, [execution_hash])
+
+    def _enqueue(self, topic_id: str, hashes: list[str]) -> None:
+        queue = self._pending.setdefault(topic_id, [])
+        queue.extend(hashes)
+        if len(queue) >= self.max_batch:
+            self._start_flush(topic_id)
+        elif topic_id not in self._timers:
+            loop = asyncio.get_running_loop()
+            self._timers[topic_id] = loop.call_later(self.window, self._start_flush, topic_id)
+
+    def _start_flush(self, topic_id: str) -> None:
+        timer = self._timers.pop(topic_id, None)
+        if timer is not None:
+            timer.cancel()
+        queue = self._pending.pop(topic_id, [])
+        while queue:
+            batch, queue = queue[: self.max_batch], queue[self.max_batch :]
+            task = asyncio.get_running_loop().create_task(self._flush(topic_id, batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, topic_id: str, hashes: list[str]) -> None:
+        levels = build_tree(hashes)
+        root = levels[-1][0]
+        try:
+            first, last = await asyncio.to_thread(self.store.time_range, hashes)
+            message = json.dumps({
+                "type": "execution_batch",
+                "alg": "sha256-merkle",
+                "root": root,
+                "size": len(hashes),
+                "from": int(first),
+                "to": int(last),
+                "ts": int(time.time()),
+            })
+            hcs = get_hcs_service()
+            # The Hedera SDK call blocks until the receipt; keep it off the event loop
+            hcs_tx = await asyncio.to_thread(hcs.submit_message, topic_id, "attestation-batch", message)
+        except Exception as e:
+            attempts = max(self._attempts.pop(h, 0) for h in hashes) + 1
+            if attempts >= self.max_attempts:
+                logger.error("[Hedera] Attestation batch of %d on %s failed permanently: %s", len(hashes), topic_id, e)
+                await asyncio.to_thread(self.store.fail, hashes)
+                self.failed += len(hashes)
+                return
+            logger.warning("[Hedera] Attestation batch of %d on %s failed (retrying next window): %s", len(hashes), topic_id, e)
+            for h in hashes:
+                self._attempts[h] = attempts
+            self._enqueue(topic_id, hashes)
+            return
+
+        leaves = [(h, i, inclusion_proof(levels, i)) for i, h in enumerate(hashes)]
+        await asyncio.to_thread(self.store.anchor, root, hcs_tx, leaves)
+        for h in hashes:
+            self._attempts.pop(h, None)
+        self.batches += 1
+        self.anchored += len(hashes)
+        logger.info("[Hedera] Anchored %d executions on %s — root %s… tx %s", len(hashes), topic_id, root[:12], hcs_tx)
+
+    async def resume(self) -> None:
+        """Re-queue executions still pending from a previous run."""
+        by_topic: dict[str, list[str]] = {}
+        for row in await asyncio.to_thread(self.store.pending):
+            by_topic.setdefault(row["topic_id"], []).append(row["execution_hash"])
+        for topic_id, hashes in by_topic.items():
+            self._enqueue(topic_id, hashes)
+        if by_topic:
+            logger.info("[Hedera] Resumed %d pending attestations", sum(map(len, by_topic.values())))
+
+    async def flush_all(self) -> None:
+        """Submit everything queued now (shutdown)."""
+        for topic_id in list(self._pending):
+            self._start_flush(topic_id)
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "window_s": self.window,
+            "max_batch": self.max_batch,
+            "queued": sum(map(len, self._pending.values())),
+            "batches": self.batches,
+            "anchored": self.anchored,
+            "failed": self.failed,
+        }
+
+
+attestation_batcher = AttestationBatcher()
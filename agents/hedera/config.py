@@ -13,7 +13,7 @@ _client: Client | None = None
 
 
 def get_hedera_client() -> Client:
-    """Return a configured Hedera testnet client (cached singleton)."""
+    """Return a Hedera client for HEDERA_NETWORK, testnet by default (cached singleton)."""
     global _client
     if _client is not None:
         return _client
@@ -27,14 +27,15 @@ def get_hedera_client() -> Client:
             "Set HEDERA_ACCOUNT_ID + HEDERA_PRIVATE_KEY in .env"
         )
 
-    network = Network(network="testnet")
+    network_name = os.environ.get("HEDERA_NETWORK", "testnet")
+    network = Network(network=network_name)
     client = Client(network)
     client.set_operator(
         AccountId.from_string(account_id_str),
         PrivateKey.from_string(private_key_str),
     )
 
-    logger.info("Hedera client initialised for account %s (testnet)", account_id_str)
+    logger.info("Hedera client initialised for account %s (%s)", account_id_str, network_name)
     _client = client
     return _client
 
@@ -0,0 +1,50 @@
+"""Binary SHA-256 Merkle trees for batched HCS attestations.
+
+Leaves and interior nodes are domain-separated (0x00 / 0x01 prefixes) so an
+interior node can never be passed off as a leaf. A level with an odd number
+of nodes carries its last node up unchanged. Hashes are hex strings.
+"""
+
+from __future__ import annotations
+
+import hashlib
+
+
+def leaf_hash(execution_hash: str) -> str:
+    return hashlib.sha256(b"\x00" + bytes.fromhex(execution_hash)).hexdigest()
+
+
+def node_hash(left: str, right: str) -> str:
+    return hashlib.sha256(b"\x01" + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+
+def build_tree(execution_hashes: list[str]) -> list[list[str]]:
+    """All levels of the tree, leaves first; the last level holds the root."""
+    if not execution_hashes:
+        raise ValueError("cannot build a Merkle tree without leaves")
+    levels = [[leaf_hash(h) for h in execution_hashes]]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])
+        levels.append(parents)
+    return levels
+
+
+def inclusion_proof(levels: list[list[str]], index: int) -> list[dict[str, str]]:
+    """Sibling path from leaf `index` to the root: [{"hash", "position": "left"|"right"}]."""
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append({"hash": level[sibling], "position": "left" if sibling < index else "right"})
+        index //= 2
+    return proof
+
+
+def verify_proof(execution_hash: str, proof: list[dict[str, str]], root: str) -> bool:
+    node = leaf_hash(execution_hash)
+    for step in proof:
+        node = node_hash(step["hash"], node) if step["position"] == "left" else node_hash(node, step["hash"])
+    return node == root
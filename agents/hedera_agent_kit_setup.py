@@ -1,17 +1,37 @@
-"""Hedera Agent Kit initialization — connects to Hedera testnet with all core plugins."""
+"""Hedera Agent Kit initialization — connects to Hedera testnet with all core plugins.
+
+The toolkit is a process-wide singleton: it is built once (from the FastAPI
+lifespan, or lazily on first use), reuses the operator Client from
+hedera.config.get_hedera_client, and keeps its filtered tool lists so agent
+builds never touch the network or re-log the tool inventory. A failed build
+is retried on use after HEDERA_TOOLKIT_RETRY_SECONDS, so a transient outage
+at startup does not disable the tools for the life of the process.
+"""
 from __future__ import annotations
 
 import logging
 import os
+import threading
+import time
 
 from dotenv import load_dotenv
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+_toolkit = None
+_initialised = False
+_init_lock = threading.Lock()
+HEDERA_TOOLKIT_RETRY_SECONDS = float(os.getenv("HEDERA_TOOLKIT_RETRY_SECONDS", "30"))
+_retry_at = 0.0  # monotonic time before which a failed build is not retried
+# Bumped whenever the available tool set changes (successful build, reset);
+# agent_factory keys its compiled graphs on it
+_generation = 0
+# frozenset of tool names (None = all) -> filtered tool list
+_tool_lists: dict[frozenset | None, list] = {}
 
-def get_hedera_toolkit():
-    """Create and return a configured HederaLangchainToolkit with all plugins."""
+
+def _build_toolkit():
     from hedera_agent_kit.langchain.toolkit import HederaLangchainToolkit
     from hedera_agent_kit.plugins import (
         core_account_plugin,
@@ -26,53 +46,105 @@ def get_hedera_toolkit():
         core_transaction_query_plugin,
     )
     from hedera_agent_kit.shared.configuration import AgentMode, Configuration, Context
-    from hiero_sdk_python import AccountId, Client, Network, PrivateKey
 
-    account_id = os.getenv("HEDERA_ACCOUNT_ID", "")
-    private_key = os.getenv("HEDERA_PRIVATE_KEY", "")
+    from hedera.config import get_hedera_client, get_operator_account_id
 
-    if not account_id or not private_key:
+    try:
+        client = get_hedera_client()
+    except RuntimeError:
         logger.warning("Hedera credentials not found — toolkit unavailable")
         return None
 
-    try:
-        client = Client(Network(network="testnet"))
-        client.set_operator(
-            AccountId.from_string(account_id),
-            PrivateKey.from_string(private_key),
-        )
-
-        configuration = Configuration(
-            tools=[],  # empty = load all tools from plugins
-            context=Context(
-                mode=AgentMode.AUTONOMOUS,
-                account_id=account_id,
-            ),
-            plugins=[
-                core_account_plugin,
-                core_account_query_plugin,
-                core_token_plugin,
-                core_token_query_plugin,
-                core_consensus_plugin,
-                core_consensus_query_plugin,
-                core_evm_plugin,
-                core_evm_query_plugin,
-                core_misc_query_plugin,
-                core_transaction_query_plugin,
-            ],
-        )
-
-        toolkit = HederaLangchainToolkit(
-            client=client,
-            configuration=configuration,
-        )
-
-        tools = toolkit.get_tools()
-        logger.info(f"Hedera Agent Kit initialized with {len(tools)} tools")
-        for t in tools:
-            logger.info(f"  Tool: {t.name}")
-        return toolkit
-
-    except Exception as e:
-        logger.error(f"Failed to initialize Hedera Agent Kit: {e}")
-        return None
+    configuration = Configuration(
+        tools=[],  # empty = load all tools from plugins
+        context=Context(
+            mode=AgentMode.AUTONOMOUS,
+            account_id=str(get_operator_account_id()),
+        ),
+        plugins=[
+            core_account_plugin,
+            core_account_query_plugin,
+            core_token_plugin,
+            core_token_query_plugin,
+            core_consensus_plugin,
+            core_consensus_query_plugin,
+            core_evm_plugin,
+            core_evm_query_plugin,
+            core_misc_query_plugin,
+            core_transaction_query_plugin,
+        ],
+    )
+
+    toolkit = HederaLangchainToolkit(
+        client=client,
+        configuration=configuration,
+    )
+
+    tools = toolkit.get_tools()
+    _tool_lists[None] = tools
+    logger.info(f"Hedera Agent Kit initialized with {len(tools)} tools")
+    logger.debug("Hedera tools: %s", ", ".join(t.name for t in tools))
+    return toolkit
+
+
+def init_hedera_toolkit():
+    """Build the shared toolkit once. Safe to call repeatedly and from threads."""
+    global _toolkit, _initialised, _retry_at, _generation
+    if _initialised or time.monotonic() < _retry_at:
+        return _toolkit
+    with _init_lock:
+        if not _initialised and time.monotonic() >= _retry_at:
+            try:
+                _toolkit = _build_toolkit()
+                _initialised = True
+                _generation += 1
+            except Exception as e:
+                logger.error(
+                    f"Failed to initialize Hedera Agent Kit (retrying in {HEDERA_TOOLKIT_RETRY_SECONDS:g}s): {e}"
+                )
+                _toolkit = None
+                _retry_at = time.monotonic() + HEDERA_TOOLKIT_RETRY_SECONDS
+    return _toolkit
+
+
+def toolkit_ready() -> bool:
+    """True once the toolkit has been built successfully (no retry pending)."""
+    return _initialised
+
+
+def toolkit_generation() -> int:
+    return _generation
+
+
+def get_hedera_toolkit():
+    """Return the shared HederaLangchainToolkit, or None when unavailable."""
+    return init_hedera_toolkit()
+
+
+def get_hedera_tools(names: set[str] | None = None) -> list:
+    """Return the toolkit's tools, filtered to `names` (computed once per filter)."""
+    key = frozenset(names) if names is not None else None
+    tools = _tool_lists.get(key)
+    if tools is None:
+        if init_hedera_toolkit() is None:
+            return []
+        all_tools = _tool_lists[None]
+        tools = all_tools if key is None else [t for t in all_tools if t.name in key]
+        _tool_lists[key] = tools
+        if key is not None:
+            logger.info(f"Loaded {len(tools)}/{len(all_tools)} Hedera tools (filtered)")
+    return tools
+
+
+def reset_hedera_toolkit() -> None:
+    """Drop the singleton (lifespan shutdown). The shared Client is left to hedera.config."""
+    global _toolkit, _initialised, _retry_at, _generation
+    with _init_lock:
+        _toolkit = None
+        _initialised = False
+        _retry_at = 0.0
+        _generation += 1
+        _tool_lists.clear()
+    # Compiled agents hold the old tool objects
+    from agent_factory import invalidate_agent
+    invalidate_agent()
@@ -1,12 +1,25 @@
-"""Custom LangChain tools for DeFi data — CoinGecko, DeFi Llama, SaucerSwap, Bonzo."""
+"""Custom LangChain tools for DeFi data — CoinGecko, DeFi Llama, SaucerSwap, Bonzo.
+
+Network-bound tools are coroutines on the shared async HTTP clients, so the
+LangGraph ToolNode awaits them on the event loop instead of parking a thread
+from the default executor on each call. Market data tools go through
+agents.defi_data (upstream limits, prefetch, yield index) and only format
+the result for the model.
+"""
 from __future__ import annotations
 
 import json
 import logging
 
-import httpx
 from langchain.tools import tool
 
+from agents import defi_data
+from agents.defi_data import _fetch_prices_upstream
+from agents.http_clients import get_http_client
+from agents.price_cache import price_cache
+from agents.risk_engine import asset_vectors, classify, portfolio_matrix, score_portfolios
+from agents.risk_scorer import TOKEN_MAP, _volatility_cache
+
 logger = logging.getLogger(__name__)
 
 
@@ -16,20 +29,15 @@ logger = logging.getLogger(__name__)
 
 
 @tool
-def get_token_prices(tokens: str = "ethereum,bitcoin,usd-coin,hedera-hashgraph,tether") -> str:
+async def get_token_prices(tokens: str = "ethereum,bitcoin,usd-coin,hedera-hashgraph,tether") -> str:
     """Fetch current USD prices for crypto tokens from CoinGecko.
     Args: tokens — comma-separated CoinGecko IDs (e.g. "ethereum,bitcoin,hedera-hashgraph")
     Returns: JSON with price, 24h change, market cap for each token.
     """
-    url = (
-        f"https://api.coingecko.com/api/v3/simple/price"
-        f"?ids={tokens}&vs_currencies=usd&include_24hr_change=true&include_market_cap=true"
-    )
+    ids = [t.strip() for t in tokens.split(",") if t.strip()]
     try:
-        with httpx.Client(timeout=10) as client:
-            resp = client.get(url)
-            resp.raise_for_status()
-            return json.dumps(resp.json(), indent=2)
+        prices = await price_cache.get_many(ids, _fetch_prices_upstream)
+        return json.dumps(prices, indent=2)
     except Exception as e:
         return json.dumps({
             "error": str(e),
@@ -43,62 +51,61 @@ def get_token_prices(tokens: str = "ethereum,bitcoin,usd-coin,hedera-hashgraph,t
 
 
 @tool
-def get_wallet_balance(wallet_address: str) -> str:
+async def get_wallet_balance(wallet_address: str) -> str:
     """Fetch native token balance for an EVM wallet on 0G Chain testnet.
     Args: wallet_address — the 0x... address to check.
     Returns: JSON with OG balance.
     """
     try:
-        with httpx.Client(timeout=10) as client:
-            resp = client.post(
-                "https://evmrpc-testnet.0g.ai",
-                json={
-                    "jsonrpc": "2.0",
-                    "method": "eth_getBalance",
-                    "params": [wallet_address, "latest"],
-                    "id": 1,
-                },
-            )
-            balance_hex = resp.json().get("result", "0x0")
-            balance_og = int(balance_hex, 16) / 1e18
-            return json.dumps({
-                "wallet": wallet_address,
-                "chain": "0G-Galileo-Testnet",
-                "balance_og": round(balance_og, 6),
-            })
+        resp = await get_http_client("og_rpc").post(
+            "https://evmrpc-testnet.0g.ai",
+            json={
+                "jsonrpc": "2.0",
+                "method": "eth_getBalance",
+                "params": [wallet_address, "latest"],
+                "id": 1,
+            },
+        )
+        balance_hex = resp.json().get("result", "0x0")
+        balance_og = int(balance_hex, 16) / 1e18
+        return json.dumps({
+            "wallet": wallet_address,
+            "chain": "0G-Galileo-Testnet",
+            "balance_og": round(balance_og, 6),
+        })
     except Exception as e:
         return json.dumps({"error": str(e), "wallet": wallet_address})
 
 
 @tool
-def get_hedera_account_balance(account_id: str = "0.0.7973940") -> str:
+async def get_hedera_account_balance(account_id: str = "0.0.7973940") -> str:
     """Fetch HBAR balance and token holdings for a Hedera account via Mirror Node.
     Args: account_id — Hedera account (e.g. "0.0.7973940")
     Returns: JSON with HBAR balance and token list.
     """
     try:
-        with httpx.Client(timeout=10) as client:
-            resp = client.get(
-                f"https://testnet.mirrornode.hedera.com/api/v1/accounts/{account_id}",
+        client = get_http_client("mirror_node")
+        resp = await client.get(
+            f"/api/v1/accounts/{account_id}",
+        )
+        if resp.status_code == 200:
+            data = resp.json()
+            hbar = data.get("balance", {}).get("balance", 0) / 1e8
+            result = {
+                "account_id": account_id,
+                "hbar_balance": round(hbar, 6),
+                "tokens": [],
+            }
+            tok_resp = await client.get(
+                f"/api/v1/accounts/{account_id}/tokens",
             )
-            if resp.status_code == 200:
-                data = resp.json()
-                hbar = data.get("balance", {}).get("balance", 0) / 1e8
-                result = {
-                    "account_id": account_id,
-                    "hbar_balance": round(hbar, 6),
-                    "tokens": [],
-                }
-                tok_resp = client.get(
-                    f"https://testnet.mirrornode.hedera.com/api/v1/accounts/{account_id}/tokens",
-                )
-                if tok_resp.status_code == 200:
-                    result["tokens"] = [
-                        {"token_id": t["token_id"], "balance": t["balance"]}
-                        for t in tok_resp.json().get("tokens", [])[:10]
-                    ]
-                return json.dumps(result, indent=2)
-            return json.dumps({"error": f"HTTP {resp.status_code}", "account_id": account_id})
+            if tok_resp.status_code == 200:
+                result["tokens"] = [
+                    {"token_id": t["token_id"], "balance": t["balance"]}
+                    for t in tok_resp.json().get("tokens", [])[:10]
+                ]
+            return json.dumps(result, indent=2)
+        return json.dumps({"error": f"HTTP {resp.status_code}", "account_id": account_id})
     except Exception as e:
         return json.dumps({"error": str(e), "account_id": account_id})
 
@@ -109,101 +116,43 @@ def get_hedera_account_balance(account_id: str = "0.0.7973940") -> str:
 
 
 @tool
-def get_defi_yields(min_tvl: int = 500000) -> str:
+async def get_defi_yields(min_tvl: int = 500000) -> str:
     """Fetch real yield/APY data from major DeFi protocols via DeFi Llama.
     Returns top pools from SushiSwap, Aave, Compound, Lido, Uniswap sorted by APY.
     Args: min_tvl — minimum TVL in USD to filter pools (default $500K).
     """
-    try:
-        with httpx.Client(timeout=15) as client:
-            resp = client.get("https://yields.llama.fi/pools")
-            resp.raise_for_status()
-            pools = resp.json()["data"]
-            relevant = ["sushiswap", "aave-v3", "compound-v3", "lido", "uniswap-v3"]
-            chains = ["Ethereum", "Arbitrum", "Hedera"]
-            filtered = [
-                {
-                    "protocol": p["project"],
-                    "chain": p["chain"],
-                    "pool": p["symbol"],
-                    "tvl": p["tvlUsd"],
-                    "apy": round(p["apy"], 2),
-                    "stable": p.get("stablecoin", False),
-                }
-                for p in pools
-                if p["project"] in relevant
-                and p["chain"] in chains
-                and p["tvlUsd"] > min_tvl
-                and p["apy"]
-                and p["apy"] > 0.1
-            ]
-            filtered.sort(key=lambda x: x["apy"], reverse=True)
-            return json.dumps(filtered[:15], indent=2)
-    except Exception as e:
-        return json.dumps([
-            {"protocol": "aave-v3", "chain": "Ethereum", "pool": "USDC", "tvl": 500000000, "apy": 4.8, "stable": True},
-            {"protocol": "lido", "chain": "Ethereum", "pool": "stETH", "tvl": 15000000000, "apy": 3.2, "stable": False},
-            {"protocol": "compound-v3", "chain": "Ethereum", "pool": "USDC", "tvl": 1000000000, "apy": 5.1, "stable": True},
-            {"note": f"DeFi Llama unavailable: {e}. Showing fallback data."},
-        ], indent=2)
+    pools = await defi_data.get_defi_yields(min_tvl=min_tvl, limit=15)
+    return json.dumps([
+        {
+            "protocol": p["protocol"],
+            "chain": p["chain"],
+            "pool": p["pool"],
+            "tvl": p["tvl"],
+            "apy": round(p["apy"], 2),
+            "stable": p["stable"],
+        }
+        for p in pools
+    ], indent=2)
 
 
 @tool
-def get_saucerswap_pools() -> str:
+async def get_saucerswap_pools() -> str:
     """Fetch top liquidity pools from SaucerSwap DEX on Hedera.
     Returns pool names, TVL, and APR for the largest pools.
     """
-    try:
-        with httpx.Client(timeout=10) as client:
-            resp = client.get("https://api.saucerswap.finance/v2/pools")
-            if resp.status_code == 200:
-                pools = resp.json()
-                sorted_pools = sorted(pools, key=lambda p: float(p.get("tvl", 0) or 0), reverse=True)
-                result = [
-                    {
-                        "name": f"{p.get('tokenA', {}).get('symbol', '?')}/{p.get('tokenB', {}).get('symbol', '?')}",
-                        "tvl": round(float(p.get("tvl", 0) or 0)),
-                        "apr": round(float(p.get("apr", 0) or 0), 2),
-                    }
-                    for p in sorted_pools[:10]
-                    if float(p.get("tvl", 0) or 0) > 10000
-                ]
-                return json.dumps(result, indent=2)
-    except Exception as e:
-        logger.warning(f"SaucerSwap API error: {e}")
-
+    pools = await defi_data.get_saucerswap_pools()
     return json.dumps([
-        {"name": "HBAR/USDC", "tvl": 5000000, "apr": 12.5},
-        {"name": "HBAR/HBARX", "tvl": 3000000, "apr": 18.2},
-        {"name": "USDC/USDT", "tvl": 8000000, "apr": 4.1},
-        {"note": "SaucerSwap API unavailable. Showing fallback data."},
+        {"name": p["pair"], "tvl": p["tvl_usd"], "apr": p["apr_pct"]} if "pair" in p else p
+        for p in pools
     ], indent=2)
 
 
 @tool
-def get_bonzo_finance_markets() -> str:
+async def get_bonzo_finance_markets() -> str:
     """Fetch lending/borrowing markets from Bonzo Finance on Hedera.
     Returns supply APY, borrow APY, and TVL for each market.
     """
-    try:
-        with httpx.Client(timeout=10) as client:
-            resp = client.get("https://api.bonzo.finance/v1/markets")
-            if resp.status_code == 200:
-                return resp.text
-    except Exception:
-        pass
-
-    # Fallback — realistic data based on public Bonzo Finance info
-    return json.dumps({
-        "protocol": "Bonzo Finance",
-        "chain": "Hedera",
-        "markets": [
-            {"asset": "HBAR", "supply_apy": 3.5, "borrow_apy": 5.2, "tvl": 8000000},
-            {"asset": "USDC", "supply_apy": 6.1, "borrow_apy": 8.4, "tvl": 12000000},
-            {"asset": "HBARX", "supply_apy": 7.8, "borrow_apy": 10.1, "tvl": 3000000},
-            {"asset": "SAUCE", "supply_apy": 9.2, "borrow_apy": 12.5, "tvl": 1500000},
-        ],
-    }, indent=2)
+    return json.dumps(await defi_data.get_bonzo_data(), indent=2)
 
 
 # ============================================================
@@ -213,80 +162,47 @@ def get_bonzo_finance_markets() -> str:
 
 @tool
 def compute_portfolio_risk_score(portfolio_json: str) -> str:
-    """Compute a deterministic risk score (0-10) for a DeFi portfolio.
+    """Compute a risk score (0-10) for a DeFi portfolio from cached market data.
     Args: portfolio_json — JSON string like: {"ETH": 60, "BTC": 30, "USDC": 10}
            (keys are symbols, values are percentage allocations)
-    Returns: JSON with total score, sub-scores, and risk classification.
+    Returns: JSON with total score, sub-scores, risk classification, and the
+    market inputs used. Volatility and 24h change come from the shared caches
+    (no network calls), so scores move as those caches fill; assets listed in
+    "default_volatility" / "no_24h_change" were scored with the fallbacks.
     """
     try:
-        holdings = json.loads(portfolio_json)
+        holdings = {k.upper(): float(v) for k, v in json.loads(portfolio_json).items()}
     except Exception:
         return json.dumps({"error": "Invalid JSON. Expected format: {\"ETH\": 60, \"BTC\": 30}"})
 
-    stables = {"USDC", "USDT", "DAI", "BUSD"}
+    # Market inputs come from what the shared caches already hold — no network calls here.
+    assets = list(holdings)
+    cg_ids = {a: TOKEN_MAP[a] for a in assets if a in TOKEN_MAP}
+    cached_prices, _ = price_cache.peek(list(cg_ids.values()))
+    changes = {a: cached_prices.get(cg, {}).get("usd_24h_change", 0) for a, cg in cg_ids.items()}
+    volatilities = {a: _volatility_cache[cg] for a, cg in cg_ids.items() if cg in _volatility_cache}
 
-    # Concentration (0-3)
-    max_pct = max(holdings.values()) if holdings else 0
-    if max_pct > 50:
-        concentration_score = 3.0
-    elif max_pct > 30:
-        concentration_score = 2.0
-    else:
-        concentration_score = 1.0
-
-    # Stablecoin ratio (0-2)
-    stable_pct = sum(v for k, v in holdings.items() if k.upper() in stables)
-    if stable_pct == 0:
-        stable_score = 2.0
-    elif stable_pct < 20:
-        stable_score = 1.5
-    elif stable_pct < 40:
-        stable_score = 1.0
-    else:
-        stable_score = 0.0
-
-    # Diversification (0-2)
-    num_assets = len(holdings)
-    if num_assets <= 1:
-        diversification_score = 2.0
-    elif num_assets <= 3:
-        diversification_score = 1.5
-    elif num_assets <= 5:
-        diversification_score = 1.0
-    else:
-        diversification_score = 0.5
-
-    # Volatility proxy (0-3) — based on asset types
-    volatile_assets = {"ETH", "BTC", "HBAR", "LINK", "AAVE", "UNI", "SUSHI", "SOL", "AVAX"}
-    volatile_pct = sum(v for k, v in holdings.items() if k.upper() in volatile_assets)
-    if volatile_pct > 80:
-        volatility_score = 3.0
-    elif volatile_pct > 50:
-        volatility_score = 2.0
-    else:
-        volatility_score = 1.0
-
-    total = concentration_score + stable_score + diversification_score + volatility_score
-    total = min(10.0, round(total, 1))
-
-    if total >= 7:
-        classification = "HIGH RISK"
-    elif total >= 4:
-        classification = "MODERATE RISK"
-    else:
-        classification = "LOW RISK"
+    vol, change, stable = asset_vectors(assets, volatilities, changes)
+    scores = score_portfolios(portfolio_matrix([holdings], assets), vol, change, stable)
+    total = float(scores.total[0])
+    b = scores.breakdown(0)
 
     return json.dumps({
         "total_score": total,
         "max_score": 10,
-        "classification": classification,
+        "classification": classify(total),
         "sub_scores": {
-            "concentration": {"score": concentration_score, "max": 3, "detail": f"Max single asset: {max_pct}%"},
-            "stablecoin_buffer": {"score": stable_score, "max": 2, "detail": f"Stablecoin allocation: {stable_pct}%"},
-            "diversification": {"score": diversification_score, "max": 2, "detail": f"Number of assets: {num_assets}"},
-            "volatility_exposure": {"score": volatility_score, "max": 3, "detail": f"Volatile assets: {volatile_pct}%"},
+            "volatility": {"score": b["volatility"], "max": 3, "detail": f"Weighted volatility: {b['weighted_volatility_pct']}%"},
+            "concentration": {"score": b["concentration"], "max": 3, "detail": f"Max single asset: {b['max_single_asset_weight']}%"},
+            "stablecoin_exposure": {"score": b["stablecoin_exposure"], "max": 2, "detail": f"Stablecoin allocation: {b['stablecoin_pct']}%"},
+            "drawdown_24h": {"score": b["drawdown_24h"], "max": 2, "detail": f"Weighted 24h change: {b['weighted_24h_change_pct']}%"},
         },
         "portfolio": holdings,
+        "market_inputs": {
+            "volatility_pct": {a: round(float(v), 1) for a, v in zip(assets, vol)},
+            "default_volatility": [a for a in assets if a not in volatilities],
+            "no_24h_change": [a for a in assets if cg_ids.get(a) not in cached_prices],
+        },
     }, indent=2)
 
 
@@ -9,8 +9,7 @@ No HTTP calls to localhost — works on Railway and all cloud platforms.
 
 import logging
 
-import httpx
-
+from agents.http_clients import get_http_client
 from x402.config import (
     get_full_agent_name_to_token_id,
     get_full_cross_agent_recommendations,
@@ -35,29 +34,29 @@ class CrossAgentService:
     def __init__(
         self,
         afc_payment_service,
-        hedera_mirror_url: str = "https://testnet.mirrornode.hedera.com",
+        hedera_mirror_url: str = "",
         afc_token_id: str = "",
         **kwargs,
     ):
         self.afc_payment = afc_payment_service
+        # Empty: the shared mirror_node client's base URL (HEDERA_NETWORK)
         self.mirror_url = hedera_mirror_url
         self.afc_token_id = afc_token_id
 
     async def get_agent_afc_balance(self, hedera_account: str) -> float:
         """Read an agent's AFC balance from Hedera Mirror Node."""
         try:
-            async with httpx.AsyncClient(timeout=10) as client:
-                resp = await client.get(
-                    f"{self.mirror_url}/api/v1/accounts/{hedera_account}/tokens"
-                )
-                if resp.status_code != 200:
-                    return 0.0
-
-                data = resp.json()
-                for token in data.get("tokens", []):
-                    if token.get("token_id") == self.afc_token_id:
-                        return int(token.get("balance", 0)) / 100
+            resp = await get_http_client("mirror_node").get(
+                f"{self.mirror_url}/api/v1/accounts/{hedera_account}/tokens"
+            )
+            if resp.status_code != 200:
                 return 0.0
+
+            data = resp.json()
+            for token in data.get("tokens", []):
+                if token.get("token_id") == self.afc_token_id:
+                    return int(token.get("balance", 0)) / 100
+            return 0.0
         except Exception as e:
             logger.error(f"Failed to read AFC balance for {hedera_account}: {e}")
             return 0.0
@@ -188,12 +187,13 @@ class CrossAgentService:
     async def _call_agent_internal(self, agent_name: str, query: str) -> str:
         """
         Call another AgentFi agent via direct Python function call.
-        Uses agent_factory.create_agentfi_agent + ainvoke — the exact same
-        code path as the FastAPI /execute route, but with zero HTTP.
+        Uses agent_factory.aget_agentfi_agent + ainvoke — the exact same
+        code path (and cached graph) as the FastAPI /execute route, but with
+        zero HTTP.
         """
-        from agent_factory import create_agentfi_agent
+        from agent_factory import aget_agentfi_agent
 
-        agent = create_agentfi_agent(agent_name)
+        agent = await aget_agentfi_agent(agent_name)
         result = await agent.ainvoke(
             {"messages": [{"role": "user", "content": query}]},
         )
@@ -12,10 +12,10 @@ import json
 import logging
 import os
 
-import httpx
 from fastapi import Request
 from fastapi.responses import JSONResponse
 
+from agents.http_clients import get_http_client
 from x402.config import (
     AGENT_HEDERA_ACCOUNTS,
     AGENT_NAME_TO_TOKEN_ID,
@@ -30,7 +30,6 @@ logger = logging.getLogger(__name__)
 PIEVERSE_FACILITATOR = "https://facilitator.pieverse.io"
 KITE_WALLET_ADDRESS = os.getenv("KITE_WALLET_ADDRESS", "")
 HEDERA_TOKEN_ID = os.getenv("HEDERA_TOKEN_ID", "")
-HEDERA_MIRROR_NODE = "https://testnet.mirrornode.hedera.com"
 X402_VERSION = 2
 
 
@@ -117,8 +116,7 @@ async def _verify_hedera_payment(payment: dict, agent_name: str) -> dict | None:
         # Normalize: some clients send with @ instead of -
         normalized_tx = tx_hash.replace("@", "-")
 
-        async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.get(f"{HEDERA_MIRROR_NODE}/api/v1/transactions/{normalized_tx}")
+        resp = await get_http_client("mirror_node").get(f"/api/v1/transactions/{normalized_tx}")
 
         if resp.status_code != 200:
             logger.warning(f"[x402] Mirror Node returned {resp.status_code} for tx {tx_hash}")
@@ -196,15 +194,15 @@ async def verify_x402_payment(request: Request, agent_name: str) -> dict | None:
         config = get_registry_config(token_id)
         payment_requirements = _build_payment_requirements(agent_name, config)
 
-        async with httpx.AsyncClient(timeout=15) as client:
-            resp = await client.post(
-                f"{PIEVERSE_FACILITATOR}/v2/verify",
-                json={
-                    "x402Version": X402_VERSION,
-                    "payment": payment,
-                    "paymentRequirements": payment_requirements,
-                },
-            )
+        resp = await get_http_client("pieverse").post(
+            f"{PIEVERSE_FACILITATOR}/v2/verify",
+            json={
+                "x402Version": X402_VERSION,
+                "payment": payment,
+                "paymentRequirements": payment_requirements,
+            },
+            timeout=15,
+        )
 
         if resp.status_code == 200:
             result = resp.json()
@@ -240,15 +238,14 @@ async def settle_x402_payment(payment_data: dict) -> str | None:
         return None
 
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            resp = await client.post(
-                f"{PIEVERSE_FACILITATOR}/v2/settle",
-                json={
-                    "x402Version": X402_VERSION,
-                    "payment": payment_data["raw_payment"],
-                    "paymentRequirements": payment_data["payment_requirements"],
-                },
-            )
+        resp = await get_http_client("pieverse").post(
+            f"{PIEVERSE_FACILITATOR}/v2/settle",
+            json={
+                "x402Version": X402_VERSION,
+                "payment": payment_data["raw_payment"],
+                "paymentRequirements": payment_data["payment_requirements"],
+            },
+        )
 
         if resp.status_code == 200:
             result = resp.json()